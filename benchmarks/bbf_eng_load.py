@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# benchmarks/bbf_eng_load.py
+#
+# Навантажувальний прогін планувальника StarPom (cogs/_bbf_cog_eng.py):
+# N синтетичних гільдій на локальній заміні MongoDB із затримкою на кожен запит.
+#
+#   python benchmarks/bbf_eng_load.py
+#   python benchmarks/bbf_eng_load.py --guilds 1000 --latency-ms 5 --open-ratio 0.5
+#
+# Міряє кількість читань і час: старт кога, тік без дедлайнів, дедлайн нагадування,
+# дедлайн інвайту — і для порівняння старий цикл (config + _load_data по черзі щохвилини).
+# Потрібне робоче оточення бота (discord.py, pymongo); сама MongoDB не потрібна.
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cogs._bbf_cog_eng as eng   # noqa: E402
+
+# ─── Заміна MongoDB ──────────────────────────────────────────────────────────
+
+class Counters:
+
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self.reads  = 0
+        self.writes = 0
+
+    def add(self, reads: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.reads  += reads
+            self.writes += writes
+
+    def reset(self) -> None:
+        with self._lock:
+            self.reads = self.writes = 0
+
+
+class FakeCollection:
+    """find / find_one / replace_one з фіксованою затримкою, як мережевий round-trip."""
+
+    def __init__(self, docs: dict, latency: float, counters: Counters):
+        self._docs     = docs
+        self._latency  = latency
+        self._counters = counters
+
+    def find(self, query: dict | None = None):
+        self._counters.add(reads=1)
+        time.sleep(self._latency)
+        return [dict(d) for d in self._docs.values()]
+
+    def find_one(self, query: dict):
+        self._counters.add(reads=1)
+        time.sleep(self._latency)
+        doc = self._docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def replace_one(self, query: dict, doc: dict, upsert: bool = False):
+        self._counters.add(writes=1)
+        time.sleep(self._latency)
+        self._docs[query["_id"]] = dict(doc)
+
+    def insert_one(self, doc: dict):
+        self._counters.add(writes=1)
+        time.sleep(self._latency)
+        self._docs[doc["_id"]] = dict(doc)
+
+
+class FakeDB:
+
+    def __init__(self, latency: float, counters: Counters):
+        self._latency     = latency
+        self._counters    = counters
+        self.collections: dict[str, dict] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return FakeCollection(self.collections.setdefault(name, {}), self._latency, self._counters)
+
+
+def _populate(db: FakeDB, guilds: int, open_ratio: float) -> None:
+    open_every = max(1, round(1 / open_ratio)) if open_ratio > 0 else 0
+    config     = db.collections.setdefault("bbf_config", {})
+    for i in range(guilds):
+        gid = 10_000 + i
+        config[str(gid)] = {"_id": str(gid), "voice_id": None}
+        week = {}
+        if open_every and i % open_every == 0:
+            week = {
+                str(d): {"main": [{"uid": str(d + 1), "team": "Flight"}], "waitlist": [], "vacation": [], "cant": []}
+                for d in eng.DAY_NAMES
+            }
+        db.collections[f"bbf_{gid}"] = {
+            "main": {"_id": "main", "week": week, "thread_ids": {k: 1 for k in week}, "reminded": {}, "invited": {}},
+        }
+
+# ─── Заміна Discord ──────────────────────────────────────────────────────────
+
+class FakeMessage:
+    id = 1
+
+
+class FakeThread:
+
+    def __init__(self, send_latency: float):
+        self._send_latency = send_latency
+
+    async def send(self, *args, **kwargs) -> FakeMessage:
+        await asyncio.sleep(self._send_latency)
+        return FakeMessage()
+
+
+class FakeGuild:
+    me = None
+
+    def __init__(self, send_latency: float):
+        self._thread = FakeThread(send_latency)
+
+    def get_channel(self, channel_id: int) -> FakeThread:
+        return self._thread
+
+
+class FakeScheduler:
+    """Запам'ятовує, на коли бот поставив би дедлайн-job; запускаємо його вручну."""
+
+    def __init__(self):
+        self.next_due: datetime | None = None
+
+    def at(self, name, next_run, fn, **kwargs) -> None:
+        pass
+
+    def every(self, name, seconds, fn, **kwargs) -> None:
+        pass
+
+    def reschedule(self, name, due) -> None:
+        self.next_due = due
+
+    def remove(self, name) -> None:
+        pass
+
+
+class FakeBot:
+    home_guild_id = None
+
+    def __init__(self, send_latency: float):
+        self.scheduler = FakeScheduler()
+        self._guild    = FakeGuild(send_latency)
+
+    def get_guild(self, gid: int) -> FakeGuild:
+        return self._guild
+
+
+class FrozenClock(datetime):
+    current: datetime | None = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+# ─── Прогін ──────────────────────────────────────────────────────────────────
+
+def _next_monday(after: datetime) -> datetime:
+    day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day + timedelta(days=(7 - day.weekday()) % 7 or 7)
+
+
+def _report(label: str, counters: Counters, seconds: float) -> None:
+    print(f"{label:32s} читань {counters.reads:6d}  записів {counters.writes:6d}  {seconds:7.2f} с")
+
+
+async def main(args: argparse.Namespace) -> None:
+    counters = Counters()
+    db       = FakeDB(args.latency_ms / 1000, counters)
+    _populate(db, args.guilds, args.open_ratio)
+
+    eng._get_db                = lambda: db
+    eng._config_cache          = None
+    eng._build_reminder_embed  = lambda *a, **k: None
+    eng._make_confirm_view     = lambda *a, **k: None
+    eng.datetime               = FrozenClock
+
+    monday       = _next_monday(datetime.now(timezone.utc))
+    reminder_at  = monday.replace(hour=eng.REMINDER_HOUR_CEST, minute=eng.REMINDER_MINUTE_CEST) - eng.CEST_OFFSET
+    invite_at    = monday.replace(hour=eng.INVITE_HOUR_CEST, minute=eng.INVITE_MINUTE_CEST) - eng.CEST_OFFSET
+    print(f"Гільдій: {args.guilds}, з відкритим тижнем: {args.open_ratio:.0%}, затримка БД: {args.latency_ms} мс\n")
+
+    FrozenClock.current = monday + timedelta(hours=8)
+    bot     = FakeBot(args.send_latency_ms / 1000)
+    started = time.perf_counter()
+    cog     = eng.BBFGlobalCog(bot)
+    _report("старт кога", counters, time.perf_counter() - started)
+    print(f"{'':32s} у heap: {len(cog.deadlines)}, найближчий дедлайн: {bot.scheduler.next_due:%Y-%m-%d %H:%M} UTC")
+
+    for label, moment in (
+        ("тік без дедлайнів", monday + timedelta(hours=9)),
+        ("дедлайн нагадування", reminder_at),
+        ("дедлайн інвайту", invite_at),
+    ):
+        counters.reset()
+        FrozenClock.current = moment
+        started = time.perf_counter()
+        await cog._run_deadlines(moment)
+        _report(label, counters, time.perf_counter() - started)
+        print(f"{'':32s} у heap: {len(cog.deadlines)}")
+
+    # Старий reminder_task: config + _load_data кожної гільдії по черзі, щохвилини
+    counters.reset()
+    started = time.perf_counter()
+    list(db["bbf_config"].find({}))
+    for gid in range(10_000, 10_000 + args.guilds):
+        eng._load_data(gid)
+    _report("старий щохвилинний тік", counters, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="затримка кожного запиту до БД")
+    parser.add_argument("--send-latency-ms", type=float, default=20.0, help="затримка відправки в Discord")
+    parser.add_argument("--open-ratio", type=float, default=0.5, help="частка гільдій з відкритим тижнем")
+    asyncio.run(main(parser.parse_args()))
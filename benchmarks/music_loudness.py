@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# benchmarks/music_loudness.py
+#
+# CPU на один стрім для режимів вирівнювання гучності music_cog — ті самі фільтри й
+# опції ffmpeg, що й у плеєрі, вихід у /dev/null замість Discord.
+#
+#   python benchmarks/music_loudness.py                 # 240 с синтетичного Opus
+#   python benchmarks/music_loudness.py track.opus      # свій файл
+#   python benchmarks/music_loudness.py --seconds 600 --runs 5
+#
+# Рядки звіту:
+#   однопрохідний loudnorm      — як грало все до аналізу гучності (базова лінія)
+#   перше програвання           — loudnorm + print_format=json у stderr (вимірювання заодно)
+#   перше програвання + прохід  — старий варіант: loudnorm і окремий повний прохід аналізу
+#   повтор: volume=             — трек з уже відомим підсиленням
+#   кеш: Opus без перекодування — файл з кешу аудіо на стартовій гучності
+#   аналіз файлу з кешу         — фоновий прохід по локальному файлу (раз на трек)
+# CPU рахується по дочірніх процесах (user + sys), береться найменший з --runs прогонів.
+
+import argparse
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cogs.music_cog import LOUDNORM_FILTER, _ffmpeg_opts   # noqa: E402
+
+PCM_OUT  = ["-f", "s16le", "-ar", "48000", "-ac", "2", "-loglevel", "warning", "-y", os.devnull]
+OPUS_OUT = ["-map_metadata", "-1", "-f", "opus", "-c:a", "copy", "-ar", "48000", "-ac", "2", "-b:a", "128k",
+            "-loglevel", "warning", "-y", os.devnull]
+
+
+def _cpu(args: list[str]) -> float:
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    subprocess.run(["ffmpeg", "-hide_banner", "-nostdin", *args], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+
+
+def _best(args: list[str], runs: int) -> float:
+    return min(_cpu(args) for _ in range(runs))
+
+
+def _duration(path: str) -> float:
+    # Без виходу ffmpeg лише друкує заголовок файлу (і завершується з помилкою — це очікувано)
+    err = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True).stderr
+    m   = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", err)
+    if not m:
+        raise SystemExit(f"Не вдалося визначити тривалість {path}")
+    hours, minutes, secs = m.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(secs)
+
+
+def _synthetic(seconds: int, folder: str) -> str:
+    """Рожевий шум із повільною модуляцією гучності — loudnorm має що коригувати."""
+    path = str(Path(folder) / "bench.opus")
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.3:duration={seconds}:sample_rate=48000",
+        "-af", "volume='0.5+0.4*sin(2*PI*t/20)':eval=frame,aformat=channel_layouts=stereo",
+        "-c:a", "libopus", "-b:a", "128k", "-y", path,
+    ], check=True)
+    return path
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        path    = args.input or _synthetic(args.seconds, folder)
+        seconds = _duration(path)
+
+        loudnorm   = ["-i", path, *_ffmpeg_opts(None).split(), *PCM_OUT]
+        first_play = ["-nostats", "-i", path, *_ffmpeg_opts(None, measure=True).split(), *PCM_OUT]
+        analysis   = ["-i", path, "-vn", "-af", f"{LOUDNORM_FILTER}:print_format=json", "-f", "null", "-"]
+        static     = ["-i", path, *_ffmpeg_opts(-2.35).split(), *PCM_OUT]
+        passthru   = ["-i", path, *OPUS_OUT]
+
+        loudnorm_cpu = _best(loudnorm, args.runs)
+        analysis_cpu = _best(analysis, args.runs)
+        rows = [
+            ("однопрохідний loudnorm",      loudnorm_cpu),
+            ("перше програвання",           _best(first_play, args.runs)),
+            ("перше програвання + прохід",  loudnorm_cpu + analysis_cpu),
+            ("повтор: volume=",             _best(static, args.runs)),
+            ("кеш: Opus без перекодування", _best(passthru, args.runs)),
+            ("аналіз файлу з кешу",         analysis_cpu),
+        ]
+
+    print(f"Аудіо: {seconds:.0f} с, найкращий з {args.runs} прогонів\n")
+    base = rows[0][1]
+    for name, cpu in rows:
+        print(f"{name:30s} CPU {cpu:7.2f} с   {cpu / seconds * 100:6.2f}% ядра на стрім   x{cpu / base:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", help="аудіофайл; без нього генерується синтетичний Opus")
+    parser.add_argument("--seconds", type=int, default=240, help="тривалість синтетичного треку")
+    parser.add_argument("--runs", type=int, default=3)
+    main(parser.parse_args())
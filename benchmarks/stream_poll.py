@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# benchmarks/stream_poll.py
+#
+# Цикл перевірки стрімів (cogs/stream_cog.py) проти локальної заміни decapi / YouTube RSS:
+# aiohttp-сервер на 127.0.0.1 відповідає із затримкою, бот ходить туди через HttpClient.
+#
+#   python benchmarks/stream_poll.py
+#   python benchmarks/stream_poll.py --streamers 10 30 60 120 --latency-ms 200 --failing 3
+#
+# Для кожного N: паралельний цикл check_streams (ліміти на хост як у бота, без джитера)
+# проти послідовного обходу тих самих стрімерів — як працював старий цикл.
+# --failing: стільки Twitch-стрімерів «в ефірі», а їхній анонс падає — цикл має дійти до
+# кінця й записати last_cycle. Twitch-ключі вимикаються, тож live-статус іде через decapi.
+# Потрібне робоче оточення бота (discord.py, pymongo); MongoDB і мережа не потрібні.
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cogs.stream_cog as sc           # noqa: E402
+from utils.http import HttpClient      # noqa: E402
+
+HOST = "127.0.0.1"
+EMPTY_FEED = f"<feed xmlns='{sc.ATOM_NS}'></feed>"
+
+# ─── Заміна зовнішніх сервісів ───────────────────────────────────────────────
+
+def _make_app(latency: float, live: set[str]) -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        if request.path.startswith("/feeds/"):
+            return web.Response(text=EMPTY_FEED, content_type="application/atom+xml")
+        login = request.path.rsplit("/", 1)[-1]
+        return web.Response(text="1 hour, 5 minutes" if login in live else "offline")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handle)
+    return app
+
+
+class LocalHttpClient(HttpClient):
+    """Той самий клієнт, але всі запити йдуть на локальний сервер (шлях і query зберігаються)."""
+
+    def __init__(self, port: int):
+        super().__init__()
+        self._base = f"http://{HOST}:{port}"
+
+    async def request(self, method: str, url: str, kind: str = "text", **kwargs):
+        parts = urlsplit(url)
+        local = f"{self._base}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return await super().request(method, local, kind, **kwargs)
+
+
+class FakeScheduler:
+
+    def every(self, name, seconds, fn, **kwargs) -> None:
+        pass
+
+    def remove(self, name) -> None:
+        pass
+
+
+class FakeBot:
+
+    def __init__(self, http_client: HttpClient):
+        self.scheduler   = FakeScheduler()
+        self.http_client = http_client
+
+
+async def _failing_announce(platform: str, username: str, discord_id: int, stream=None):
+    raise RuntimeError("Discord недоступний")
+
+# ─── Прогін ──────────────────────────────────────────────────────────────────
+
+def _streamers(n: int) -> list[dict]:
+    return [
+        {"platform": "twitch", "username": f"tw{i}", "discord_id": 1} if i % 2 else
+        {"platform": "youtube", "username": f"yt{i}", "yt_channel_id": f"UC{i:022d}", "discord_id": 1}
+        for i in range(n)
+    ]
+
+
+def _make_cog(http: HttpClient, streamers: list[dict]) -> sc.StreamCog:
+    sc._load_streamers  = lambda: [dict(s) for s in streamers]
+    sc._load_last_seen  = lambda: {"youtube": {}, "twitch": {}}
+    sc._load_game_icons = lambda: {}
+    cog = sc.StreamCog(FakeBot(http))
+    cog.announce_stream = _failing_announce
+    return cog
+
+
+async def main(args: argparse.Namespace) -> None:
+    sc.POLL_JITTER_SECONDS  = 0
+    sc.TWITCH_CLIENT_ID     = None
+    sc.TWITCH_CLIENT_SECRET = None
+
+    live   = {f"tw{i}" for i in range(1, 2 * args.failing, 2)}
+    runner = web.AppRunner(_make_app(args.latency_ms / 1000, live))
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    http = LocalHttpClient(port)
+    http.start()
+    print(f"Затримка відповіді: {args.latency_ms:.0f} мс, анонсів, що падають: {len(live)}\n")
+    try:
+        for n in args.streamers:
+            streamers = _streamers(n)
+
+            cog = _make_cog(http, streamers)
+            await cog.check_streams(None)
+            cycle = cog.last_cycle
+
+            # Старий цикл: ті самі перевірки по одній
+            cog = _make_cog(http, streamers)
+            await cog._ensure_loaded()
+            started = time.perf_counter()
+            for s in cog.streamers:
+                try:
+                    await cog._check_streamer(s, None)
+                except Exception:
+                    pass
+            serial = time.perf_counter() - started
+
+            print(
+                f"стрімерів {n:4d}   паралельно {cycle['seconds']:6.2f} с   послідовно {serial:6.2f} с   "
+                f"x{serial / max(cycle['seconds'], 0.01):5.1f}   помилок анонсу {cycle['failed']}   "
+                f"HTTP-помилок {cycle['http_errors']}"
+            )
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streamers", type=int, nargs="+", default=[10, 30, 60, 120])
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="затримка кожної відповіді")
+    parser.add_argument("--failing", type=int, default=2, help="Twitch-стрімерів в ефірі з анонсом, що падає")
+    asyncio.run(main(parser.parse_args()))
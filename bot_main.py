@@ -13,6 +13,8 @@ from discord import app_commands
 from discord.ext import commands
 
 from config.loader import DISCORD_TOKEN, GUILD_ID
+from utils.http import HttpClient
+from utils.scheduler import Scheduler
 
 
 INTENTS = discord.Intents.default()
@@ -136,6 +138,8 @@ class SilentBot(commands.Bot):
             help_command=None,
         )
         self.home_guild_id: int | None = None
+        self.scheduler: Scheduler | None = None
+        self.http_client: HttpClient | None = None   # `self.http` зайнятий discord.py
 
     async def setup_hook(self) -> None:
         print("[BOOT] bot_main.py started")
@@ -149,6 +153,14 @@ class SilentBot(commands.Bot):
             self.home_guild_id = None
         print(f"[BOOT] home_guild_id = {self.home_guild_id}")
 
+        # Спільний планувальник — коги реєструють у ньому свої періодичні задачі
+        self.scheduler = Scheduler(wait_ready=self.wait_until_ready)
+        self.scheduler.start()
+
+        # Спільний HTTP-клієнт — один пул з'єднань і кеш DNS для всіх когів
+        self.http_client = HttpClient()
+        self.http_client.start()
+
         # Діагностика файлів
         try:
             print("[BOOT] ROOT FILES:", sorted(os.listdir(".")))
@@ -191,6 +203,13 @@ class SilentBot(commands.Bot):
         await _do_sync(self)
         self.tree.on_error = self.on_app_command_error
 
+    async def close(self) -> None:
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.http_client:
+            await self.http_client.close()
+        await super().close()
+
     async def on_ready(self) -> None:
         print(f"[READY] {self.user} ({self.user.id})")
         _append_runtime_log({
@@ -270,6 +289,23 @@ async def force_sync(ctx: commands.Context) -> None:
         traceback.print_exc()
 
 
+@bot.command(name="http_stats")
+@commands.is_owner()
+async def http_stats(ctx: commands.Context) -> None:
+    """Затримки й помилки спільного HTTP-клієнта по хостах (тільки для власника бота)."""
+    rows = bot.http_client.stats() if bot.http_client else []
+    if not rows:
+        await ctx.send("ℹ️ HTTP-запитів ще не було.")
+        return
+    lines = [
+        f"`{r['host']}`: **{r['requests']}** зап., помилок {r['errors']}, повторів {r['retries']}, "
+        f"avg {r['avg_ms']} мс, max {r['max_ms']} мс"
+        + (f"\n  └ {r['last_error']}" if r["last_error"] else "")
+        for r in rows
+    ]
+    await ctx.send("\n".join(lines)[:1900])
+
+
 async def main() -> None:
     if not DISCORD_TOKEN:
         raise RuntimeError("DISCORD_TOKEN is missing")
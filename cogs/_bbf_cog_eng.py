@@ -2,14 +2,16 @@
 # bbf_cog_eng.py — StarPom: Multi-server BBF registration system
 
 import asyncio
+import heapq
 import os
 import random
+import time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 from pymongo import MongoClient
 
 # ─── MongoDB ──────────────────────────────────────────────────────────────────
@@ -40,6 +42,17 @@ INVITE_MINUTE_CEST    = 45
 BBF_START_HOUR_CEST   = 20
 BBF_START_MINUTE_CEST = 0
 
+# Per-guild deadlines, in order within a BBF day
+DEADLINES = (
+    ("reminder", REMINDER_HOUR_CEST, REMINDER_MINUTE_CEST),
+    ("invite",   INVITE_HOUR_CEST,   INVITE_MINUTE_CEST),
+)
+
+DEADLINE_JOB      = "starpom:deadlines"
+BACKUP_JOB        = "starpom:backup"
+BACKUP_EVERY_SEC  = 15 * 60
+GUILD_CONCURRENCY = 16   # guilds processed at once when a deadline fires
+
 DAY_NAMES = {
     0: "Monday",
     1: "Tuesday",
@@ -67,15 +80,26 @@ BBF_IMAGES = [
 def _guild_col(guild_id: int):
     return _get_db()[f"bbf_{guild_id}"]
 
+# Configs are only written by this bot, so one read at startup plus
+# write-through in _save_config keeps the cache exact.
+_config_cache: dict[int, dict] | None = None
+
+# Guilds whose data changed since the last backup
+_dirty_guilds: set[int] = set()
+
+def _all_configs() -> dict[int, dict]:
+    global _config_cache
+    if _config_cache is None:
+        try:
+            docs = list(_get_db()["bbf_config"].find({}))
+        except Exception as e:
+            print(f"[StarPom] Config load error: {e}")
+            return {}
+        _config_cache = {int(doc.pop("_id")): doc for doc in docs}
+    return _config_cache
+
 def _load_config(guild_id: int) -> dict:
-    try:
-        doc = _get_db()["bbf_config"].find_one({"_id": str(guild_id)})
-        if doc:
-            doc.pop("_id", None)
-            return doc
-    except Exception as e:
-        print(f"[StarPom] Config load error: {e}")
-    return {}
+    return dict(_all_configs().get(guild_id, {}))
 
 def _save_config(guild_id: int, config: dict) -> None:
     try:
@@ -84,15 +108,21 @@ def _save_config(guild_id: int, config: dict) -> None:
             {"_id": str(guild_id), **config},
             upsert=True,
         )
+        _all_configs()[guild_id] = dict(config)
     except Exception as e:
         print(f"[StarPom] Config save error: {e}")
 
+def _fetch_data(guild_id: int) -> dict:
+    """Like _load_data, but MongoDB errors propagate to the caller."""
+    doc = _guild_col(guild_id).find_one({"_id": "main"})
+    if not doc:
+        return _empty_data()
+    doc.pop("_id", None)
+    return doc
+
 def _load_data(guild_id: int) -> dict:
     try:
-        doc = _guild_col(guild_id).find_one({"_id": "main"})
-        if doc:
-            doc.pop("_id", None)
-            return doc
+        return _fetch_data(guild_id)
     except Exception as e:
         print(f"[StarPom] Load error: {e}")
     return _empty_data()
@@ -102,6 +132,7 @@ def _save_data(guild_id: int, data: dict) -> None:
         _guild_col(guild_id).replace_one(
             {"_id": "main"}, {"_id": "main", **data}, upsert=True,
         )
+        _dirty_guilds.add(guild_id)
     except Exception as e:
         print(f"[StarPom] Save error: {e}")
 
@@ -171,6 +202,101 @@ def _get_ts_for_day(data: dict, day_num: int) -> int:
         return _bbf_timestamp(datetime.fromisoformat(date_str))
     return _bbf_timestamp(_now_cest())
 
+# ─── Deadlines ────────────────────────────────────────────────────────────────
+
+def _next_deadline(
+    after: datetime,
+    days: set[str] | None = None,
+    done: set[tuple[str, str]] = frozenset(),
+) -> tuple[datetime, str] | None:
+    """
+    Next (instant UTC, kind) strictly after `after`.
+    `days` limits it to registered weekdays, `done` skips (day_key, kind) already sent.
+    """
+    local_day = (after + CEST_OFFSET).replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(8):
+        day     = local_day + timedelta(days=offset)
+        day_key = str(day.weekday())
+        if day.weekday() not in DAY_NAMES or (days is not None and day_key not in days):
+            continue
+        for kind, hour, minute in DEADLINES:
+            due = day.replace(hour=hour, minute=minute) - CEST_OFFSET
+            if due > after and (day_key, kind) not in done:
+                return due, kind
+    return None
+
+def _bbf_start_utc(due: datetime) -> datetime:
+    local = (due + CEST_OFFSET).replace(hour=BBF_START_HOUR_CEST, minute=BBF_START_MINUTE_CEST, second=0, microsecond=0)
+    return local - CEST_OFFSET
+
+def _sent_flags(data: dict) -> set[tuple[str, str]]:
+    done = {(k, "reminder") for k, v in data.get("reminded", {}).items() if v}
+    done |= {(k, "invite") for k, v in data.get("invited", {}).items() if v}
+    return done
+
+
+class GuildDeadlines:
+    """
+    Next reminder/invite deadline of every guild, kept in one heap.
+    Guild data is read only when that guild's deadline is due; afterwards the
+    next deadline is derived from the data just read (registered days and
+    reminded/invited flags), so guilds without an open week drop out entirely.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._next: dict[int, tuple[datetime, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._next)
+
+    def _set(self, gid: int, nxt: tuple[datetime, str] | None) -> None:
+        if nxt is None:
+            self._next.pop(gid, None)
+            return
+        self._next[gid] = nxt
+        heapq.heappush(self._heap, (nxt[0], gid, nxt[1]))
+
+    def seed(self, gid: int, now: datetime) -> None:
+        """Calendar-only deadline; a missed one is kept while BBF has not started yet."""
+        nxt = _next_deadline(now - timedelta(days=1))
+        while nxt and _bbf_start_utc(nxt[0]) <= now:
+            nxt = _next_deadline(nxt[0])
+        self._set(gid, nxt)
+
+    def track(self, gid: int, data: dict, after: datetime) -> None:
+        self._set(gid, _next_deadline(after, set(data.get("week", {})), _sent_flags(data)))
+
+    def defer(self, gid: int, after: datetime) -> None:
+        """Data could not be read — fall back to the calendar and retry at the next deadline."""
+        self._set(gid, _next_deadline(after))
+
+    def _prune(self) -> None:
+        while self._heap:
+            due, gid, kind = self._heap[0]
+            if self._next.get(gid) == (due, kind):
+                return
+            heapq.heappop(self._heap)
+
+    def earliest(self) -> datetime | None:
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def earliest_after(self, after: datetime) -> datetime | None:
+        upcoming = [due for due, _ in self._next.values() if due > after]
+        return min(upcoming) if upcoming else None
+
+    def pop_due(self, now: datetime) -> list[tuple[int, str, datetime]]:
+        batch = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            due, gid, kind = heapq.heappop(self._heap)
+            if self._next.get(gid) == (due, kind):
+                del self._next[gid]
+                batch.append((gid, kind, due))
+            self._prune()
+        return batch
+
 # ─── Image picker ─────────────────────────────────────────────────────────────
 
 def _pick_image(data: dict, day_key: str) -> str:
@@ -740,13 +866,23 @@ async def _refresh_embed(guild: discord.Guild, data: dict, day_num: int) -> None
 class BBFGlobalCog(commands.Cog, name="BBFGlobal"):
 
     def __init__(self, bot: commands.Bot):
-        self.bot = bot
-        self.reminder_task.start()
-        self.backup_task.start()
+        self.bot       = bot
+        self.deadlines = GuildDeadlines()
+        now = datetime.now(timezone.utc)
+        for gid in _all_configs():
+            if not self._is_home_guild(gid):
+                self.deadlines.seed(gid, now)
+        self.bot.scheduler.at(DEADLINE_JOB, self.deadlines.earliest_after, self._run_deadlines)
+        self.bot.scheduler.every(BACKUP_JOB, BACKUP_EVERY_SEC, self._backup_dirty, first_delay=BACKUP_EVERY_SEC)
+        self._wake_deadlines()
 
     def cog_unload(self):
-        self.reminder_task.cancel()
-        self.backup_task.cancel()
+        self.bot.scheduler.remove(DEADLINE_JOB)
+        self.bot.scheduler.remove(BACKUP_JOB)
+
+    def _wake_deadlines(self) -> None:
+        # Earliest deadline may be in the past (missed before restart) — then it runs at once
+        self.bot.scheduler.reschedule(DEADLINE_JOB, self.deadlines.earliest())
 
     def _is_home_guild(self, guild_id: int) -> bool:
         home = getattr(self.bot, "home_guild_id", None)
@@ -853,49 +989,67 @@ class BBFGlobalCog(commands.Cog, name="BBFGlobal"):
             except Exception as e:
                 print(f"[StarPom] Error creating channel for {day_name}: {e}")
         _save_data(gid, data)
+        self.deadlines.track(gid, data, after=datetime.now(timezone.utc))
+        self._wake_deadlines()
         await interaction.followup.send("✅ StarPom BBF registration opened!", ephemeral=True)
 
-    # ── Reminder task ─────────────────────────────────────────────────────────
+    # ── Deadlines ─────────────────────────────────────────────────────────────
+
+    async def _run_deadlines(self, due: datetime):
+        batch = self.deadlines.pop_due(datetime.now(timezone.utc))
+        if batch:
+            started = time.perf_counter()
+            sem     = asyncio.Semaphore(GUILD_CONCURRENCY)
+
+            async def _one(gid: int, kind: str, when: datetime):
+                async with sem:
+                    await self._run_guild_deadline(gid, kind, when)
+
+            await asyncio.gather(*(_one(*item) for item in batch))
+            print(f"[StarPom] Deadlines: {len(batch)} guild(s) in {time.perf_counter() - started:.2f}s")
+        self._wake_deadlines()
 
-    @tasks.loop(minutes=1)
-    async def reminder_task(self):
-        now_cest = _now_cest()
-        weekday  = now_cest.weekday()
-        if weekday not in DAY_NAMES:
+    async def _run_guild_deadline(self, gid: int, kind: str, when: datetime):
+        config = _all_configs().get(gid)
+        if config is None or self._is_home_guild(gid):
             return
         try:
-            configs = list(_get_db()["bbf_config"].find({}))
-        except Exception:
+            data = await asyncio.to_thread(_fetch_data, gid)
+        except Exception as e:
+            print(f"[StarPom] {kind} load error guild {gid}: {e}")
+            self.deadlines.defer(gid, when)
             return
-        for cfg in configs:
-            try:
-                gid = int(cfg["_id"])
-                if self._is_home_guild(gid):
-                    continue
-                await self._run_reminders(gid, cfg, now_cest, weekday)
-            except Exception as e:
-                print(f"[StarPom] Reminder error guild {cfg.get('_id')}: {e}")
-
-    async def _run_reminders(self, gid, config, now_cest, weekday):
-        data    = _load_data(gid)
+        try:
+            weekday = (when + CEST_OFFSET).weekday()
+            if kind == "reminder":
+                changed = await self._send_reminder(gid, data, weekday, when)
+            else:
+                changed = await self._send_invite(gid, config, data, weekday, when)
+            if changed:
+                await asyncio.to_thread(_save_data, gid, data)
+        except Exception as e:
+            print(f"[StarPom] {kind} error guild {gid}: {e}")
+        self.deadlines.track(gid, data, after=when)
+
+    async def _day_context(self, gid: int, data: dict, weekday: int, when: datetime):
+        """(guild, thread, active_uids) for the day, or None if there is nowhere to post."""
         day_key = str(weekday)
         if day_key not in data.get("week", {}):
-            return
+            return None
         guild = self.bot.get_guild(gid)
         if not guild:
-            return
+            return None
         thread_id = data.get("thread_ids", {}).get(day_key)
         if not thread_id:
-            return
+            return None
         thread = guild.get_channel(int(thread_id))
         if not thread:
             try:
                 thread = await guild.fetch_channel(int(thread_id))
             except Exception:
-                return
-        day_data  = data["week"][day_key]
-        main_uids = [e["uid"] for e in day_data["main"]]
-        today     = now_cest.replace(hour=0, minute=0, second=0, microsecond=0)
+                return None
+        main_uids = [e["uid"] for e in data["week"][day_key]["main"]]
+        today     = (when + CEST_OFFSET).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
 
         def _is_on_vacation(uid):
             vac = data.get("vacations", {}).get(uid)
@@ -908,67 +1062,83 @@ class BBFGlobalCog(commands.Cog, name="BBFGlobal"):
             except Exception:
                 return False
 
-        active_uids = [uid for uid in main_uids if not _is_on_vacation(uid)]
-
-        if now_cest.hour == REMINDER_HOUR_CEST and now_cest.minute == REMINDER_MINUTE_CEST and not data.get("reminded", {}).get(day_key):
-            if active_uids:
-                mentions  = " ".join(f"<@{uid}>" for uid in active_uids)
-                confirmed = data.get("confirmed", {}).get(day_key, [])
-                embed     = _build_reminder_embed(weekday, day_data, confirmed, guild, guild.me, data)
-                view      = _make_confirm_view(weekday, gid)
-                msg       = await thread.send(content=mentions, embed=embed, view=view)
-                data.setdefault("reminder_msg_ids", {})[day_key] = msg.id
-            data.setdefault("reminded", {})[day_key] = True
-            _save_data(gid, data)
+        return guild, thread, [uid for uid in main_uids if not _is_on_vacation(uid)]
 
-        if now_cest.hour == INVITE_HOUR_CEST and now_cest.minute == INVITE_MINUTE_CEST and not data.get("invited", {}).get(day_key):
-            if active_uids:
-                ts            = _get_ts_for_day(data, weekday)
-                voice_id      = config.get("voice_id")
-                voice_channel = guild.get_channel(voice_id) if voice_id else None
-                if not voice_channel and voice_id:
-                    try:
-                        voice_channel = await guild.fetch_channel(voice_id)
-                    except Exception:
-                        pass
-                vc_mention   = voice_channel.mention if voice_channel else "voice channel"
-                day_data_now = data["week"][day_key]
-                galley_uids  = [e["uid"] for e in day_data_now["main"] if e["team"] in GALLEY_TEAMS and e["uid"] in active_uids]
-                ship_entries = [e for e in day_data_now["main"] if e["team"] not in GALLEY_TEAMS and e["uid"] in active_uids]
-                galley_lines = "\n".join(f"`{i:02}.` <@{uid}>" for i, uid in enumerate(galley_uids, 1)) or "*Empty*"
-                ship_lines   = "\n".join(f"`{i:02}.` <@{e['uid']}> — *{e['team']}*" for i, e in enumerate(ship_entries, 1)) or "*Empty*"
-                msg = (
-                    f"🚢 **Gather up!**\nBBF at <t:{ts}:t>! Join: {vc_mention} 🍾⚓\n\n"
-                    f"⚓ **Galley Crew** ({len(galley_uids)}/{GALLEY_MIN}):\n"
-                    f"{' '.join(f'<@{uid}>' for uid in galley_uids)}\n{galley_lines}\n\n"
-                    f"⛵ **Fleet** ({len(ship_entries)}):\n"
-                    f"{' '.join(f'<@{e[chr(117)+chr(105)+chr(100)]}>') for e in ship_entries}\n{ship_lines}"
-                )
-                await thread.send(msg)
-            data.setdefault("invited", {})[day_key] = True
-            _save_data(gid, data)
+    async def _send_reminder(self, gid: int, data: dict, weekday: int, when: datetime) -> bool:
+        day_key = str(weekday)
+        if data.get("reminded", {}).get(day_key):
+            return False
+        ctx = await self._day_context(gid, data, weekday, when)
+        if ctx is None:
+            return False
+        guild, thread, active_uids = ctx
+        if active_uids:
+            day_data  = data["week"][day_key]
+            mentions  = " ".join(f"<@{uid}>" for uid in active_uids)
+            confirmed = data.get("confirmed", {}).get(day_key, [])
+            embed     = _build_reminder_embed(weekday, day_data, confirmed, guild, guild.me, data)
+            view      = _make_confirm_view(weekday, gid)
+            msg       = await thread.send(content=mentions, embed=embed, view=view)
+            data.setdefault("reminder_msg_ids", {})[day_key] = msg.id
+        data.setdefault("reminded", {})[day_key] = True
+        return True
+
+    async def _send_invite(self, gid: int, config: dict, data: dict, weekday: int, when: datetime) -> bool:
+        day_key = str(weekday)
+        if data.get("invited", {}).get(day_key):
+            return False
+        ctx = await self._day_context(gid, data, weekday, when)
+        if ctx is None:
+            return False
+        guild, thread, active_uids = ctx
+        if active_uids:
+            ts            = _get_ts_for_day(data, weekday)
+            voice_id      = config.get("voice_id")
+            voice_channel = guild.get_channel(voice_id) if voice_id else None
+            if not voice_channel and voice_id:
+                try:
+                    voice_channel = await guild.fetch_channel(voice_id)
+                except Exception:
+                    pass
+            vc_mention   = voice_channel.mention if voice_channel else "voice channel"
+            day_data_now = data["week"][day_key]
+            galley_uids  = [e["uid"] for e in day_data_now["main"] if e["team"] in GALLEY_TEAMS and e["uid"] in active_uids]
+            ship_entries = [e for e in day_data_now["main"] if e["team"] not in GALLEY_TEAMS and e["uid"] in active_uids]
+            galley_lines = "\n".join(f"`{i:02}.` <@{uid}>" for i, uid in enumerate(galley_uids, 1)) or "*Empty*"
+            ship_lines   = "\n".join(f"`{i:02}.` <@{e['uid']}> — *{e['team']}*" for i, e in enumerate(ship_entries, 1)) or "*Empty*"
+            ship_mentions = " ".join(f"<@{e['uid']}>" for e in ship_entries)
+            msg = (
+                f"🚢 **Gather up!**\nBBF at <t:{ts}:t>! Join: {vc_mention} 🍾⚓\n\n"
+                f"⚓ **Galley Crew** ({len(galley_uids)}/{GALLEY_MIN}):\n"
+                f"{' '.join(f'<@{uid}>' for uid in galley_uids)}\n{galley_lines}\n\n"
+                f"⛵ **Fleet** ({len(ship_entries)}):\n"
+                f"{ship_mentions}\n{ship_lines}"
+            )
+            await thread.send(msg)
+        data.setdefault("invited", {})[day_key] = True
+        return True
 
-    @reminder_task.before_loop
-    async def before_reminder(self):
-        await self.bot.wait_until_ready()
+    # ── Backups ───────────────────────────────────────────────────────────────
 
-    @tasks.loop(minutes=15)
-    async def backup_task(self):
-        try:
-            configs = list(_get_db()["bbf_config"].find({}, {"_id": 1}))
-        except Exception:
-            return
-        for cfg in configs:
-            gid = int(cfg["_id"])
+    async def _backup_dirty(self, due: datetime):
+        global _dirty_guilds
+        dirty, _dirty_guilds = _dirty_guilds, set()
+        sem = asyncio.Semaphore(GUILD_CONCURRENCY)
+
+        async def _one(gid: int):
             if self._is_home_guild(gid):
-                continue
-            data = _load_data(gid)
-            if data.get("week"):
-                _save_backup(gid, data)
+                return
+            async with sem:
+                try:
+                    data = await asyncio.to_thread(_fetch_data, gid)
+                except Exception as e:
+                    print(f"[StarPom] Backup load error guild {gid}: {e}")
+                    _dirty_guilds.add(gid)
+                    return
+                if data.get("week"):
+                    await asyncio.to_thread(_save_backup, gid, data)
 
-    @backup_task.before_loop
-    async def before_backup(self):
-        await self.bot.wait_until_ready()
+        await asyncio.gather(*(_one(gid) for gid in dirty))
 
     # ── Commands ──────────────────────────────────────────────────────────────
 
@@ -1147,6 +1317,8 @@ class BBFGlobalCog(commands.Cog, name="BBFGlobal"):
             await interaction.followup.send(f"❌ Backup `{backup_id}` not found.", ephemeral=True)
             return
         _save_data(gid, data)
+        self.deadlines.track(gid, data, after=datetime.now(timezone.utc))
+        self._wake_deadlines()
         await interaction.followup.send(f"✅ Data restored from `{backup_id}`!\nUse `/bbf_refresh` to update embeds.", ephemeral=True)
 
     @app_commands.command(name="bbf_migrate", description="[Admin] Fix auto_galley for existing data")
@@ -1241,10 +1413,8 @@ async def setup(bot: commands.Bot) -> None:
     print("[COG] StarPom BBFGlobalCog loaded")
     try:
         home_gid   = getattr(bot, "home_guild_id", None)
-        configs    = list(_get_db()["bbf_config"].find({}))
         registered = 0
-        for cfg in configs:
-            gid = int(cfg["_id"])
+        for gid, cfg in _all_configs().items():
             if home_gid and gid == home_gid:
                 print(f"[StarPom] Skipping home guild {gid} (handled by bbf_cog.py)")
                 continue
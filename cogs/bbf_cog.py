@@ -2,35 +2,26 @@
 # bbf_cog.py
 
 import asyncio
+import copy
+import functools
+import itertools
 import json
 import os
 import random
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
-from pymongo import MongoClient
+from discord.ext import commands
+from pymongo import MongoClient, ReplaceOne
 
 # ─── Налаштування ────────────────────────────────────────────────────────────
 
-_mongo_client = None
-_mongo_db     = None
-
-def _get_db():
-    global _mongo_client, _mongo_db
-    if _mongo_db is None:
-        url = os.environ.get("MONGODB_URL", "")
-        if not url:
-            print("[BBF][ERROR] MONGODB_URL не задано!")
-        else:
-            print(f"[BBF] Підключаємось до MongoDB...")
-        _mongo_client = MongoClient(url, serverSelectionTimeoutMS=10000)
-        _mongo_db = _mongo_client["silentconcierge"]
-        print(f"[BBF] MongoDB підключено: {_mongo_db.name}")
-    return _mongo_db
-
 MAX_SPOTS                = 20
 GALLEY_MIN               = 8
 THREAD_PARENT_CHANNEL_ID = 1486067779177152523
@@ -38,6 +29,15 @@ BBF_CATEGORY_ID          = 1486067160555065425
 VOICE_CHANNEL_ID         = 1506463961984274462
 BBF_ROLE_ID              = 1470790564718055434
 
+MONGO_DB_NAME     = "silentconcierge"
+MONGO_POOL_SIZE   = 4     # і потоків, і з'єднань з MongoDB
+BACKUPS_KEEP      = 48    # скільки чекпойнтів тримати; журнал старший за найстаріший — видаляється
+
+# Чекпойнт знімається, коли в журналі набралось стільки змін або минув цей час
+CHECKPOINT_MIN_CHANGES = 100
+CHECKPOINT_MAX_AGE     = timedelta(hours=6)
+BACKUP_ID_FORMAT       = "%Y-%m-%d_%H-%M"
+
 REMINDER_HOUR_UTC    = 17
 REMINDER_MINUTE_UTC  = 30
 INVITE_HOUR_UTC      = 17
@@ -48,6 +48,20 @@ BBF_START_MINUTE_UTC = 0
 # Неділя після цього часу UTC = старт на наступний тиждень
 SUNDAY_RESET_HOUR_UTC = 21
 
+# Вікно злиття оновлень ембеду дня (сек)
+REFRESH_DEBOUNCE_SEC = 2.0
+
+# Черга сповіщень (DM / пінги в гілках)
+NOTIFY_WORKERS       = 4
+NOTIFY_QUEUE_MAX     = 1000
+NOTIFY_MAX_ATTEMPTS  = 4
+NOTIFY_BACKOFF_BASE  = 1.0    # сек; далі ×2 на кожну спробу
+NOTIFY_ROUTE_SPACING = 0.25   # мін. інтервал між відправками в одному маршруті (сек)
+
+# Job'и спільного планувальника (bot.scheduler)
+BBF_JOBS         = ("bbf:reminder", "bbf:invite", "bbf:backup")
+BACKUP_EVERY_SEC = 15 * 60
+
 DAY_NAMES = {
     0: "Понеділок",
     1: "Вівторок",
@@ -86,6 +100,36 @@ def _get_week_dates() -> dict[int, datetime]:
     return dates
 
 
+def _next_bbf_instant(after: datetime, hour: int, minute: int) -> datetime:
+    """Найближчий момент hour:minute UTC у день BBF, строго після `after`."""
+    moment = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if moment <= after:
+        moment += timedelta(days=1)
+    while moment.weekday() not in DAY_NAMES:
+        moment += timedelta(days=1)
+    return moment
+
+
+def _time_until_start(hour: int, minute: int) -> timedelta:
+    """Скільки від hour:minute до старту BBF — вікно, в якому ще є сенс наздоганяти."""
+    return (
+        timedelta(hours=BBF_START_HOUR_UTC, minutes=BBF_START_MINUTE_UTC)
+        - timedelta(hours=hour, minutes=minute)
+    )
+
+
+def _is_on_vacation(uid: str, data: dict, check_date: datetime) -> bool:
+    vac = data.get("vacations", {}).get(uid)
+    if not vac:
+        return False
+    try:
+        start = datetime.fromisoformat(vac["start"]).replace(tzinfo=timezone.utc)
+        end   = datetime.fromisoformat(vac["end"]).replace(tzinfo=timezone.utc)
+        return start <= check_date <= end
+    except Exception:
+        return False
+
+
 def _bbf_timestamp(day_date: datetime) -> int:
     target = day_date.replace(
         hour=BBF_START_HOUR_UTC,
@@ -94,18 +138,460 @@ def _bbf_timestamp(day_date: datetime) -> int:
     )
     return int(target.timestamp())
 
-# ─── Збереження / завантаження ───────────────────────────────────────────────
+# ─── Сховище (async) ─────────────────────────────────────────────────────────
+
+# Колекція `bbf` розбита на окремі документи, щоб клік на один день
+# не переписував увесь тиждень:
+#   {"_id": "main"}     — службові поля (message_ids, thread_ids, reminded, ...)
+#   {"_id": "day:<N>"}  — склад одного дня (main / waitlist / vacation / cant)
+#   {"_id": "points"}   — {"points": {uid: n}}
+
+MAIN_DOC_ID    = "main"
+POINTS_DOC_ID  = "points"
+DAY_DOC_PREFIX = "day:"
+DAY_FIELDS     = ("main", "waitlist", "vacation", "cant")
 
-def _load_data() -> dict:
+
+def _day_doc_id(day_key: str) -> str:
+    return f"{DAY_DOC_PREFIX}{day_key}"
+
+
+def _is_legacy_doc(main_doc: dict | None) -> bool:
+    return bool(main_doc) and ("week" in main_doc or "points" in main_doc)
+
+
+def _split_data(data: dict) -> dict[str, dict]:
+    meta = {k: v for k, v in data.items() if k not in ("week", "points", "_id")}
+    docs = {
+        MAIN_DOC_ID:   {"_id": MAIN_DOC_ID, **meta},
+        POINTS_DOC_ID: {"_id": POINTS_DOC_ID, "points": data.get("points", {})},
+    }
+    for day_key, day_data in data.get("week", {}).items():
+        doc_id = _day_doc_id(str(day_key))
+        docs[doc_id] = {"_id": doc_id, **{f: day_data.get(f, []) for f in DAY_FIELDS}}
+    return docs
+
+
+def _assemble_docs(docs: dict[str, dict]) -> dict:
+    main_doc = dict(docs.get(MAIN_DOC_ID) or {})
+    main_doc.pop("_id", None)
+    week   = main_doc.pop("week", {})
+    points = main_doc.pop("points", {})
+
+    day_docs = {k: v for k, v in docs.items() if k.startswith(DAY_DOC_PREFIX)}
+    if day_docs:
+        week = {
+            doc_id[len(DAY_DOC_PREFIX):]: {f: doc.get(f, []) for f in DAY_FIELDS}
+            for doc_id, doc in sorted(day_docs.items())
+        }
+    if POINTS_DOC_ID in docs:
+        points = docs[POINTS_DOC_ID].get("points", {})
+
+    return {**main_doc, "week": week, "points": points}
+
+
+def _apply_update(doc: dict, update: dict) -> None:
+    """Мінімальний інтерпретатор $set/$unset/$inc/$push/$pull (InMemoryBBFRepository, replay журналу)."""
+    def _parent(path: str) -> tuple[dict, str]:
+        *parts, last = path.split(".")
+        node = doc
+        for part in parts:
+            node = node.setdefault(part, {})
+        return node, last
+
+    for path, value in update.get("$set", {}).items():
+        node, key = _parent(path)
+        node[key] = value
+    for path in update.get("$unset", {}):
+        node, key = _parent(path)
+        node.pop(key, None)
+    for path, value in update.get("$inc", {}).items():
+        node, key = _parent(path)
+        node[key] = node.get(key, 0) + value
+    for path, value in update.get("$push", {}).items():
+        node, key = _parent(path)
+        node.setdefault(key, []).append(value)
+    for path, value in update.get("$pull", {}).items():
+        node, key = _parent(path)
+        node[key] = [v for v in node.get(key, []) if v != value]
+
+
+# ─── Журнал змін ─────────────────────────────────────────────────────────────
+#
+# Кожен write-through (`update`) дописується в `bbf_journal` як
+# {"ts": ..., "doc_id": ..., "update": {...}}. Повні збереження і періодичний
+# bbf:backup знімають чекпойнт у `bbf_backups` (старий формат бекапу).
+# Відновлення на момент T = останній чекпойнт до T + replay журналу до T.
+
+def _ts_key(dt: datetime) -> str:
+    """Сортувальний рядок часу (UTC, мікросекунди) для журналу."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _checkpoint_doc(data: dict, ts: str) -> dict:
+    """`_id` = ts: два чекпойнти в одну хвилину не перезаписують один одного."""
+    moment = datetime.fromisoformat(ts).replace(tzinfo=timezone.utc)
+    return {"_id": ts, "timestamp": moment.isoformat(), "ts": ts, **data}
+
+
+def _checkpoint_key(checkpoint: dict) -> str:
+    if checkpoint.get("ts"):
+        return checkpoint["ts"]
     try:
-        db  = _get_db()
-        doc = db["bbf"].find_one({"_id": "main"})
-        if doc:
-            doc.pop("_id", None)
-            print(f"[BBF] Дані завантажено з MongoDB. Днів: {len(doc.get('week', {}))}")
-            return doc
+        return _ts_key(datetime.fromisoformat(checkpoint["timestamp"]))
+    except Exception:
+        return _ts_key(datetime.strptime(checkpoint["_id"], BACKUP_ID_FORMAT).replace(tzinfo=timezone.utc))
+
+
+class _JournalClock:
+    """
+    Видає ts записів журналу синхронно, в момент виклику `update()`, і строго за зростанням.
+    `last_journal_ts` — ts останнього виданого запису: чекпойнт, знятий після нього,
+    уже містить цю зміну, тож replay починається строго після цього ts.
+    """
+
+    _last_ts: str | None = None
+
+    @property
+    def last_journal_ts(self) -> str | None:
+        return self._last_ts
+
+    def _next_ts(self) -> str:
+        ts = _ts_key(datetime.now(timezone.utc))
+        if self._last_ts is not None and ts <= self._last_ts:
+            last = datetime.fromisoformat(self._last_ts).replace(tzinfo=timezone.utc)
+            ts   = _ts_key(last + timedelta(microseconds=1))
+        self._last_ts = ts
+        return ts
+
+
+def _replay(checkpoint: dict, entries: list[dict]) -> dict:
+    base = {k: v for k, v in checkpoint.items() if k not in ("_id", "timestamp", "ts")}
+    docs = _split_data(copy.deepcopy(base))
+    for entry in entries:
+        doc = docs.setdefault(entry["doc_id"], {"_id": entry["doc_id"]})
+        _apply_update(doc, copy.deepcopy(entry["update"]))
+    return _assemble_docs(docs)
+
+
+class BBFRepository(_JournalClock):
+    """
+    Асинхронний доступ до колекцій `bbf`, `bbf_journal` та `bbf_backups`.
+    Блокуючі виклики pymongo виконуються у власному пулі потоків
+    (не в дефолтному executor discord.py), пул з'єднань обмежено тим самим розміром.
+    """
+
+    def __init__(self, url: str, db_name: str = MONGO_DB_NAME, pool_size: int = MONGO_POOL_SIZE):
+        self._url       = url
+        self._db_name   = db_name
+        self._pool_size = pool_size
+        self._executor  = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bbf-mongo")
+        self._client    = None
+        self._db        = None
+
+    def _get_db(self):
+        if self._db is None:
+            self._client = MongoClient(
+                self._url,
+                serverSelectionTimeoutMS=10000,
+                maxPoolSize=self._pool_size,
+            )
+            self._db = self._client[self._db_name]
+            self._db["bbf_journal"].create_index("ts")
+            print(f"[BBF] MongoDB підключено: {self._db.name} (pool={self._pool_size})")
+        return self._db
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    # ── bbf ──
+
+    def _load_sync(self) -> dict | None:
+        col  = self._get_db()["bbf"]
+        docs = {d["_id"]: d for d in col.find({})}
+        if _is_legacy_doc(docs.get(MAIN_DOC_ID)):
+            print("[BBF] Знайдено старий формат документа — розбиваємо по днях")
+            self._save_sync(_assemble_docs(docs))
+            docs = {d["_id"]: d for d in col.find({})}
+        return _assemble_docs(docs) if docs else None
+
+    def _save_sync(self, data: dict) -> None:
+        col  = self._get_db()["bbf"]
+        docs = _split_data(data)
+        ops  = [ReplaceOne({"_id": doc_id}, doc, upsert=True) for doc_id, doc in docs.items()]
+        col.bulk_write(ops, ordered=False)
+        col.delete_many({"_id": {"$regex": f"^{DAY_DOC_PREFIX}", "$nin": list(docs)}})
+
+    def _update_sync(self, doc_id: str, update: dict, ts: str) -> None:
+        db = self._get_db()
+        db["bbf"].update_one({"_id": doc_id}, update, upsert=True)
+        db["bbf_journal"].insert_one({"ts": ts, "doc_id": doc_id, "update": update})
+
+    def _save_and_checkpoint_sync(self, data: dict, ts: str) -> None:
+        self._save_sync(data)
+        self._checkpoint_sync(_checkpoint_doc(data, ts), BACKUPS_KEEP)
+
+    async def load(self) -> dict | None:
+        return await self._run(self._load_sync)
+
+    async def save(self, data: dict) -> None:
+        """Повне збереження — одразу і чекпойнт, журнал до нього вже не потрібен для replay."""
+        await self._run(self._save_and_checkpoint_sync, copy.deepcopy(data), self._next_ts())
+
+    async def update(self, doc_id: str, update: dict) -> None:
+        await self._run(self._update_sync, doc_id, copy.deepcopy(update), self._next_ts())
+
+    # ── bbf_backups / bbf_journal ──
+
+    def _checkpoint_sync(self, checkpoint: dict, keep: int) -> None:
+        db  = self._get_db()
+        col = db["bbf_backups"]
+        col.replace_one({"_id": checkpoint["_id"]}, checkpoint, upsert=True)
+        # Межа без вичитування всіх id: keep-й найновіший чекпойнт (старі, без ts, сортуються в кінець)
+        cutoff = list(col.find({}, {"_id": 1, "timestamp": 1, "ts": 1}).sort("ts", -1).skip(keep - 1).limit(1))
+        if cutoff and cutoff[0].get("ts"):
+            col.delete_many({"$or": [{"ts": {"$lt": cutoff[0]["ts"]}}, {"ts": {"$exists": False}}]})
+            db["bbf_journal"].delete_many({"ts": {"$lte": cutoff[0]["ts"]}})
+
+    def _changes_since_checkpoint_sync(self) -> tuple[int, str | None]:
+        db   = self._get_db()
+        last = db["bbf_backups"].find_one({}, {"_id": 1, "timestamp": 1, "ts": 1}, sort=[("ts", -1), ("_id", -1)])
+        if not last:
+            return db["bbf_journal"].estimated_document_count(), None
+        key = _checkpoint_key(last)
+        return db["bbf_journal"].count_documents({"ts": {"$gt": key}}), key
+
+    def _list_backups_sync(self, limit: int) -> list:
+        col = self._get_db()["bbf_backups"]
+        return list(col.find({}, {"_id": 1, "timestamp": 1}).sort([("ts", -1), ("_id", -1)]).limit(limit))
+
+    def _restore_at_sync(self, moment: datetime) -> dict | None:
+        db  = self._get_db()
+        col = db["bbf_backups"]
+        # Чекпойнт строго до моменту за точним ts: _id має точність хвилини й може бути пізнішим
+        candidates = [
+            col.find_one({"ts": {"$lt": _ts_key(moment)}}, sort=[("ts", -1)]),
+            col.find_one(
+                {"ts": {"$exists": False}, "_id": {"$lt": moment.strftime(BACKUP_ID_FORMAT)}}, sort=[("_id", -1)],
+            ),
+        ]
+        candidates = [c for c in candidates if c]
+        if not candidates:
+            return None
+        checkpoint = max(candidates, key=_checkpoint_key)
+        entries = db["bbf_journal"].find(
+            {"ts": {"$gt": _checkpoint_key(checkpoint), "$lt": _ts_key(moment)}},
+        ).sort([("ts", 1), ("_id", 1)])
+        return _replay(checkpoint, list(entries))
+
+    async def checkpoint(self, data: dict, keep: int = BACKUPS_KEEP, ts: str | None = None) -> None:
+        """`ts` — останній запис журналу, який уже є в `data`; без нього — поточний момент."""
+        await self._run(self._checkpoint_sync, _checkpoint_doc(copy.deepcopy(data), ts or self._next_ts()), keep)
+
+    async def changes_since_checkpoint(self) -> tuple[int, str | None]:
+        return await self._run(self._changes_since_checkpoint_sync)
+
+    async def list_backups(self, limit: int = 20) -> list:
+        return await self._run(self._list_backups_sync, limit)
+
+    async def restore_at(self, moment: datetime) -> dict | None:
+        return await self._run(self._restore_at_sync, moment)
+
+    # ── service ──
+
+    async def ping(self) -> None:
+        await self._run(lambda: self._get_db().command("ping"))
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._db     = None
+        self._executor.shutdown(wait=False)
+
+
+class InMemoryBBFRepository(_JournalClock):
+    """Тестовий дублер BBFRepository: той самий інтерфейс, дані живуть у пам'яті."""
+
+    def __init__(self, initial: dict | None = None):
+        self._docs    = _split_data(initial) if initial is not None else {}
+        self._journal = []
+        self._backups = {}
+
+    async def load(self) -> dict | None:
+        return _assemble_docs(copy.deepcopy(self._docs)) if self._docs else None
+
+    async def save(self, data: dict) -> None:
+        self._docs = copy.deepcopy(_split_data(data))
+        await self.checkpoint(data)
+
+    async def update(self, doc_id: str, update: dict) -> None:
+        doc = self._docs.setdefault(doc_id, {"_id": doc_id})
+        _apply_update(doc, copy.deepcopy(update))
+        self._journal.append({"ts": self._next_ts(), "doc_id": doc_id, "update": copy.deepcopy(update)})
+
+    async def checkpoint(self, data: dict, keep: int = BACKUPS_KEEP, ts: str | None = None) -> None:
+        cp = _checkpoint_doc(copy.deepcopy(data), ts or self._next_ts())
+        self._backups[cp["_id"]] = cp
+        kept = sorted(self._backups, key=lambda i: _checkpoint_key(self._backups[i]), reverse=True)[:keep]
+        for old_id in set(self._backups) - set(kept):
+            del self._backups[old_id]
+        oldest_key    = _checkpoint_key(self._backups[kept[-1]])
+        self._journal = [e for e in self._journal if e["ts"] > oldest_key]
+
+    async def changes_since_checkpoint(self) -> tuple[int, str | None]:
+        if not self._backups:
+            return len(self._journal), None
+        key = max(_checkpoint_key(b) for b in self._backups.values())
+        return sum(1 for e in self._journal if e["ts"] > key), key
+
+    async def list_backups(self, limit: int = 20) -> list:
+        return [
+            {"_id": b["_id"], "timestamp": b.get("timestamp")}
+            for b in sorted(self._backups.values(), key=_checkpoint_key, reverse=True)[:limit]
+        ]
+
+    async def restore_at(self, moment: datetime) -> dict | None:
+        hi     = _ts_key(moment)
+        legacy = moment.strftime(BACKUP_ID_FORMAT)
+        before = [
+            b for i, b in self._backups.items()
+            if (b["ts"] < hi if b.get("ts") else i < legacy)
+        ]
+        if not before:
+            return None
+        checkpoint = max(before, key=_checkpoint_key)
+        lo = _checkpoint_key(checkpoint)
+        return _replay(checkpoint, [e for e in self._journal if lo < e["ts"] < hi])
+
+    async def ping(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+_repo: BBFRepository | InMemoryBBFRepository | None = None
+
+def _get_repo() -> BBFRepository | InMemoryBBFRepository:
+    global _repo
+    if _repo is None:
+        url = os.environ.get("MONGODB_URL", "")
+        if not url:
+            print("[BBF][ERROR] MONGODB_URL не задано!")
         else:
-            print("[BBF] MongoDB: даних немає, повертаємо порожні")
+            print(f"[BBF] Підключаємось до MongoDB...")
+        _repo = BBFRepository(url)
+    return _repo
+
+
+def _set_repo(repo: BBFRepository | InMemoryBBFRepository | None) -> None:
+    """Підміняє сховище (наприклад, на InMemoryBBFRepository для локальних прогонів)."""
+    global _repo, _state
+    if _repo is not None and _repo is not repo:
+        _repo.close()
+    _repo  = repo
+    _state = None
+
+# ─── Кеш стану ───────────────────────────────────────────────────────────────
+
+class BBFStateCache:
+    """
+    Живий стан BBF у пам'яті з write-through у сховище.
+    Мутації одного дня серіалізуються через `locked(day_key)`,
+    тож два одночасні кліки не перезаписують склад один одного.
+    """
+
+    def __init__(self, repo: BBFRepository | InMemoryBBFRepository):
+        self._repo      = repo
+        self._data      = None
+        self._load_lock = asyncio.Lock()
+        self._day_locks: dict[str, asyncio.Lock] = {}
+
+        self.hits            = 0
+        self.misses          = 0
+        self.lock_acquires   = 0
+        self.lock_contended  = 0
+        self.lock_wait_total = 0.0
+        self.lock_wait_max   = 0.0
+
+    async def get(self) -> dict:
+        if self._data is not None:
+            self.hits += 1
+            return self._data
+        async with self._load_lock:
+            if self._data is not None:
+                self.hits += 1
+                return self._data
+            self.misses += 1
+            doc = await self._repo.load()
+            if doc:
+                print(f"[BBF] Дані завантажено з MongoDB. Днів: {len(doc.get('week', {}))}")
+            else:
+                print("[BBF] MongoDB: даних немає, повертаємо порожні")
+            self._data = _rosters_from_plain(doc) if doc else _empty_data()
+            return self._data
+
+    async def replace(self, data: dict) -> None:
+        self._data = _rosters_from_plain(data)
+        await self._repo.save(_plain_copy(data))
+
+    def invalidate(self) -> None:
+        self._data = None
+
+    @asynccontextmanager
+    async def locked(self, day_key: str):
+        lock = self._day_locks.setdefault(str(day_key), asyncio.Lock())
+        started = time.perf_counter()
+        contended = lock.locked()
+        async with lock:
+            waited = time.perf_counter() - started
+            self.lock_acquires   += 1
+            self.lock_contended  += int(contended)
+            self.lock_wait_total += waited
+            self.lock_wait_max    = max(self.lock_wait_max, waited)
+            yield await self.get()
+
+    async def snapshot(self) -> tuple[dict, str | None]:
+        """
+        Копія стану для чекпойнту і ts останнього запису журналу, що в ній є.
+        Береться під усіма локами днів: мутація складу та її запис у журнал
+        відбуваються під одним локом, тож зміна без запису в копію не потрапить.
+        """
+        async with AsyncExitStack() as stack:
+            for day_key in sorted(self._day_locks):
+                await stack.enter_async_context(self._day_locks[day_key])
+            data = await self.get()
+            return _plain_copy(data), self._repo.last_journal_ts
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits":             self.hits,
+            "misses":           self.misses,
+            "hit_ratio":        round(self.hits / total, 3) if total else 0.0,
+            "lock_acquires":    self.lock_acquires,
+            "lock_contended":   self.lock_contended,
+            "lock_wait_avg_ms": round(self.lock_wait_total / self.lock_acquires * 1000, 2) if self.lock_acquires else 0.0,
+            "lock_wait_max_ms": round(self.lock_wait_max * 1000, 2),
+        }
+
+
+_state: BBFStateCache | None = None
+
+def _get_state() -> BBFStateCache:
+    global _state
+    if _state is None:
+        _state = BBFStateCache(_get_repo())
+    return _state
+
+# ─── Збереження / завантаження ───────────────────────────────────────────────
+
+async def _load_data() -> dict:
+    """Живий стан з кешу. Мутації дня робимо під `_get_state().locked(day_key)`."""
+    try:
+        return await _get_state().get()
     except Exception as e:
         print(f"[BBF][ERROR] MongoDB load error: {type(e).__name__}: {e}")
     return _empty_data()
@@ -129,22 +615,52 @@ def _empty_data() -> dict:
     }
 
 
-def _save_data(data: dict) -> None:
+async def _save_data(data: dict) -> None:
     try:
-        db = _get_db()
-        db["bbf"].replace_one({"_id": "main"}, {"_id": "main", **data}, upsert=True)
+        await _get_state().replace(data)
+        _get_fragments().clear()
         print(f"[BBF] Дані збережено в MongoDB")
     except Exception as e:
         print(f"[BBF][ERROR] MongoDB save error: {type(e).__name__}: {e}")
 
 
-def _empty_day() -> dict:
-    return {
-        "main":     [],
-        "waitlist": [],
-        "vacation": [],
-        "cant":     [],
-    }
+async def _update_doc(doc_id: str, update: dict) -> None:
+    # Кеш уже змінено викликачем — тут тільки write-through у сховище
+    try:
+        await _get_repo().update(doc_id, update)
+        print(f"[BBF] Оновлено {doc_id}: {', '.join(update)}")
+    except Exception as e:
+        print(f"[BBF][ERROR] MongoDB update error ({doc_id}): {type(e).__name__}: {e}")
+
+
+async def _save_day(day_key: str, day_data: "DayRoster") -> None:
+    # Усі зміни складу проходять тут — нова версія скидає кеш полів ембеду
+    day_data.touch()
+    await _update_doc(_day_doc_id(day_key), {"$set": day_data.to_dict()})
+
+
+async def _set_points(uid: str, value: int) -> None:
+    _get_fragments().points_changed(uid)
+    await _update_doc(POINTS_DOC_ID, {"$set": {f"points.{uid}": value}})
+
+
+async def _inc_points(uid: str, delta: int = 1) -> None:
+    _get_fragments().points_changed(uid)
+    await _update_doc(POINTS_DOC_ID, {"$inc": {f"points.{uid}": delta}})
+
+
+async def _clear_points(uids: list[str]) -> None:
+    for uid in uids:
+        _get_fragments().points_changed(uid)
+    await _update_doc(POINTS_DOC_ID, {"$set": {"points": {}}})
+
+
+async def _update_meta(update: dict) -> None:
+    await _update_doc(MAIN_DOC_ID, update)
+
+
+def _empty_day() -> "DayRoster":
+    return DayRoster()
 
 
 def _pick_image(data: dict, day_key: str) -> str:
@@ -160,83 +676,325 @@ def _pick_image(data: dict, day_key: str) -> str:
     data.setdefault("day_images", {})[day_key] = chosen
     return chosen
 
-# ─── Допоміжні функції ───────────────────────────────────────────────────────
+# ─── Склад дня ───────────────────────────────────────────────────────────────
+
+_ROSTER_VERSIONS = itertools.count(1)
+
+
+class DayRoster:
+    """
+    Склад одного дня BBF з індексом uid → запис.
+    main / waitlist — OrderedDict у порядку реєстрації: пошук, видалення і
+    просування з вейтингу за O(1); кількість галерників підтримується
+    при кожній зміні команди. main обмежено MAX_SPOTS, тож проходи по ньому
+    (пошук кандидата на галеру) мають сталу вартість незалежно від вейтингу.
+    У базі зберігається у старому JSON-форматі — див. from_dict / to_dict.
+    version — глобально унікальний номер ревізії (для кешу фрагментів ембеду).
+    """
+
+    __slots__ = ("main", "waitlist", "vacation", "cant", "galley_count", "version")
+
+    def __init__(self):
+        self.main:     OrderedDict[str, dict] = OrderedDict()
+        self.waitlist: OrderedDict[str, dict] = OrderedDict()
+        self.vacation: dict[str, None] = {}
+        self.cant:     dict[str, None] = {}
+        self.galley_count = 0
+        self.version      = next(_ROSTER_VERSIONS)
+
+    def touch(self) -> None:
+        self.version = next(_ROSTER_VERSIONS)
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "DayRoster":
+        roster = cls()
+        for entry in raw.get("main", []):
+            roster.add_main(entry)
+        for entry in raw.get("waitlist", []):
+            roster.waitlist[entry["uid"]] = entry
+        roster.vacation = dict.fromkeys(raw.get("vacation", []))
+        roster.cant     = dict.fromkeys(raw.get("cant", []))
+        return roster
+
+    def to_dict(self) -> dict:
+        return {
+            "main":     list(self.main.values()),
+            "waitlist": list(self.waitlist.values()),
+            "vacation": list(self.vacation),
+            "cant":     list(self.cant),
+        }
+
+    @property
+    def ship_count(self) -> int:
+        return len(self.main) - self.galley_count
 
-def _get_entry(day_data: dict, uid: str) -> dict | None:
-    for e in day_data["main"] + day_data["waitlist"]:
-        if e["uid"] == uid:
-            return e
-    return None
+    def galley_entries(self) -> list[dict]:
+        return [e for e in self.main.values() if e["team"] in GALLEY_TEAMS]
 
+    def ship_entries(self) -> list[dict]:
+        return [e for e in self.main.values() if e["team"] not in GALLEY_TEAMS]
 
-def _get_status(day_data: dict, uid: str) -> str | None:
-    for e in day_data["main"]:
-        if e["uid"] == uid:
+    def status(self, uid: str) -> str | None:
+        if uid in self.main:
             return "main"
-    for e in day_data["waitlist"]:
-        if e["uid"] == uid:
+        if uid in self.waitlist:
             return "waitlist"
-    if uid in day_data["vacation"]:
-        return "vacation"
-    if uid in day_data["cant"]:
-        return "cant"
-    return None
-
-
-def _remove_uid(day_data: dict, uid: str) -> str | None:
-    prev = _get_status(day_data, uid)
-    day_data["main"]     = [e for e in day_data["main"]     if e["uid"] != uid]
-    day_data["waitlist"] = [e for e in day_data["waitlist"] if e["uid"] != uid]
-    if uid in day_data["vacation"]:
-        day_data["vacation"].remove(uid)
-    if uid in day_data["cant"]:
-        day_data["cant"].remove(uid)
-    return prev
-
+        if uid in self.vacation:
+            return "vacation"
+        if uid in self.cant:
+            return "cant"
+        return None
 
-def _galley_count(day_data: dict) -> int:
-    return sum(1 for e in day_data["main"] if e["team"] in GALLEY_TEAMS)
+    def entry(self, uid: str) -> dict | None:
+        return self.main.get(uid) or self.waitlist.get(uid)
 
+    def waitlist_position(self, uid: str) -> int | None:
+        for i, waiting_uid in enumerate(self.waitlist, 1):
+            if waiting_uid == uid:
+                return i
+        return None
 
-def _promote_from_waitlist(day_data: dict) -> str | None:
-    if len(day_data["main"]) < MAX_SPOTS and day_data["waitlist"]:
-        entry = day_data["waitlist"].pop(0)
+    def add_main(self, entry: dict) -> None:
+        self.main[entry["uid"]] = entry
+        if entry["team"] in GALLEY_TEAMS:
+            self.galley_count += 1
+
+    def add_waitlist(self, entry: dict) -> int:
+        self.waitlist[entry["uid"]] = entry
+        return len(self.waitlist)
+
+    def set_team(self, entry: dict, team: str, auto_galley: bool | None = None) -> None:
+        was_galley    = entry["team"] in GALLEY_TEAMS
+        entry["team"] = team
+        if auto_galley is not None:
+            entry["auto_galley"] = auto_galley
+        if entry["uid"] in self.main:
+            self.galley_count += (team in GALLEY_TEAMS) - was_galley
+
+    def remove(self, uid: str) -> str | None:
+        prev  = self.status(uid)
+        entry = self.main.pop(uid, None)
+        if entry is not None and entry["team"] in GALLEY_TEAMS:
+            self.galley_count -= 1
+        self.waitlist.pop(uid, None)
+        self.vacation.pop(uid, None)
+        self.cant.pop(uid, None)
+        return prev
+
+    def first_auto_galley(self) -> dict | None:
+        for entry in self.main.values():
+            if entry.get("auto_galley") and entry["team"] in GALLEY_TEAMS:
+                return entry
+        return None
 
-        galley_now     = _galley_count(day_data)
-        is_real_galley = entry["team"] in GALLEY_TEAMS
+    def promote_from_waitlist(self) -> str | None:
+        if len(self.main) >= MAX_SPOTS or not self.waitlist:
+            return None
+        _, entry = self.waitlist.popitem(last=False)
 
-        if galley_now < GALLEY_MIN and not is_real_galley:
+        if self.galley_count < GALLEY_MIN and entry["team"] not in GALLEY_TEAMS:
             entry["original_team"] = entry["team"]
             entry["team"]          = GALLEY_TEAMS[0]
             entry["auto_galley"]   = True
         else:
             entry["auto_galley"] = False
 
-        day_data["main"].append(entry)
+        self.add_main(entry)
         return entry["uid"]
-    return None
 
-
-def _refill_galley(day_data: dict) -> str | None:
-    galley_now = _galley_count(day_data)
-    if galley_now >= GALLEY_MIN:
+    def refill_galley(self) -> str | None:
+        if self.galley_count >= GALLEY_MIN:
+            return None
+        for entry in reversed(self.main.values()):
+            if entry["team"] not in GALLEY_TEAMS and not entry.get("auto_galley"):
+                entry["original_team"] = entry["team"]
+                self.set_team(entry, GALLEY_TEAMS[0], auto_galley=True)
+                return entry["uid"]
         return None
-    for entry in reversed(day_data["main"]):
-        if entry["team"] not in GALLEY_TEAMS and not entry.get("auto_galley"):
-            entry["original_team"] = entry["team"]
-            entry["team"]          = GALLEY_TEAMS[0]
-            entry["auto_galley"]   = True
-            return entry["uid"]
-    return None
 
 
-async def _try_send_dm(guild: discord.Guild, uid: str, msg: str) -> None:
-    try:
-        member = guild.get_member(int(uid))
-        if member:
-            await member.send(msg)
-    except Exception:
-        pass
+def _rosters_from_plain(data: dict) -> dict:
+    """Перетворює week з JSON-форми на DayRoster (на місці)."""
+    data["week"] = {
+        str(k): v if isinstance(v, DayRoster) else DayRoster.from_dict(v)
+        for k, v in data.get("week", {}).items()
+    }
+    return data
+
+
+def _plain_copy(data: dict) -> dict:
+    """Глибока копія стану у JSON-формі (для MongoDB / бекапів)."""
+    plain = {k: v for k, v in data.items() if k != "week"}
+    plain["week"] = {
+        k: v.to_dict() if isinstance(v, DayRoster) else v
+        for k, v in data.get("week", {}).items()
+    }
+    return copy.deepcopy(plain)
+
+# ─── Черга сповіщень ─────────────────────────────────────────────────────────
+
+class NotificationQueue:
+    """
+    Фонова черга сповіщень BBF (DM і пінги в гілках).
+    Обробники лише ставлять сповіщення в чергу й одразу повертаються.
+    NOTIFY_WORKERS воркерів шлють паралельно; в межах одного маршруту ("dm" або
+    "channel:<id>") — не частіше ніж раз на NOTIFY_ROUTE_SPACING, а 429 з retry_after
+    відсуває весь маршрут. Тимчасові помилки повторюються з експоненційною затримкою.
+    """
+
+    def __init__(self, workers: int = NOTIFY_WORKERS, maxsize: int = NOTIFY_QUEUE_MAX):
+        self._workers_max = workers
+        self._maxsize     = maxsize
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._retries: set[asyncio.TimerHandle] = set()
+        self._route_next: dict[str, float] = {}
+        self._closed      = False
+
+        self.enqueued  = 0
+        self.sent      = 0
+        self.skipped   = 0   # адресата немає на сервері
+        self.forbidden = 0   # DM закриті / нема прав
+        self.retried   = 0
+        self.failed    = 0
+        self.dropped   = 0   # черга переповнена
+        self._latency_total = 0.0
+
+    def dm(self, guild: discord.Guild, uid: str, text: str) -> None:
+        async def send() -> bool:
+            member = guild.get_member(int(uid))
+            if member is None:
+                return False
+            await member.send(text)
+            return True
+        self._put(("dm", send, f"dm:{uid}", 0, time.monotonic()))
+
+    def post(self, channel: discord.abc.Messageable, content: str) -> None:
+        async def send() -> bool:
+            await channel.send(content)
+            return True
+        route = f"channel:{channel.id}"
+        self._put((route, send, route, 0, time.monotonic()))
+
+    def _put(self, item: tuple) -> None:
+        if self._closed:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._workers = [t for t in self._workers if not t.done()]
+        while len(self._workers) < self._workers_max:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"[BBF][WARN] Черга сповіщень переповнена — {item[2]} відкинуто")
+            return
+        if item[3] == 0:
+            self.enqueued += 1
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                self.failed += 1
+                print(f"[BBF][ERROR] Сповіщення {item[2]}: {type(e).__name__}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item: tuple) -> None:
+        route, send, label, attempt, enqueued_at = item
+        loop = asyncio.get_running_loop()
+
+        # Резервуємо слот маршруту до першого await — воркери не наздоганяють один одного
+        now   = loop.time()
+        ready = max(now, self._route_next.get(route, 0.0))
+        self._route_next[route] = ready + NOTIFY_ROUTE_SPACING
+        if ready > now:
+            await asyncio.sleep(ready - now)
+
+        retry_after = None
+        try:
+            delivered = await send()
+        except discord.Forbidden:
+            self.forbidden += 1
+            return
+        except discord.RateLimited as e:
+            retry_after = e.retry_after
+        except discord.HTTPException as e:
+            if e.status != 429 and e.status < 500:
+                self.failed += 1
+                print(f"[BBF][WARN] Сповіщення {label}: HTTP {e.status} {e.text}")
+                return
+            retry_after = getattr(e, "retry_after", None)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        else:
+            if delivered:
+                self.sent += 1
+                self._latency_total += time.monotonic() - enqueued_at
+            else:
+                self.skipped += 1
+            return
+
+        if retry_after:
+            self._route_next[route] = max(self._route_next.get(route, 0.0), loop.time() + retry_after)
+        if attempt + 1 >= NOTIFY_MAX_ATTEMPTS:
+            self.failed += 1
+            print(f"[BBF][WARN] Сповіщення {label}: вичерпано {NOTIFY_MAX_ATTEMPTS} спроби")
+            return
+
+        self.retried += 1
+        delay = retry_after or NOTIFY_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.8, 1.2)
+        self._schedule_retry(delay, (route, send, label, attempt + 1, enqueued_at))
+
+    def _schedule_retry(self, delay: float, item: tuple) -> None:
+        def fire() -> None:
+            self._retries.discard(handle)
+            self._put(item)
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self._retries.add(handle)
+
+    def close(self) -> None:
+        self._closed = True
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "enqueued":       self.enqueued,
+            "sent":           self.sent,
+            "skipped":        self.skipped,
+            "forbidden":      self.forbidden,
+            "retried":        self.retried,
+            "failed":         self.failed,
+            "dropped":        self.dropped,
+            "pending":        self._queue.qsize() if self._queue else 0,
+            "latency_avg_ms": round(self._latency_total / self.sent * 1000, 1) if self.sent else 0.0,
+        }
+
+
+_notifier: NotificationQueue | None = None
+
+def _get_notifier() -> NotificationQueue:
+    global _notifier
+    if _notifier is None or _notifier._closed:
+        _notifier = NotificationQueue()
+    return _notifier
+
+
+def _notify_dms(guild: discord.Guild, dms: list[tuple[str, str]]) -> None:
+    notifier = _get_notifier()
+    for uid, text in dms:
+        notifier.dm(guild, uid, text)
 
 # ─── Побудова ембедів ────────────────────────────────────────────────────────
 
@@ -251,9 +1009,111 @@ def _get_ts_for_day(data: dict, day_num: int) -> int:
     return _bbf_timestamp(day_date)
 
 
+class EmbedFragments:
+    """
+    Мемоізовані фрагменти ембедів BBF.
+    Рядок учасника (ім'я, команда, бейдж очок) кешується за (uid, team, auto, pts),
+    готове значення поля — за (версія складу, версія очок, версія імен).
+    Імена скидаються подіями rename / leave, очки — _set_points / _inc_points,
+    усе разом — повним збереженням (_save_data).
+    """
+
+    def __init__(self):
+        self._names:  dict[str, str] = {}
+        self._lines:  dict[tuple, str] = {}
+        self._fields: dict[tuple, tuple[tuple, str]] = {}
+        self.points_version = 0
+        self.names_version  = 0
+        self.field_hits     = 0
+        self.field_misses   = 0
+        self.builds         = 0
+        self.build_ms       = 0.0
+        self.build_max_ms   = 0.0
+
+    def name(self, guild: discord.Guild, uid: str) -> str:
+        name = self._names.get(uid)
+        if name is None:
+            member = guild.get_member(int(uid))
+            name   = member.mention if member else f"<@{uid}>"
+            self._names[uid] = name
+        return name
+
+    def entry_line(self, guild: discord.Guild, kind: str, entry: dict, points: dict) -> str:
+        """Рядок учасника без номера; kind — galley / ship / wait."""
+        uid  = entry["uid"]
+        pts  = points.get(uid, 0)
+        key  = (uid, kind, entry["team"], bool(entry.get("auto_galley")), pts)
+        line = self._lines.get(key)
+        if line is None:
+            pts_str = f" `[{pts}🏅]`" if pts > 0 else ""
+            if kind == "galley":
+                auto_mark = " *(авто)*" if entry.get("auto_galley") else ""
+                line = f"{self.name(guild, uid)}{pts_str}{auto_mark}"
+            else:
+                line = f"{self.name(guild, uid)} — *{entry['team']}*{pts_str}"
+            self._lines[key] = line
+        return line
+
+    def field(self, day_key: str, kind: str, version, build) -> str:
+        stamp  = (version, self.points_version, self.names_version)
+        cached = self._fields.get((day_key, kind))
+        if cached is not None and cached[0] == stamp:
+            self.field_hits += 1
+            return cached[1]
+        self.field_misses += 1
+        value = build()
+        self._fields[(day_key, kind)] = (stamp, value)
+        return value
+
+    def _drop_lines(self, uid: str) -> None:
+        self._lines = {k: v for k, v in self._lines.items() if k[0] != uid}
+
+    def forget_member(self, uid: str) -> None:
+        self._names.pop(uid, None)
+        self._drop_lines(uid)
+        self.names_version += 1
+
+    def points_changed(self, uid: str) -> None:
+        self._drop_lines(uid)
+        self.points_version += 1
+
+    def clear(self) -> None:
+        self._names.clear()
+        self._lines.clear()
+        self._fields.clear()
+        self.points_version += 1
+        self.names_version  += 1
+
+    def record_build(self, elapsed_ms: float) -> None:
+        self.builds      += 1
+        self.build_ms    += elapsed_ms
+        self.build_max_ms = max(self.build_max_ms, elapsed_ms)
+
+    def stats(self) -> dict:
+        total = self.field_hits + self.field_misses
+        return {
+            "field_hits":   self.field_hits,
+            "field_misses": self.field_misses,
+            "hit_ratio":    round(self.field_hits / total, 3) if total else 0.0,
+            "cached_lines": len(self._lines),
+            "builds":       self.builds,
+            "build_avg_ms": round(self.build_ms / self.builds, 3) if self.builds else 0.0,
+            "build_max_ms": round(self.build_max_ms, 3),
+        }
+
+
+_fragments: EmbedFragments | None = None
+
+def _get_fragments() -> EmbedFragments:
+    global _fragments
+    if _fragments is None:
+        _fragments = EmbedFragments()
+    return _fragments
+
+
 def _build_embed(
     day_num: int,
-    day_data: dict,
+    day_data: DayRoster,
     points: dict,
     guild: discord.Guild,
     bot_user: discord.ClientUser,
@@ -276,38 +1136,33 @@ def _build_embed(
         color=discord.Color.from_rgb(45, 60, 110),
     )
 
-    galley_main = [e for e in day_data["main"] if e["team"] in GALLEY_TEAMS]
-    ship_main   = [e for e in day_data["main"] if e["team"] not in GALLEY_TEAMS]
-    total_main  = len(day_data["main"])
+    frags       = _get_fragments()
+    started     = time.perf_counter()
+    galley_main = day_data.galley_entries()
+    ship_main   = day_data.ship_entries()
+    total_main  = len(day_data.main)
 
-    galley_lines = []
-    for i, entry in enumerate(galley_main, 1):
-        member = guild.get_member(int(entry["uid"]))
-        name   = member.mention if member else f"<@{entry['uid']}>"
-        pts    = points.get(entry["uid"], 0)
-        pts_str   = f" `[{pts}🏅]`" if pts > 0 else ""
-        auto_mark = " *(авто)*" if entry.get("auto_galley") else ""
-        galley_lines.append(f"`{i:02}.` {name}{pts_str}{auto_mark}")
+    galley_value = frags.field(day_key, "galley", day_data.version, lambda: "\n".join(
+        f"`{i:02}.` {frags.entry_line(guild, 'galley', entry, points)}"
+        for i, entry in enumerate(galley_main, 1)
+    ) or "*Поки порожньо*")
 
     galley_need   = max(0, GALLEY_MIN - len(galley_main))
     galley_status = f" ⚠️ ще потрібно {galley_need}" if galley_need > 0 else " ✅"
     embed.add_field(
         name=f"🚢 Галера ({len(galley_main)}/{GALLEY_MIN}){galley_status}",
-        value="\n".join(galley_lines) if galley_lines else "*Поки порожньо*",
+        value=galley_value,
         inline=False,
     )
 
-    ship_lines = []
-    for i, entry in enumerate(ship_main, 1):
-        member = guild.get_member(int(entry["uid"]))
-        name   = member.mention if member else f"<@{entry['uid']}>"
-        pts    = points.get(entry["uid"], 0)
-        pts_str = f" `[{pts}🏅]`" if pts > 0 else ""
-        ship_lines.append(f"`{i:02}.` {name} — *{entry['team']}*{pts_str}")
+    ship_value = frags.field(day_key, "ship", day_data.version, lambda: "\n".join(
+        f"`{i:02}.` {frags.entry_line(guild, 'ship', entry, points)}"
+        for i, entry in enumerate(ship_main, 1)
+    ) or "*Поки порожньо*")
 
     embed.add_field(
         name=f"⛵ Всі кораблі ({len(ship_main)})",
-        value="\n".join(ship_lines) if ship_lines else "*Поки порожньо*",
+        value=ship_value,
         inline=False,
     )
 
@@ -318,31 +1173,29 @@ def _build_embed(
         inline=False,
     )
 
-    if day_data["waitlist"]:
-        wait_lines = []
-        for i, entry in enumerate(day_data["waitlist"], 1):
-            member = guild.get_member(int(entry["uid"]))
-            name   = member.mention if member else f"<@{entry['uid']}>"
-            pts    = points.get(entry["uid"], 0)
-            pts_str = f" `[{pts}🏅]`" if pts > 0 else ""
-            wait_lines.append(f"`{i}.` {name} — *{entry['team']}*{pts_str}")
+    if day_data.waitlist:
+        wait_value = frags.field(day_key, "wait", day_data.version, lambda: "\n".join(
+            f"`{i}.` {frags.entry_line(guild, 'wait', entry, points)}"
+            for i, entry in enumerate(day_data.waitlist.values(), 1)
+        ))
         embed.add_field(
-            name=f"⏳ Вейтинг ліст ({len(day_data['waitlist'])})",
-            value="\n".join(wait_lines),
+            name=f"⏳ Вейтинг ліст ({len(day_data.waitlist)})",
+            value=wait_value,
             inline=False,
         )
 
-    if day_data["vacation"]:
-        vac_names = []
-        for uid in day_data["vacation"]:
-            member = guild.get_member(int(uid))
-            vac_names.append(member.mention if member else f"<@{uid}>")
+    if day_data.vacation:
+        vac_value = frags.field(day_key, "vacation", day_data.version, lambda: "\n".join(
+            frags.name(guild, uid) for uid in day_data.vacation
+        ))
         embed.add_field(
-            name=f"🛟 Відпустка ({len(day_data['vacation'])})",
-            value="\n".join(vac_names),
+            name=f"🛟 Відпустка ({len(day_data.vacation)})",
+            value=vac_value,
             inline=False,
         )
 
+    frags.record_build((time.perf_counter() - started) * 1000)
+
     if image_path:
         embed.set_image(url=f"attachment://{Path(image_path).name}")
 
@@ -355,7 +1208,7 @@ def _build_embed(
 
 def _build_reminder_embed(
     day_num: int,
-    day_data: dict,
+    day_data: DayRoster,
     confirmed_uids: list,
     guild: discord.Guild,
     bot_user: discord.ClientUser,
@@ -372,14 +1225,14 @@ def _build_reminder_embed(
         color=discord.Color.from_rgb(180, 30, 30),
     )
 
-    main_uids       = [e["uid"] for e in day_data["main"]]
+    frags           = _get_fragments()
+    confirmed_set   = set(confirmed_uids)
     confirmed_lines = []
     waiting_lines   = []
 
-    for uid in main_uids:
-        member = guild.get_member(int(uid))
-        name   = member.mention if member else f"<@{uid}>"
-        if uid in confirmed_uids:
+    for uid in day_data.main:
+        name = frags.name(guild, uid)
+        if uid in confirmed_set:
             confirmed_lines.append(f"✅ {name}")
         else:
             waiting_lines.append(f"⏳ {name}")
@@ -418,28 +1271,34 @@ def _make_confirm_view(day_num: int) -> discord.ui.View:
             custom_id=f"bbf_confirm_{day_num}",
         )
         async def btn_confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-            data    = _load_data()
             day_key = str(day_num)
             uid     = str(interaction.user.id)
 
-            day_data = data.get("week", {}).get(day_key)
-            if not day_data or _get_status(day_data, uid) != "main":
+            async with _get_state().locked(day_key) as data:
+                day_data = data.get("week", {}).get(day_key)
+                if not day_data or day_data.status(uid) != "main":
+                    outcome = "not_main"
+                else:
+                    confirmed = data.setdefault("confirmed", {}).setdefault(day_key, [])
+                    if uid in confirmed:
+                        outcome = "already"
+                    else:
+                        confirmed.append(uid)
+                        await _update_meta({"$push": {f"confirmed.{day_key}": uid}})
+                        outcome = "ok"
+
+            if outcome == "not_main":
                 await interaction.response.send_message(
                     "ℹ️ Ти не в основному списку на цей день.", ephemeral=True
                 )
                 return
-
-            confirmed = data.setdefault("confirmed", {}).setdefault(day_key, [])
-            if uid in confirmed:
+            if outcome == "already":
                 await interaction.response.send_message(
                     "✅ Ти вже підтвердив участь! Вдалого бою, капітане! 🍾",
                     ephemeral=True,
                 )
                 return
 
-            confirmed.append(uid)
-            _save_data(data)
-
             await interaction.response.send_message(
                 "✅ Зафіксовано! Ти протиснувся на Морську Битву! Вдалого бою! ⚔️🍾",
                 ephemeral=True,
@@ -513,7 +1372,7 @@ class VacationModal(discord.ui.Modal, title="🛟 Відпустка"):
             )
             return
 
-        data = _load_data()
+        data = await _load_data()
         uid  = str(interaction.user.id)
 
         vacations = data.setdefault("vacations", {})
@@ -521,25 +1380,26 @@ class VacationModal(discord.ui.Modal, title="🛟 Відпустка"):
             "start": start.strftime("%Y-%m-%d"),
             "end":   end.strftime("%Y-%m-%d"),
         }
+        await _update_meta({"$set": {f"vacations.{uid}": vacations[uid]}})
 
         week = data.get("week", {})
         week_dates = data.get("week_dates", {})
         marked_days = []
 
-        for day_key, day_data in week.items():
+        for day_key in list(week.keys()):
             date_str = week_dates.get(day_key)
             if not date_str:
                 continue
             day_date = datetime.fromisoformat(date_str).replace(tzinfo=timezone.utc)
             if start <= day_date <= end:
-                _remove_uid(day_data, uid)
-                if uid not in day_data["vacation"]:
-                    day_data["vacation"].append(uid)
+                async with _get_state().locked(day_key) as data:
+                    day_data = data["week"][day_key]
+                    day_data.remove(uid)
+                    day_data.vacation[uid] = None
+                    await _save_day(day_key, day_data)
                 day_num = int(day_key)
                 marked_days.append(DAY_NAMES.get(day_num, day_key))
 
-        _save_data(data)
-
         start_str = f"{int(self.start_day.value):02}.{int(self.start_month.value):02}"
         end_str   = f"{int(self.end_day.value):02}.{int(self.end_month.value):02}"
 
@@ -562,7 +1422,7 @@ class VacationModal(discord.ui.Modal, title="🛟 Відпустка"):
                 continue
             day_date = datetime.fromisoformat(date_str).replace(tzinfo=timezone.utc)
             if start <= day_date <= end:
-                await _refresh_embed(guild, data, int(day_key))
+                _schedule_refresh(guild, int(day_key))
 
 
 class TeamSelectView(discord.ui.View):
@@ -602,7 +1462,7 @@ def _make_persistent_view(day_num: int) -> discord.ui.View:
                     "❌ У тебе немає доступу до реєстрації на BBF.", ephemeral=True
                 )
                 return
-            data    = _load_data()
+            data    = await _load_data()
             day_key = str(day_num)
 
             week = data.get("week", {})
@@ -675,38 +1535,52 @@ async def _process_registration(
 ) -> None:
     await interaction.response.defer(ephemeral=True)
 
-    data    = _load_data()
     day_key = str(day_num)
-    points  = data.get("points", {})
+    uid     = str(interaction.user.id)
+    guild   = interaction.guild
+    print(f"[BBF] Реєстрація: user={interaction.user} day={day_num} team={chosen_team}")
+
+    async with _get_state().locked(day_key) as data:
+        if day_key not in data.get("week", {}):
+            reply, dms = None, []
+        else:
+            reply, dms = await _apply_registration(data, guild, day_num, uid, chosen_team)
 
-    if day_key not in data.get("week", {}):
+    if reply is None:
         await interaction.followup.send("❌ Реєстрація на цей день недоступна.", ephemeral=True)
         return
 
+    _notify_dms(guild, dms)
+    _schedule_refresh(guild, day_num)
+    await interaction.followup.send(reply, ephemeral=True)
+
+
+async def _apply_registration(
+    data: dict,
+    guild: discord.Guild,
+    day_num: int,
+    uid: str,
+    chosen_team: str,
+) -> tuple[str, list[tuple[str, str]]]:
+    """Мутує склад дня під локом і зберігає його. Повертає (відповідь, [(uid, текст DM)])."""
+    day_key     = str(day_num)
+    points      = data.get("points", {})
     day_data    = data["week"][day_key]
-    uid         = str(interaction.user.id)
-    prev_status = _get_status(day_data, uid)
-    print(f"[BBF] Реєстрація: user={interaction.user} day={day_num} team={chosen_team} prev={prev_status}")
+    prev_status = day_data.status(uid)
+    dms: list[tuple[str, str]] = []
 
     if prev_status in ("main", "waitlist"):
-        target_list = day_data["main"] if prev_status == "main" else day_data["waitlist"]
-        for entry in target_list:
-            if entry["uid"] == uid:
-                entry["original_team"] = chosen_team
-                if not entry.get("auto_galley"):
-                    entry["team"] = chosen_team
-                break
-        _save_data(data)
+        entry = day_data.entry(uid)
+        entry["original_team"] = chosen_team
+        if not entry.get("auto_galley"):
+            day_data.set_team(entry, chosen_team)
+        await _save_day(day_key, day_data)
         location = "основному списку" if prev_status == "main" else "вейтинг листі"
-        await interaction.followup.send(
-            f"✅ Твою команду оновлено на **{chosen_team}** (у {location}).", ephemeral=True
-        )
-        await _refresh_embed(interaction.guild, data, day_num)
-        return
+        return f"✅ Твою команду оновлено на **{chosen_team}** (у {location}).", dms
 
-    _remove_uid(day_data, uid)
+    day_data.remove(uid)
 
-    total_main = len(day_data["main"])
+    total_main = len(day_data.main)
 
     if total_main >= MAX_SPOTS:
         entry = {
@@ -715,21 +1589,19 @@ async def _process_registration(
             "original_team": chosen_team,
             "auto_galley": False,
         }
-        day_data["waitlist"].append(entry)
+        pos = day_data.add_waitlist(entry)
         points[uid] = points.get(uid, 0) + 1
-        pos = len(day_data["waitlist"])
         pts = points[uid]
         data["points"] = points
-        _save_data(data)
-        await interaction.followup.send(
+        await _save_day(day_key, day_data)
+        await _inc_points(uid, 1)
+        reply = (
             f"⏳ Усі {MAX_SPOTS} місць зайняті. Ти #{pos} у вейтинг листі на **{DAY_NAMES[day_num]}** "
-            f"— команда **{chosen_team}**.\n🏅 Твої очки пріоритету: **{pts}**",
-            ephemeral=True,
+            f"— команда **{chosen_team}**.\n🏅 Твої очки пріоритету: **{pts}**"
         )
-        await _refresh_embed(interaction.guild, data, day_num)
-        return
+        return reply, dms
 
-    galley_now     = _galley_count(day_data)
+    galley_now     = day_data.galley_count
     is_real_galley = chosen_team in GALLEY_TEAMS
 
     if galley_now < GALLEY_MIN:
@@ -739,10 +1611,11 @@ async def _process_registration(
             "original_team": chosen_team,
             "auto_galley": not is_real_galley,
         }
-        day_data["main"].append(entry)
+        day_data.add_main(entry)
         points[uid] = 0
         data["points"] = points
-        _save_data(data)
+        await _save_day(day_key, day_data)
+        await _set_points(uid, 0)
 
         if is_real_galley:
             reply = (
@@ -758,17 +1631,11 @@ async def _process_registration(
             )
 
     else:
-        evict_index = None
-        for i, e in enumerate(day_data["main"]):
-            if e.get("auto_galley") and e["team"] in GALLEY_TEAMS:
-                evict_index = i
-                break
-
-        if evict_index is not None:
-            evicted          = day_data["main"][evict_index]
+        evicted = day_data.first_auto_galley()
+
+        if evicted is not None:
             evicted_original = evicted["original_team"]
-            evicted["team"]       = evicted_original
-            evicted["auto_galley"] = False
+            day_data.set_team(evicted, evicted_original, auto_galley=False)
 
             new_entry = {
                 "uid": uid,
@@ -776,18 +1643,19 @@ async def _process_registration(
                 "original_team": chosen_team,
                 "auto_galley": not is_real_galley,
             }
-            day_data["main"].append(new_entry)
+            day_data.add_main(new_entry)
             points[uid] = 0
             data["points"] = points
-            _save_data(data)
+            await _save_day(day_key, day_data)
+            await _set_points(uid, 0)
 
-            await _try_send_dm(
-                interaction.guild, evicted["uid"],
+            dms.append((
+                evicted["uid"],
                 f"⛵ Новий учасник зайшов на Галеру — тебе переведено до **{evicted_original}** "
-                f"на BBF ({DAY_NAMES[day_num]}). Вдалого бою!"
-            )
+                f"на BBF ({DAY_NAMES[day_num]}). Вдалого бою!",
+            ))
 
-            evicted_member = interaction.guild.get_member(int(evicted["uid"]))
+            evicted_member = guild.get_member(int(evicted["uid"]))
             evicted_name   = evicted_member.display_name if evicted_member else f"<@{evicted['uid']}>"
 
             if is_real_galley:
@@ -809,10 +1677,11 @@ async def _process_registration(
                 "original_team": chosen_team,
                 "auto_galley": False,
             }
-            day_data["main"].append(new_entry)
+            day_data.add_main(new_entry)
             points[uid] = 0
             data["points"] = points
-            _save_data(data)
+            await _save_day(day_key, day_data)
+            await _set_points(uid, 0)
 
             if is_real_galley:
                 reply = (
@@ -826,8 +1695,7 @@ async def _process_registration(
                     f"(«Всі кораблі») на **{DAY_NAMES[day_num]}**. Очки скинуто до 0."
                 )
 
-    await interaction.followup.send(reply, ephemeral=True)
-    await _refresh_embed(interaction.guild, data, day_num)
+    return reply, dms
 
 
 async def _handle_action(
@@ -837,95 +1705,126 @@ async def _handle_action(
 ) -> None:
     await interaction.response.defer(ephemeral=True)
 
-    data    = _load_data()
     day_key = str(day_num)
+    uid     = str(interaction.user.id)
+    guild   = interaction.guild
+
+    async with _get_state().locked(day_key) as data:
+        if day_key not in data.get("week", {}):
+            msg, dms, changed = None, [], False
+        else:
+            msg, dms, changed = await _apply_action(data, guild, day_num, uid, action)
 
-    if day_key not in data.get("week", {}):
+    if msg is None:
         await interaction.followup.send("❌ Реєстрація на цей день недоступна.", ephemeral=True)
         return
 
+    _notify_dms(guild, dms)
+    if changed:
+        _schedule_refresh(guild, day_num)
+    await interaction.followup.send(msg, ephemeral=True)
+
+
+ACTION_REPLIES = {
+    "cancel":   "⚓ Твою участь на **{day}** скасовано. Очки збережено.",
+    "cant":     "⛵ Відмічено як «Не буду» на **{day}**.",
+    "vacation": "🛟 Відмічено як «Відпустка» на **{day}**.",
+}
+
+
+async def _apply_action(
+    data: dict,
+    guild: discord.Guild,
+    day_num: int,
+    uid: str,
+    action: str,
+) -> tuple[str, list[tuple[str, str]], bool]:
+    """Мутує склад дня під локом і зберігає його. Повертає (відповідь, [(uid, текст DM)], чи змінено)."""
+    day_key     = str(day_num)
     day_data    = data["week"][day_key]
-    uid         = str(interaction.user.id)
-    prev_status = _get_status(day_data, uid)
+    prev_status = day_data.status(uid)
 
-    if action == "cancel":
-        if prev_status is None:
-            await interaction.followup.send(
-                "ℹ️ Ти не зареєстрований на цей день.", ephemeral=True
-            )
-            return
-        _remove_uid(day_data, uid)
-        promoted_uid    = _promote_from_waitlist(day_data) if prev_status == "main" else None
-        galley_back_uid = _refill_galley(day_data) if prev_status == "main" else None
-        _save_data(data)
-        msg = f"⚓ Твою участь на **{DAY_NAMES[day_num]}** скасовано. Очки збережено."
-        if promoted_uid:
-            m     = interaction.guild.get_member(int(promoted_uid))
-            pname = m.mention if m else f"<@{promoted_uid}>"
-            msg  += f"\n🛶 {pname} автоматично переміщено з вейтингу!"
-            await _try_send_dm(interaction.guild, promoted_uid,
-                f"🛶 Місце звільнилось! Тебе переведено в основний список BBF на **{DAY_NAMES[day_num]}**. Вдалого бою!")
-        if galley_back_uid:
-            m     = interaction.guild.get_member(int(galley_back_uid))
-            pname = m.mention if m else f"<@{galley_back_uid}>"
-            msg  += f"\n⚓ {pname} повернуто на Галеру!"
-            await _try_send_dm(interaction.guild, galley_back_uid,
-                f"⚓ Місце на Галері звільнилось — тебе повернуто на **Екіпаж Галери** на BBF ({DAY_NAMES[day_num]}). Вдалого бою!")
-        await interaction.followup.send(msg, ephemeral=True)
-
-    elif action == "cant":
-        _remove_uid(day_data, uid)
-        day_data["cant"].append(uid)
-        promoted_uid    = _promote_from_waitlist(day_data) if prev_status == "main" else None
-        galley_back_uid = _refill_galley(day_data) if prev_status == "main" else None
-        _save_data(data)
-        msg = f"⛵ Відмічено як «Не буду» на **{DAY_NAMES[day_num]}**."
-        if promoted_uid:
-            m     = interaction.guild.get_member(int(promoted_uid))
-            pname = m.mention if m else f"<@{promoted_uid}>"
-            msg  += f"\n🛶 {pname} автоматично переміщено з вейтингу!"
-            await _try_send_dm(interaction.guild, promoted_uid,
-                f"🛶 Місце звільнилось! Тебе переведено в основний список BBF на **{DAY_NAMES[day_num]}**. Вдалого бою!")
-        if galley_back_uid:
-            m     = interaction.guild.get_member(int(galley_back_uid))
-            pname = m.mention if m else f"<@{galley_back_uid}>"
-            msg  += f"\n⚓ {pname} повернуто на Галеру!"
-            await _try_send_dm(interaction.guild, galley_back_uid,
-                f"⚓ Місце на Галері звільнилось — тебе повернуто на **Екіпаж Галери** на BBF ({DAY_NAMES[day_num]}). Вдалого бою!")
-        await interaction.followup.send(msg, ephemeral=True)
+    if action == "cancel" and prev_status is None:
+        return "ℹ️ Ти не зареєстрований на цей день.", [], False
 
+    day_data.remove(uid)
+    if action == "cant":
+        day_data.cant[uid] = None
     elif action == "vacation":
-        _remove_uid(day_data, uid)
-        day_data["vacation"].append(uid)
-        promoted_uid    = _promote_from_waitlist(day_data) if prev_status == "main" else None
-        galley_back_uid = _refill_galley(day_data) if prev_status == "main" else None
-        _save_data(data)
-        msg = f"🛟 Відмічено як «Відпустка» на **{DAY_NAMES[day_num]}**."
-        if promoted_uid:
-            m     = interaction.guild.get_member(int(promoted_uid))
-            pname = m.mention if m else f"<@{promoted_uid}>"
-            msg  += f"\n🛶 {pname} автоматично переміщено з вейтингу!"
-            await _try_send_dm(interaction.guild, promoted_uid,
-                f"🛶 Місце звільнилось! Тебе переведено в основний список BBF на **{DAY_NAMES[day_num]}**. Вдалого бою!")
-        if galley_back_uid:
-            m     = interaction.guild.get_member(int(galley_back_uid))
-            pname = m.mention if m else f"<@{galley_back_uid}>"
-            msg  += f"\n⚓ {pname} повернуто на Галеру!"
-            await _try_send_dm(interaction.guild, galley_back_uid,
-                f"⚓ Місце на Галері звільнилось — тебе повернуто на **Екіпаж Галери** на BBF ({DAY_NAMES[day_num]}). Вдалого бою!")
-        await interaction.followup.send(msg, ephemeral=True)
-
-    await _refresh_embed(interaction.guild, data, day_num)
+        day_data.vacation[uid] = None
+
+    promoted_uid    = day_data.promote_from_waitlist() if prev_status == "main" else None
+    galley_back_uid = day_data.refill_galley() if prev_status == "main" else None
+    await _save_day(day_key, day_data)
+
+    msg = ACTION_REPLIES[action].format(day=DAY_NAMES[day_num])
+    dms: list[tuple[str, str]] = []
+    if promoted_uid:
+        m     = guild.get_member(int(promoted_uid))
+        pname = m.mention if m else f"<@{promoted_uid}>"
+        msg  += f"\n🛶 {pname} автоматично переміщено з вейтингу!"
+        dms.append((promoted_uid,
+            f"🛶 Місце звільнилось! Тебе переведено в основний список BBF на **{DAY_NAMES[day_num]}**. Вдалого бою!"))
+    if galley_back_uid:
+        m     = guild.get_member(int(galley_back_uid))
+        pname = m.mention if m else f"<@{galley_back_uid}>"
+        msg  += f"\n⚓ {pname} повернуто на Галеру!"
+        dms.append((galley_back_uid,
+            f"⚓ Місце на Галері звільнилось — тебе повернуто на **Екіпаж Галери** на BBF ({DAY_NAMES[day_num]}). Вдалого бою!"))
+    return msg, dms, True
+
+
+# ─── Оновлення ембедів ───────────────────────────────────────────────────────
+
+class EmbedRefresher:
+    """
+    Зливає оновлення ембеду дня в одне REST-редагування.
+    Усі `schedule()` для одного (guild, day) у вікні `delay` секунд дають один edit;
+    об'єкт Message кешується, а вже завантажена картинка не перезаливається.
+    """
+
+    def __init__(self, delay: float = REFRESH_DEBOUNCE_SEC):
+        self.delay     = delay
+        self._pending: dict[tuple[int, str], asyncio.Task] = {}
+        self._messages: dict[tuple[int, str], discord.Message] = {}
+
+        self.requested = 0
+        self.performed = 0
+        self.uploads   = 0
+
+    def schedule(self, guild: discord.Guild, day_num: int) -> None:
+        key = (guild.id, str(day_num))
+        self.requested += 1
+        if key in self._pending:
+            return
+        self._pending[key] = asyncio.create_task(self._run_later(key, guild, day_num))
 
+    async def _run_later(self, key: tuple[int, str], guild: discord.Guild, day_num: int) -> None:
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            # Знімаємо до редагування: клік під час edit запланує ще одне оновлення
+            self._pending.pop(key, None)
+        data = await _load_data()
+        await self.refresh_now(guild, data, day_num)
+
+    def cancel_all(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+
+    async def _get_message(self, guild: discord.Guild, data: dict, day_num: int) -> discord.Message | None:
+        day_key   = str(day_num)
+        thread_id = data.get("thread_ids", {}).get(day_key)
+        msg_id    = data.get("message_ids", {}).get(day_key)
+        if not msg_id:
+            print(f"[BBF] _refresh_embed: немає message_id для дня {day_num}")
+            return None
+
+        cached = self._messages.get((guild.id, day_key))
+        if cached is not None and cached.id == int(msg_id):
+            return cached
 
-async def _refresh_embed(guild: discord.Guild, data: dict, day_num: int) -> None:
-    day_key   = str(day_num)
-    thread_id = data.get("thread_ids", {}).get(day_key)
-    msg_id    = data.get("message_ids", {}).get(day_key)
-    if not msg_id:
-        print(f"[BBF] _refresh_embed: немає message_id для дня {day_num}")
-        return
-    try:
         if thread_id:
             channel = guild.get_channel(int(thread_id))
             if not channel:
@@ -939,83 +1838,156 @@ async def _refresh_embed(guild: discord.Guild, data: dict, day_num: int) -> None
             channel    = guild.get_channel(int(channel_id)) if channel_id else None
         if not channel:
             print(f"[BBF] _refresh_embed: канал не знайдено для дня {day_num}")
-            return
+            return None
 
         try:
             msg_obj = await channel.fetch_message(int(msg_id))
         except discord.NotFound:
             print(f"[BBF] Повідомлення {msg_id} не знайдено в каналі {channel.id} — пропускаємо")
-            return
+            return None
         except Exception as e:
             print(f"[BBF] Помилка fetch_message {msg_id}: {e}")
-            return
+            return None
 
-        image_path = data.get("day_images", {}).get(day_key)
-        embed = _build_embed(
-            day_num, data["week"][day_key],
-            data.get("points", {}), guild, guild.me, image_path, data,
-        )
-        view = _make_persistent_view(day_num)
+        self._messages[(guild.id, day_key)] = msg_obj
+        return msg_obj
 
-        if image_path and Path(image_path).exists():
-            try:
-                file = discord.File(image_path, filename=Path(image_path).name)
-                await msg_obj.edit(embed=embed, view=view, attachments=[file])
-                print(f"[BBF] Ембед дня {day_num} оновлено з картинкою")
+    async def refresh_now(self, guild: discord.Guild, data: dict, day_num: int) -> None:
+        day_key = str(day_num)
+        try:
+            msg_obj = await self._get_message(guild, data, day_num)
+            if msg_obj is None:
                 return
-            except Exception as e:
-                print(f"[BBF] Картинка не завантажилась ({e}), пробуємо без...")
 
-        await msg_obj.edit(embed=embed, view=view)
-        print(f"[BBF] Ембед дня {day_num} оновлено без картинки")
+            image_path = data.get("day_images", {}).get(day_key)
+            embed = _build_embed(
+                day_num, data["week"][day_key],
+                data.get("points", {}), guild, guild.me, image_path, data,
+            )
+            view = _make_persistent_view(day_num)
 
-    except Exception as e:
-        print(f"[BBF] Помилка оновлення ембеду дня {day_num}: {type(e).__name__}: {e}")
+            # Картинка вже є у вкладеннях — embed посилається на неї через attachment://
+            filename = Path(image_path).name if image_path else None
+            uploaded = filename and any(a.filename == filename for a in msg_obj.attachments)
+
+            edited = None
+            if image_path and not uploaded and Path(image_path).exists():
+                try:
+                    file   = discord.File(image_path, filename=filename)
+                    edited = await msg_obj.edit(embed=embed, view=view, attachments=[file])
+                    self.uploads += 1
+                    print(f"[BBF] Ембед дня {day_num} оновлено з картинкою")
+                except Exception as e:
+                    print(f"[BBF] Картинка не завантажилась ({e}), пробуємо без...")
+
+            if edited is None:
+                edited = await msg_obj.edit(embed=embed, view=view)
+                print(f"[BBF] Ембед дня {day_num} оновлено")
+
+            self.performed += 1
+            self._messages[(guild.id, day_key)] = edited or msg_obj
+
+        except discord.NotFound:
+            self._messages.pop((guild.id, day_key), None)
+            print(f"[BBF] Повідомлення дня {day_num} зникло — скидаємо кеш")
+        except Exception as e:
+            print(f"[BBF] Помилка оновлення ембеду дня {day_num}: {type(e).__name__}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "requested": self.requested,
+            "performed": self.performed,
+            "uploads":   self.uploads,
+            "pending":   len(self._pending),
+        }
+
+
+_refresher: EmbedRefresher | None = None
+
+def _get_refresher() -> EmbedRefresher:
+    global _refresher
+    if _refresher is None:
+        _refresher = EmbedRefresher()
+    return _refresher
+
+
+def _schedule_refresh(guild: discord.Guild, day_num: int) -> None:
+    """Відкладене оновлення ембеду дня (злиття сплеску кліків в один edit)."""
+    _get_refresher().schedule(guild, day_num)
+
+
+async def _refresh_embed(guild: discord.Guild, data: dict, day_num: int) -> None:
+    """Негайне оновлення ембеду дня (офіцерські команди)."""
+    await _get_refresher().refresh_now(guild, data, day_num)
 
 # ─── Cog ─────────────────────────────────────────────────────────────────────
 
 class BBFCog(commands.Cog, name="BBF"):
 
     def __init__(self, bot: commands.Bot):
-        self.bot = bot
+        self.bot       = bot
+        self.state     = _get_state()
+        self.refresher = _get_refresher()
+        self.notifier  = _get_notifier()
         self._register_views()
-        self.reminder_task.start()
-        self.backup_task.start()
+        self._schedule_jobs()
 
     def cog_unload(self):
-        self.reminder_task.cancel()
-        self.backup_task.cancel()
+        for name in BBF_JOBS:
+            self.bot.scheduler.remove(name)
+        self.refresher.cancel_all()
+        self.notifier.close()
+        _set_repo(None)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name:
+            _get_fragments().forget_member(str(after.id))
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        _get_fragments().forget_member(str(member.id))
 
     def _register_views(self):
         for day_num in DAY_NAMES.keys():
             self.bot.add_view(_make_persistent_view(day_num))
             self.bot.add_view(_make_confirm_view(day_num))
 
-    @tasks.loop(minutes=1)
-    async def reminder_task(self):
-        now     = datetime.now(timezone.utc)
-        weekday = now.weekday()
-
-        if weekday not in DAY_NAMES:
-            return
+    def _schedule_jobs(self):
+        sched = self.bot.scheduler
+        sched.at(
+            "bbf:reminder",
+            functools.partial(_next_bbf_instant, hour=REMINDER_HOUR_UTC, minute=REMINDER_MINUTE_UTC),
+            self._send_reminder,
+            grace=_time_until_start(REMINDER_HOUR_UTC, REMINDER_MINUTE_UTC),
+        )
+        sched.at(
+            "bbf:invite",
+            functools.partial(_next_bbf_instant, hour=INVITE_HOUR_UTC, minute=INVITE_MINUTE_UTC),
+            self._send_invite,
+            grace=_time_until_start(INVITE_HOUR_UTC, INVITE_MINUTE_UTC),
+        )
+        sched.every("bbf:backup", BACKUP_EVERY_SEC, self._backup, first_delay=BACKUP_EVERY_SEC)
 
-        data    = _load_data()
-        day_key = str(weekday)
+    async def _day_context(self, day_num: int, due: datetime):
+        """(data, guild, thread, active_uids) для нагадувань дня, або None якщо нема кому/куди."""
+        data    = await _load_data()
+        day_key = str(day_num)
 
         if day_key not in data.get("week", {}):
-            return
+            return None
 
         guild_id = data.get("guild_id")
         if not guild_id:
-            return
+            return None
 
         guild = self.bot.get_guild(int(guild_id))
         if not guild:
-            return
+            return None
 
         thread_id = data.get("thread_ids", {}).get(day_key)
         if not thread_id:
-            return
+            return None
 
         thread = guild.get_channel(int(thread_id))
         if not thread:
@@ -1024,99 +1996,98 @@ class BBFCog(commands.Cog, name="BBF"):
             except Exception:
                 thread = None
         if not thread:
+            return None
+
+        day_date    = due.replace(hour=0, minute=0, second=0, microsecond=0)
+        active_uids = [
+            uid for uid in data["week"][day_key].main
+            if not _is_on_vacation(uid, data, day_date)
+        ]
+        return data, guild, thread, active_uids
+
+    async def _send_reminder(self, due: datetime):
+        weekday = due.weekday()
+        day_key = str(weekday)
+        ctx     = await self._day_context(weekday, due)
+        if ctx is None:
             return
+        data, guild, thread, active_uids = ctx
 
-        day_data  = data["week"][day_key]
-        main_uids = [e["uid"] for e in day_data["main"]]
+        if data.get("reminded", {}).get(day_key):
+            return
 
-        def _is_on_vacation(uid: str, data: dict, check_date: datetime) -> bool:
-            vac = data.get("vacations", {}).get(uid)
-            if not vac:
-                return False
-            try:
-                start = datetime.fromisoformat(vac["start"]).replace(tzinfo=timezone.utc)
-                end   = datetime.fromisoformat(vac["end"]).replace(tzinfo=timezone.utc)
-                return start <= check_date <= end
-            except Exception:
-                return False
+        if active_uids:
+            mentions  = " ".join(f"<@{uid}>" for uid in active_uids)
+            confirmed = data.get("confirmed", {}).get(day_key, [])
+            embed = _build_reminder_embed(
+                weekday, data["week"][day_key], confirmed, guild, guild.me, data
+            )
+            view = _make_confirm_view(weekday)
+            msg  = await thread.send(content=mentions, embed=embed, view=view)
+            data.setdefault("reminder_msg_ids", {})[day_key] = msg.id
+            await _update_meta({"$set": {f"reminder_msg_ids.{day_key}": msg.id}})
 
-        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        active_uids = [uid for uid in main_uids if not _is_on_vacation(uid, data, today)]
-
-        if (
-            now.hour == REMINDER_HOUR_UTC
-            and now.minute == REMINDER_MINUTE_UTC
-            and not data.get("reminded", {}).get(day_key)
-        ):
-            if active_uids:
-                mentions  = " ".join(f"<@{uid}>" for uid in active_uids)
-                confirmed = data.get("confirmed", {}).get(day_key, [])
-                embed = _build_reminder_embed(
-                    weekday, day_data, confirmed, guild, guild.me, data
-                )
-                view = _make_confirm_view(weekday)
-                msg  = await thread.send(content=mentions, embed=embed, view=view)
-                data.setdefault("reminder_msg_ids", {})[day_key] = msg.id
-
-            data.setdefault("reminded", {})[day_key] = True
-            _save_data(data)
-
-        if (
-            now.hour == INVITE_HOUR_UTC
-            and now.minute == INVITE_MINUTE_UTC
-            and not data.get("invited", {}).get(day_key)
-        ):
-            if active_uids:
-                ts = _get_ts_for_day(data, weekday)
-                voice_channel = guild.get_channel(VOICE_CHANNEL_ID)
-                if not voice_channel:
-                    try:
-                        voice_channel = await guild.fetch_channel(VOICE_CHANNEL_ID)
-                    except Exception:
-                        voice_channel = None
-                vc_mention = voice_channel.mention if voice_channel else f"<#{VOICE_CHANNEL_ID}>"
-
-                day_data_now = data["week"][day_key]
-                galley_uids = [
-                    e["uid"] for e in day_data_now["main"]
-                    if e["team"] in GALLEY_TEAMS and e["uid"] in active_uids
-                ]
-                ship_entries = [
-                    e for e in day_data_now["main"]
-                    if e["team"] not in GALLEY_TEAMS and e["uid"] in active_uids
-                ]
-
-                galley_mentions = " ".join(f"<@{uid}>" for uid in galley_uids)
-                ship_mentions   = " ".join(f"<@{e['uid']}>" for e in ship_entries)
-
-                galley_lines = "\n".join(
-                    f"`{i:02}.` <@{uid}>"
-                    for i, uid in enumerate(galley_uids, 1)
-                ) or "*Поки порожньо*"
-
-                ship_lines = "\n".join(
-                    f"`{i:02}.` <@{e['uid']}> — *{e['team']}*"
-                    for i, e in enumerate(ship_entries, 1)
-                ) or "*Поки порожньо*"
-
-                msg = (
-                    f"🚢 **Збираємось на борту!**\n"
-                    f"BBF о <t:{ts}:t>! Заходьте: {vc_mention} 🍾⚓\n\n"
-                    f"⚓ **Екіпаж Галери** ({len(galley_uids)}/{GALLEY_MIN}):\n"
-                    f"{galley_mentions}\n"
-                    f"{galley_lines}\n\n"
-                    f"⛵ **Флотилія** ({len(ship_entries)}):\n"
-                    f"{ship_mentions}\n"
-                    f"{ship_lines}"
-                )
-                await thread.send(msg)
+        data.setdefault("reminded", {})[day_key] = True
+        await _update_meta({"$set": {f"reminded.{day_key}": True}})
+
+    async def _send_invite(self, due: datetime):
+        weekday = due.weekday()
+        day_key = str(weekday)
+        ctx     = await self._day_context(weekday, due)
+        if ctx is None:
+            return
+        data, guild, thread, active_uids = ctx
+
+        if data.get("invited", {}).get(day_key):
+            return
+
+        if active_uids:
+            ts = _get_ts_for_day(data, weekday)
+            voice_channel = guild.get_channel(VOICE_CHANNEL_ID)
+            if not voice_channel:
+                try:
+                    voice_channel = await guild.fetch_channel(VOICE_CHANNEL_ID)
+                except Exception:
+                    voice_channel = None
+            vc_mention = voice_channel.mention if voice_channel else f"<#{VOICE_CHANNEL_ID}>"
+
+            day_data_now = data["week"][day_key]
+            galley_uids = [
+                e["uid"] for e in day_data_now.galley_entries()
+                if e["uid"] in active_uids
+            ]
+            ship_entries = [
+                e for e in day_data_now.ship_entries()
+                if e["uid"] in active_uids
+            ]
+
+            galley_mentions = " ".join(f"<@{uid}>" for uid in galley_uids)
+            ship_mentions   = " ".join(f"<@{e['uid']}>" for e in ship_entries)
+
+            galley_lines = "\n".join(
+                f"`{i:02}.` <@{uid}>"
+                for i, uid in enumerate(galley_uids, 1)
+            ) or "*Поки порожньо*"
+
+            ship_lines = "\n".join(
+                f"`{i:02}.` <@{e['uid']}> — *{e['team']}*"
+                for i, e in enumerate(ship_entries, 1)
+            ) or "*Поки порожньо*"
 
-            data.setdefault("invited", {})[day_key] = True
-            _save_data(data)
+            msg = (
+                f"🚢 **Збираємось на борту!**\n"
+                f"BBF о <t:{ts}:t>! Заходьте: {vc_mention} 🍾⚓\n\n"
+                f"⚓ **Екіпаж Галери** ({len(galley_uids)}/{GALLEY_MIN}):\n"
+                f"{galley_mentions}\n"
+                f"{galley_lines}\n\n"
+                f"⛵ **Флотилія** ({len(ship_entries)}):\n"
+                f"{ship_mentions}\n"
+                f"{ship_lines}"
+            )
+            _get_notifier().post(thread, msg)
 
-    @reminder_task.before_loop
-    async def before_reminder(self):
-        await self.bot.wait_until_ready()
+        data.setdefault("invited", {})[day_key] = True
+        await _update_meta({"$set": {f"invited.{day_key}": True}})
 
     @app_commands.command(
         name="bbf_старт",
@@ -1130,7 +2101,7 @@ class BBFCog(commands.Cog, name="BBF"):
         is_sunday_after_reset = now.weekday() == 6 and now.hour >= SUNDAY_RESET_HOUR_UTC
         next_week_notice = " *(наступний тиждень)*" if is_sunday_after_reset else ""
 
-        old_data   = _load_data()
+        old_data   = await _load_data()
         old_points = old_data.get("points", {})
 
         category_to_clean = interaction.guild.get_channel(BBF_CATEGORY_ID)
@@ -1222,7 +2193,7 @@ class BBFCog(commands.Cog, name="BBF"):
             except Exception as e:
                 print(f"[BBF] ПОМИЛКА створення каналу для {day_name}: {type(e).__name__}: {e}")
 
-        _save_data(data)
+        await _save_data(data)
         await interaction.followup.send(
             f"✅ Реєстрацію на BBF відкрито{next_week_notice}! Створено канали з ембедами.",
             ephemeral=True,
@@ -1230,7 +2201,7 @@ class BBFCog(commands.Cog, name="BBF"):
 
     @app_commands.command(name="bbf_очки", description="Переглянути таблицю очок пріоритету")
     async def bbf_points(self, interaction: discord.Interaction):
-        data   = _load_data()
+        data   = await _load_data()
         points = {k: v for k, v in data.get("points", {}).items() if v > 0}
 
         if not points:
@@ -1256,19 +2227,20 @@ class BBFCog(commands.Cog, name="BBF"):
     @app_commands.default_permissions(manage_guild=True)
     @app_commands.describe(member="Гравець (залиш порожнім щоб скинути всім)")
     async def bbf_reset_points(self, interaction: discord.Interaction, member: discord.Member | None = None):
-        data = _load_data()
+        data = await _load_data()
         if member:
-            data["points"][str(member.id)] = 0
-            _save_data(data)
+            data.setdefault("points", {})[str(member.id)] = 0
+            await _set_points(str(member.id), 0)
             await interaction.response.send_message(f"✅ Очки {member.mention} скинуто до 0.", ephemeral=True)
         else:
+            uids = list(data.get("points", {}))
             data["points"] = {}
-            _save_data(data)
+            await _clear_points(uids)
             await interaction.response.send_message("✅ Очки всіх гравців скинуто.", ephemeral=True)
 
     @app_commands.command(name="bbf_статус", description="Переглянути свій статус на поточний тиждень BBF")
     async def bbf_status(self, interaction: discord.Interaction):
-        data = _load_data()
+        data = await _load_data()
         uid  = str(interaction.user.id)
         week = data.get("week", {})
 
@@ -1295,12 +2267,12 @@ class BBFCog(commands.Cog, name="BBF"):
 
             if day_key not in week:
                 continue
-            status   = _get_status(week[day_key], uid)
+            status   = week[day_key].status(uid)
             label    = labels[status]
-            entry    = _get_entry(week[day_key], uid)
+            entry    = week[day_key].entry(uid)
             team_str = f" — *{entry['team']}*" if entry else ""
             if status == "waitlist":
-                pos = next((i + 1 for i, e in enumerate(week[day_key]["waitlist"]) if e["uid"] == uid), "?")
+                pos = week[day_key].waitlist_position(uid) or "?"
                 label += f" (#{pos})"
             lines.append(f"**{day_name}{date_label}**: {label}{team_str}")
 
@@ -1320,7 +2292,9 @@ class BBFCog(commands.Cog, name="BBF"):
     @app_commands.default_permissions(manage_guild=True)
     async def bbf_refresh(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        data = _load_data()
+        # Ручне оновлення заодно перечитує стан з MongoDB (на випадок правок у базі)
+        self.state.invalidate()
+        data = await _load_data()
         if not data.get("week"):
             await interaction.followup.send("❌ Реєстрація ще не була запущена.", ephemeral=True)
             return
@@ -1328,21 +2302,29 @@ class BBFCog(commands.Cog, name="BBF"):
             await _refresh_embed(interaction.guild, data, day_num)
         await interaction.followup.send("✅ Всі ембеди оновлено.", ephemeral=True)
 
-    @tasks.loop(minutes=15)
-    async def backup_task(self):
-        data = _load_data()
-        if data.get("guild_id"):
-            _save_backup(data)
+    @app_commands.command(name="bbf_кеш", description="[Офіцер] Статистика кешу стану BBF")
+    @app_commands.default_permissions(manage_guild=True)
+    async def bbf_cache_stats(self, interaction: discord.Interaction):
+        stats = {
+            **self.state.stats(),
+            **{f"refresh_{k}": v for k, v in self.refresher.stats().items()},
+            **{f"embed_{k}": v for k, v in _get_fragments().stats().items()},
+            **{f"notify_{k}": v for k, v in self.notifier.stats().items()},
+        }
+        lines = [f"`{k}`: **{v}**" for k, v in stats.items()]
+        embed = discord.Embed(title="🧠 Кеш стану BBF", description="\n".join(lines), color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @backup_task.before_loop
-    async def before_backup(self):
-        await self.bot.wait_until_ready()
+    async def _backup(self, due: datetime):
+        data = await _load_data()
+        if data.get("guild_id"):
+            await _save_backup()
 
     @app_commands.command(name="bbf_бекапи", description="[Офіцер] Показати список останніх бекапів")
     @app_commands.default_permissions(manage_guild=True)
     async def bbf_backups_list(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        backups = _list_backups()
+        backups = await _list_backups()
         if not backups:
             await interaction.followup.send("ℹ️ Бекапів немає.", ephemeral=True)
             return
@@ -1352,23 +2334,23 @@ class BBFCog(commands.Cog, name="BBF"):
             try:
                 dt = datetime.fromisoformat(ts)
                 unix = int(dt.timestamp())
-                lines.append(f"`{b['_id']}` — <t:{unix}:f>")
+                lines.append(f"`{dt.strftime(BACKUP_ID_FORMAT)}` — <t:{unix}:f>")
             except Exception:
                 lines.append(f"`{b['_id']}`")
-        embed = discord.Embed(title="💾 Останні бекапи BBF", description="\n".join(lines), color=discord.Color.blue())
-        embed.set_footer(text="Використайте /bbf_відновити <id> щоб відновити")
+        embed = discord.Embed(title="💾 Останні чекпойнти BBF", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text="Використайте /bbf_відновити <рррр-мм-дд_гг-хх> — будь-яка хвилина після найстарішого чекпойнту")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
     @app_commands.command(name="bbf_відновити", description="[Офіцер] Відновити дані з бекапу")
     @app_commands.default_permissions(manage_guild=True)
-    @app_commands.describe(backup_id="ID бекапу (наприклад: 2026-05-20_14-30)")
+    @app_commands.describe(backup_id="Момент UTC (наприклад: 2026-05-20_14-37) — стан на кінець цієї хвилини")
     async def bbf_restore(self, interaction: discord.Interaction, backup_id: str):
         await interaction.response.defer(ephemeral=True)
-        data = _restore_backup(backup_id)
+        data = await _restore_backup(backup_id)
         if not data:
             await interaction.followup.send(f"❌ Бекап `{backup_id}` не знайдено.", ephemeral=True)
             return
-        _save_data(data)
+        await _save_data(data)
         await interaction.followup.send(
             f"✅ Дані відновлено з бекапу `{backup_id}`!\nВикористайте `/bbf_оновити` щоб оновити ембеди.",
             ephemeral=True,
@@ -1407,7 +2389,7 @@ class BBFCog(commands.Cog, name="BBF"):
     @app_commands.default_permissions(manage_guild=True)
     async def bbf_refresh_buttons(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        data = _load_data()
+        data = await _load_data()
         if not data.get("week"):
             await interaction.followup.send("❌ Реєстрація ще не була запущена.", ephemeral=True)
             return
@@ -1447,7 +2429,7 @@ class BBFCog(commands.Cog, name="BBF"):
     @app_commands.default_permissions(manage_guild=True)
     async def bbf_resend(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        data = _load_data()
+        data = await _load_data()
         if not data.get("week"):
             await interaction.followup.send("❌ Реєстрація ще не була запущена.", ephemeral=True)
             return
@@ -1489,10 +2471,10 @@ class BBFCog(commands.Cog, name="BBF"):
                 else:
                     msg = await channel.send(embed=embed, view=view)
                 data.setdefault("message_ids", {})[day_key] = msg.id
+                await _update_meta({"$set": {f"message_ids.{day_key}": msg.id}})
                 sent += 1
             except Exception as e:
                 print(f"[BBF] Помилка переслання ембеду дня {day_num}: {e}")
-        _save_data(data)
         if sent:
             await interaction.followup.send(f"✅ Надіслано нових ембедів: **{sent}**. Люди збережені!", ephemeral=True)
         else:
@@ -1502,7 +2484,7 @@ class BBFCog(commands.Cog, name="BBF"):
     @app_commands.default_permissions(manage_guild=True)
     async def bbf_migrate(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        data = _load_data()
+        data = await _load_data()
         for field in ("week", "week_dates", "message_ids", "thread_ids", "reminder_msg_ids", "confirmed", "reminded", "invited", "day_images"):
             raw = data.get(field, {})
             if raw and any(isinstance(k, int) for k in raw.keys()):
@@ -1513,7 +2495,7 @@ class BBFCog(commands.Cog, name="BBF"):
             return
         report_lines = []
         for day_key, day_data in week.items():
-            main = day_data.get("main", [])
+            main = list(day_data.main.values())
             day_num  = int(day_key)
             day_name = DAY_NAMES.get(day_num, day_key)
             for entry in main:
@@ -1534,9 +2516,11 @@ class BBFCog(commands.Cog, name="BBF"):
                     entry["team"]          = GALLEY_TEAMS[0]
                     entry["auto_galley"]   = True
                     moved.append(entry["uid"])
-            galley_count = sum(1 for e in main if e["team"] in GALLEY_TEAMS)
+            # Записи змінювались напряму — перебудовуємо індекс і лічильники
+            week[day_key] = DayRoster.from_dict(day_data.to_dict())
+            galley_count  = week[day_key].galley_count
             report_lines.append(f"**{day_name}**: галера {galley_count}/{GALLEY_MIN}" + (f", переміщено {len(moved)}" if moved else ""))
-        _save_data(data)
+        await _save_data(data)
         for day_num in DAY_NAMES.keys():
             await _refresh_embed(interaction.guild, data, day_num)
         await interaction.followup.send(f"✅ Міграцію завершено!\n\n" + "\n".join(report_lines), ephemeral=True)
@@ -1544,37 +2528,50 @@ class BBFCog(commands.Cog, name="BBF"):
 
 # ─── Backup functions ─────────────────────────────────────────────────────────
 
-def _save_backup(data: dict) -> None:
+async def _save_backup() -> None:
+    """Чекпойнт лише коли в журналі накопичились зміни (або давно не знімали)."""
     try:
-        db = _get_db()
-        backup = {"_id": datetime.now(timezone.utc).strftime("%Y-%m-%d_%H-%M"), "timestamp": datetime.now(timezone.utc).isoformat(), **data}
-        db["bbf_backups"].replace_one({"_id": backup["_id"]}, backup, upsert=True)
-        backups = list(db["bbf_backups"].find({}, {"_id": 1}).sort("_id", -1))
-        if len(backups) > 48:
-            old_ids = [b["_id"] for b in backups[48:]]
-            db["bbf_backups"].delete_many({"_id": {"$in": old_ids}})
+        repo = _get_repo()
+        changes, last_key = await repo.changes_since_checkpoint()
+        if changes == 0 and last_key is not None:
+            return
+        if last_key is not None and changes < CHECKPOINT_MIN_CHANGES:
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(last_key).replace(tzinfo=timezone.utc)
+            if age < CHECKPOINT_MAX_AGE:
+                return
+        data, last_ts = await _get_state().snapshot()
+        await repo.checkpoint(data, keep=BACKUPS_KEEP, ts=last_ts)
+        print(f"[BBF] Чекпойнт знято (змін у журналі: {changes})")
     except Exception as e:
         print(f"[BBF][ERROR] Бекап помилка: {e}")
 
 
-def _list_backups() -> list:
+async def _list_backups() -> list:
     try:
-        db = _get_db()
-        return list(db["bbf_backups"].find({}, {"_id": 1, "timestamp": 1}).sort("_id", -1).limit(20))
+        return await _get_repo().list_backups(limit=20)
     except Exception:
         return []
 
 
-def _restore_backup(backup_id: str) -> dict | None:
-    try:
-        db = _get_db()
-        doc = db["bbf_backups"].find_one({"_id": backup_id})
-        if doc:
-            doc.pop("_id", None)
-            doc.pop("timestamp", None)
-            return doc
+def _parse_restore_point(value: str) -> datetime | None:
+    """`2026-05-20_14-37` (UTC) — стан на кінець цієї хвилини."""
+    for fmt in (BACKUP_ID_FORMAT, "%Y-%m-%d %H:%M"):
+        try:
+            moment = datetime.strptime(value.strip(), fmt).replace(tzinfo=timezone.utc)
+            return moment + timedelta(minutes=1)
+        except ValueError:
+            continue
+    return None
+
+
+async def _restore_backup(backup_id: str) -> dict | None:
+    moment = _parse_restore_point(backup_id)
+    if moment is None:
         return None
-    except Exception:
+    try:
+        return await _get_repo().restore_at(moment)
+    except Exception as e:
+        print(f"[BBF][ERROR] Відновлення помилка: {e}")
         return None
 
 
@@ -1589,8 +2586,7 @@ async def setup(bot: commands.Bot) -> None:
         print(f"[BBF] Зареєстровано команду: /{cmd.name}")
     print("[COG] BBFCog завантажено")
     try:
-        db = _get_db()
-        db.command("ping")
+        await _get_repo().ping()
         print("[BBF] MongoDB ping OK ✅")
     except Exception as e:
         print(f"[BBF][ERROR] MongoDB ping FAIL: {e}")
@@ -13,23 +13,24 @@ import aiohttp
 import discord
 from bs4 import BeautifulSoup
 from deep_translator import GoogleTranslator
-from discord.ext import commands, tasks
+from discord.ext import commands
 from PIL import Image
 
 
 CHANNEL_ID = 1324474229437108264
 BDF_NEWS_URL = "https://www.blackdesertfoundry.com/category/all-news/"
 STATE_FILE = Path("data/bdf_news_seen.json")
+CHECK_EVERY_SECONDS = 30 * 60
 
 
 class BDFNewsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.seen_links = self.load_seen()
-        self.check_bdf_news.start()
+        self.bot.scheduler.every("bdf_news", CHECK_EVERY_SECONDS, self.check_bdf_news)
 
     def cog_unload(self):
-        self.check_bdf_news.cancel()
+        self.bot.scheduler.remove("bdf_news")
 
     def load_seen(self) -> set[str]:
         STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
@@ -59,10 +60,9 @@ class BDFNewsCog(commands.Cog):
             "Accept-Language": "en-US,en;q=0.9",
         }
 
-        async with aiohttp.ClientSession(headers=headers) as session:
-            async with session.get(url, timeout=45) as resp:
-                resp.raise_for_status()
-                return await resp.read()
+        return await self.bot.http_client.fetch(
+            url, "bytes", headers=headers, timeout=aiohttp.ClientTimeout(total=45), raise_for_status=True,
+        )
 
     async def fetch_text(self, url: str) -> str:
         data = await self.fetch_bytes(url)
@@ -309,8 +309,7 @@ class BDFNewsCog(commands.Cog):
         self.seen_links.add(link)
         self.save_seen()
 
-    @tasks.loop(minutes=30)
-    async def check_bdf_news(self):
+    async def check_bdf_news(self, due: datetime):
         try:
             posts = await self.fetch_posts_from_page()
 
@@ -338,10 +337,6 @@ class BDFNewsCog(commands.Cog):
         except Exception as e:
             print(f"[BDFNewsCog] check error: {e}")
 
-    @check_bdf_news.before_loop
-    async def before_check_bdf_news(self):
-        await self.bot.wait_until_ready()
-
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(BDFNewsCog(bot))
@@ -20,6 +20,8 @@ from discord import app_commands
 from discord.ext import commands
 from pymongo import MongoClient
 
+from utils.http import HttpClient
+
 _mongo_client = None
 _mongo_db = None
 
@@ -172,7 +174,7 @@ def _prepare_for_ocr(img: Image.Image, scale: int = 4, mode: str = "text") -> by
     return _pil_to_png_bytes(out)
 
 
-async def _call_ocr_space(session: aiohttp.ClientSession, png_bytes: bytes, label: str) -> str:
+async def _call_ocr_space(http: HttpClient, png_bytes: bytes, label: str) -> str:
     api_key = os.environ.get("OCR_SPACE_API_KEY") or os.environ.get("OCRSPACE_API_KEY") or ""
     if not api_key:
         print("[BDO_STATS][ERROR] OCR_SPACE_API_KEY не задано!")
@@ -189,16 +191,17 @@ async def _call_ocr_space(session: aiohttp.ClientSession, png_bytes: bytes, labe
     form.add_field("file", png_bytes, filename=f"{label}.png", content_type="image/png")
 
     try:
-        async with session.post(
+        status, _, body = await http.post(
             "https://api.ocr.space/parse/image",
+            "full",
             data=form,
             timeout=aiohttp.ClientTimeout(total=45),
-        ) as resp:
-            raw = await resp.text()
-            if resp.status != 200:
-                print(f"[BDO_STATS][ERROR] OCR.space HTTP {resp.status} [{label}]: {raw[:1200]}")
-                return ""
-            data = json.loads(raw)
+        )
+        raw = body.decode("utf-8", errors="replace")
+        if status != 200:
+            print(f"[BDO_STATS][ERROR] OCR.space HTTP {status} [{label}]: {raw[:1200]}")
+            return ""
+        data = json.loads(raw)
 
         if data.get("IsErroredOnProcessing"):
             print(f"[BDO_STATS][ERROR] OCR.space processing error [{label}]: {data.get('ErrorMessage')}")
@@ -357,7 +360,7 @@ def _row_number_boxes(img: Image.Image, row_count: int) -> list[tuple[int, int,
     return boxes
 
 
-async def _parse_screenshot(image_bytes: bytes, mime_type: str = "image/png") -> list[dict] | None:
+async def _parse_screenshot(http: HttpClient, image_bytes: bytes, mime_type: str = "image/png") -> list[dict] | None:
     try:
         img = _image_bytes_to_pil(image_bytes)
     except Exception as e:
@@ -392,43 +395,42 @@ async def _parse_screenshot(image_bytes: bytes, mime_type: str = "image/png") ->
     full_png = _prepare_for_ocr(_crop_ratio(img, full_box), scale=3, mode="text")
     col_pngs = [_prepare_for_ocr(_crop_ratio(img, b), scale=10, mode="numbers") for b in col_boxes]
 
-    async with aiohttp.ClientSession() as session:
-        names_text = await _call_ocr_space(session, names_png, "names")
-        names = _extract_names(names_text)
-        print(f"[BDO_STATS] Names parsed: {names}")
-
-        if not names:
-            full_text = await _call_ocr_space(session, full_png, "full_fallback")
-            players = _fallback_parse(full_text)
-            if players:
-                print(f"[BDO_STATS] Fallback parsed {len(players)} players")
-                return players
-            print("[BDO_STATS][ERROR] Не вдалося прочитати імена")
-            return None
-
-        expected = len(names)
-        columns: list[list[int]] = []
-        for i, png in enumerate(col_pngs, start=1):
-            text = await _call_ocr_space(session, png, f"col_{i}")
-            values = _fit(_extract_numbers(text, expected), expected)
-            columns.append(values)
-            print(f"[BDO_STATS] Column {i}: {values}")
-
-        # Додатково пробуємо читати праву частину по рядках.
-        row_values = [[0, 0, 0, 0, 0, 0, 0] for _ in range(expected)]
-        for row_idx, box in enumerate(_row_number_boxes(img, expected), start=1):
-            row_crop = _crop_px(img, box)
-            row_png = _prepare_for_ocr(row_crop, scale=9, mode="numbers")
-            row_text = await _call_ocr_space(session, row_png, f"row_{row_idx:02d}")
-            nums = _extract_numbers(row_text, 7)
-
-            if len(nums) >= 7:
-                row_values[row_idx - 1] = nums[:7]
-            else:
-                print(f"[BDO_STATS][ROW PARTIAL] row={row_idx}, nums={nums}")
+    names_text = await _call_ocr_space(http, names_png, "names")
+    names = _extract_names(names_text)
+    print(f"[BDO_STATS] Names parsed: {names}")
+
+    if not names:
+        full_text = await _call_ocr_space(http, full_png, "full_fallback")
+        players = _fallback_parse(full_text)
+        if players:
+            print(f"[BDO_STATS] Fallback parsed {len(players)} players")
+            return players
+        print("[BDO_STATS][ERROR] Не вдалося прочитати імена")
+        return None
+
+    expected = len(names)
+    columns: list[list[int]] = []
+    for i, png in enumerate(col_pngs, start=1):
+        text = await _call_ocr_space(http, png, f"col_{i}")
+        values = _fit(_extract_numbers(text, expected), expected)
+        columns.append(values)
+        print(f"[BDO_STATS] Column {i}: {values}")
+
+    # Додатково пробуємо читати праву частину по рядках.
+    row_values = [[0, 0, 0, 0, 0, 0, 0] for _ in range(expected)]
+    for row_idx, box in enumerate(_row_number_boxes(img, expected), start=1):
+        row_crop = _crop_px(img, box)
+        row_png = _prepare_for_ocr(row_crop, scale=9, mode="numbers")
+        row_text = await _call_ocr_space(http, row_png, f"row_{row_idx:02d}")
+        nums = _extract_numbers(row_text, 7)
+
+        if len(nums) >= 7:
+            row_values[row_idx - 1] = nums[:7]
+        else:
+            print(f"[BDO_STATS][ROW PARTIAL] row={row_idx}, nums={nums}")
 
-            print(f"[BDO_STATS] Row {row_idx}: {row_values[row_idx - 1]}")
-            await asyncio.sleep(0.12)
+        print(f"[BDO_STATS] Row {row_idx}: {row_values[row_idx - 1]}")
+        await asyncio.sleep(0.12)
 
     players = []
     for row_index, name in enumerate(names):
@@ -568,7 +570,7 @@ class BDOStatsCog(commands.Cog, name="BDOStats"):
         if mime_type == "image/jpg":
             mime_type = "image/jpeg"
 
-        players = await _parse_screenshot(image_bytes, mime_type)
+        players = await _parse_screenshot(self.bot.http_client, image_bytes, mime_type)
 
         if not players:
             try:
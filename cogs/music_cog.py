@@ -4,10 +4,21 @@
 import asyncio
 import json
 import hashlib
+import io
+import itertools
+import math
+import os
+import random
 import re
 import shutil
+import sqlite3
+import tempfile
+import threading
+import time
 import traceback
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
 
@@ -22,9 +33,14 @@ except Exception:
 
 
 TEAL = 0x05B2B4
-PLAYLISTS_PATH = Path("data/music_playlists.json")
+PLAYLISTS_PATH = Path("data/music_playlists.json")   # старий формат, імпортується один раз
+PLAYLISTS_LOG_PATH = Path("data/music_playlists.jsonl")
+SESSIONS_PATH = Path("data/music_sessions.json")
 AUTO_LEAVE_SECONDS = 15 * 60
 
+SESSION_SAVE_EVERY = 15   # сек; файл переписується лише якщо знімок змінився
+RESUME_PLAYBACK    = os.getenv("MUSIC_RESUME_PLAYBACK", "1") == "1"
+
 MUSIC_GIFS = [
     "https://raw.githubusercontent.com/Myxa83/silentconcierge/main/assets/music/muz01.gif",
     "https://raw.githubusercontent.com/Myxa83/silentconcierge/main/assets/music/muz02.gif",
@@ -45,10 +61,70 @@ YTDL_OPTS = {
     "extract_flat": False,
     "ignoreerrors": True,
     "source_address": "0.0.0.0",
+    "socket_timeout": 15,
+}
+
+# Плейлисти й пошук витягуються "пласко" (лише метадані) — стрім резолвиться перед програванням
+YTDL_FLAT_OPTS = {**YTDL_OPTS, "extract_flat": "in_playlist"}
+
+PREFETCH_AHEAD       = 2         # скільки наступних треків резолвити заздалегідь
+STREAM_URL_TTL       = 30 * 60   # якщо в URL немає expire=
+STREAM_EXPIRY_MARGIN = 60        # запас до протухання підписаного URL (сек)
+EXPIRE_RE            = re.compile(r"[?&/]expire[=/](\d+)")
+PLAYLIST_URL_RE      = re.compile(r"[?&]list=|/sets/", re.IGNORECASE)
+
+RESOLVER_WORKERS = int(os.getenv("MUSIC_RESOLVER_WORKERS", "3"))
+RESOLVE_TIMEOUT  = 30   # один трек (сек)
+EXTRACT_TIMEOUT  = 90   # пошук / плейлист (сек)
+
+CACHE_PATH        = Path("data/music_cache.sqlite3")
+CACHE_TTL_SECONDS = int(os.getenv("MUSIC_CACHE_TTL_HOURS", "72")) * 3600
+CACHE_MAX_ENTRIES = int(os.getenv("MUSIC_CACHE_MAX_ENTRIES", "5000"))
+CACHE_EVICT_EVERY = 100   # перевіряти ліміт раз на стільки записів
+CACHE_FLUSH_EVERY = 30    # сек: як часто комітити нові записи й відкладені `accessed`
+
+# Режим завантаження наперед: наступні треки качаються в Opus і грають з диска
+AUDIO_CACHE_ENABLED      = os.getenv("MUSIC_AUDIO_CACHE", "0") == "1"
+AUDIO_CACHE_DIR          = Path("data/music_audio")
+AUDIO_CACHE_MAX_BYTES    = int(os.getenv("MUSIC_AUDIO_CACHE_MB", "1024")) * 1024 * 1024
+AUDIO_MAX_TRACK_SECONDS  = 20 * 60   # довші (мікси, стріми) лишаються стрімом
+AUDIO_DOWNLOAD_WORKERS   = 1
+AUDIO_DOWNLOAD_TIMEOUT   = 10 * 60
+
+AUDIO_DL_OPTS = {
+    "format": "bestaudio[acodec=opus]/bestaudio/best",
+    "noplaylist": True,
+    "quiet": True,
+    "no_warnings": True,
+    "source_address": "0.0.0.0",
+    "socket_timeout": 15,
+    # Якщо джерело вже Opus — yt-dlp лише перепаковує (-acodec copy), без перекодування
+    "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "opus"}],
 }
 
 FFMPEG_BEFORE_OPTS = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
-FFMPEG_OPTS = "-vn -af loudnorm=I=-16:LRA=11:TP=-1.5"
+FRAME_SECONDS      = 0.02   # discord.py читає джерело кадрами по 20 мс
+PREWARM_SECONDS    = 8      # за скільки до кінця треку запускати ffmpeg наступного
+GAP_HISTORY        = 50
+HISTORY_MAX        = 50     # скільки програних треків пам'ятає кнопка "Назад"
+DEFAULT_VOLUME     = 0.8    # стартова гучність плеєра = "100%" конвеєра: на ній Opus з кешу йде без перекодування
+UNDERRUN_SECONDS   = 0.04   # кадр читався довше — ffmpeg не встигав, у voice це чутно як заїкання
+EARLY_END_SLACK    = 5      # ffmpeg закінчив раніше, ніж за стільки секунд до кінця — стрім обірвався
+
+METRICS_PATH        = Path("data/music_metrics.json")
+METRICS_DUMP_EVERY  = 60
+LATENCY_BUCKETS_MS  = (50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000, 30000)
+# Гучність вирівнюємо статичним volume= з попереднього аналізу (LoudnessAnalyzer);
+# дорогий однопрохідний loudnorm лишився лише для першого програвання треку —
+# і його ж підсумок (print_format=json) стає вимірюванням, без окремого проходу по стріму
+LOUDNORM_FILTER     = "loudnorm=I=-16:LRA=11:TP=-1.5"
+LOUDNESS_TARGET_I   = -16.0
+LOUDNESS_TARGET_TP  = -1.5
+LOUDNESS_WORKERS    = 1
+LOUDNESS_TIMEOUT    = 3 * 60
+GAIN_PASSTHROUGH_DB = 1.0    # менша корекція не варта перекодування Opus з кешу
+LOUDNORM_JSON_RE    = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}")
+RG_TAG_RE           = re.compile(r"^\s*(R128_TRACK_GAIN|REPLAYGAIN_TRACK_GAIN|REPLAYGAIN_TRACK_PEAK)\s*:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
 URL_RE = re.compile(r"(https?://\S+)", re.IGNORECASE)
 
 
@@ -57,6 +133,12 @@ def log_music_error(place: str, error: BaseException) -> None:
     traceback.print_exception(type(error), error, error.__traceback__)
 
 
+def _ffmpeg_opts(gain_db: Optional[float], measure: bool = False) -> str:
+    if gain_db is None:
+        return f"-vn -af {LOUDNORM_FILTER}" + (":print_format=json" if measure else "")
+    return f"-vn -af volume={gain_db:.2f}dB"
+
+
 def ffmpeg_available() -> bool:
     return shutil.which("ffmpeg") is not None
 
@@ -78,31 +160,144 @@ def pick_music_gif(track_url: str) -> str:
     return MUSIC_GIFS[idx]
 
 
-def _ensure_playlists_file() -> None:
-    PLAYLISTS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not PLAYLISTS_PATH.exists():
-        PLAYLISTS_PATH.write_text(
-            json.dumps({"users": {}}, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+class PlaylistStore:
+    """
+    Плейлисти користувачів: журнал JSON-lines (рядок на кожну зміну плейлиста) + індекс у пам'яті
+    user_id -> {назва -> {"type", "items"}}. Зміна — дозапис одного рядка, скільки б не було
+    користувачів; коли мертвих рядків більше, ніж живих, журнал переписується атомарно.
+    Обірваний останній рядок (падіння посеред запису) при завантаженні пропускається.
+    """
+
+    COMPACT_MIN_LINES = 64
+
+    def __init__(self, path: Path = PLAYLISTS_LOG_PATH, legacy_path: Path = PLAYLISTS_PATH):
+        self.path = path
+        self._users: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lines = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self._load()
+        elif legacy_path.exists():
+            self._import_legacy(legacy_path)
 
+    def _load(self) -> None:
+        raw = self.path.read_text(encoding="utf-8")
+        for line in raw.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except Exception:
+                continue
+            self._lines += 1
+        if raw and not raw.endswith("\n"):
+            self._compact()   # інакше наступний дозапис прилипне до обірваного рядка
 
-def _load_playlists() -> Dict[str, Any]:
-    _ensure_playlists_file()
+    def _import_legacy(self, legacy_path: Path) -> None:
+        try:
+            data = json.loads(legacy_path.read_text(encoding="utf-8"))
+            for uid, bucket in (data.get("users") or {}).items():
+                for name, meta in ((bucket or {}).get("playlists") or {}).items():
+                    if isinstance(meta, dict):
+                        self._apply({"user": uid, "name": name, "meta": meta})
+        except Exception as e:
+            log_music_error("import legacy playlists", e)
+            return
+        self._compact()
+        print(f"[MUSIC] Плейлисти перенесено з {legacy_path.name}: {self.playlist_count()}")
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        uid, name, meta = str(rec["user"]), rec["name"], rec.get("meta")
+        if meta is None:
+            pls = self._users.get(uid)
+            if pls:
+                pls.pop(name, None)
+                if not pls:
+                    del self._users[uid]
+        else:
+            self._users.setdefault(uid, {})[name] = meta
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(rec)
+        self._lines += 1
+        if self._lines > self.COMPACT_MIN_LINES and self._lines > 2 * self.playlist_count():
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for uid, pls in self._users.items():
+                for name, meta in pls.items():
+                    f.write(json.dumps({"user": uid, "name": name, "meta": meta}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+        self._lines = self.playlist_count()
+
+    # ── API ──────────────────────────────────────────────────────────────────
+
+    def playlists(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """Плейлисти користувача (лише читати — змінювати через put / delete)."""
+        return self._users.get(str(user_id), {})
+
+    def get(self, user_id: int, name: str) -> Optional[Dict[str, Any]]:
+        return self.playlists(user_id).get(name)
+
+    def put(self, user_id: int, name: str, meta: Dict[str, Any]) -> None:
+        self._append({"user": str(user_id), "name": name, "meta": meta})
+
+    def delete(self, user_id: int, name: str) -> None:
+        if name in self.playlists(user_id):
+            self._append({"user": str(user_id), "name": name, "meta": None})
+
+    def playlist_count(self) -> int:
+        return sum(len(pls) for pls in self._users.values())
+
+    def search(self, user_id: int, text: str) -> Tuple[List[str], List[Tuple[str, str, str]]]:
+        """Назви плейлистів і збережені треки (за посиланням або відомою назвою), що містять `text`."""
+        q = (text or "").strip().lower()
+        names: List[str] = []
+        tracks: List[Tuple[str, str, str]] = []
+        playlists = self.playlists(user_id)
+        titles    = _get_cache().titles_for([url for meta in playlists.values() for url in meta.get("items") or []])
+        for name, meta in playlists.items():
+            if q in name.lower():
+                names.append(name)
+            for url in meta.get("items") or []:
+                title = titles.get(url, "")
+                if q and (q in url.lower() or q in title.lower()):
+                    tracks.append((name, url, title))
+        return names, tracks
+
+
+_playlists: Optional[PlaylistStore] = None
+
+def _get_playlists() -> PlaylistStore:
+    global _playlists
+    if _playlists is None:
+        _playlists = PlaylistStore()
+    return _playlists
+
+
+def _load_sessions() -> Dict[str, Any]:
     try:
-        data = json.loads(PLAYLISTS_PATH.read_text(encoding="utf-8"))
-        if not isinstance(data, dict):
-            return {"users": {}}
-        data.setdefault("users", {})
-        return data
+        data = json.loads(SESSIONS_PATH.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
     except Exception as e:
-        log_music_error("_load_playlists", e)
-        return {"users": {}}
+        log_music_error("_load_sessions", e)
+        return {}
 
 
-def _save_playlists(data: Dict[str, Any]) -> None:
-    _ensure_playlists_file()
-    PLAYLISTS_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+def _save_sessions(text: str) -> None:
+    SESSIONS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = SESSIONS_PATH.with_suffix(".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(SESSIONS_PATH)
 
 
 def _extract_urls(text: str) -> List[str]:
@@ -124,151 +319,1270 @@ def _pretty_type(t: Optional[str]) -> str:
     return "YouTube" if t == "youtube" else "SoundCloud" if t == "soundcloud" else "Невідомо"
 
 
-def _pl_get_user(data: Dict[str, Any], user_id: int) -> Dict[str, Any]:
-    uid = str(user_id)
-    data.setdefault("users", {})
-    data["users"].setdefault(uid, {"playlists": {}})
-    if "playlists" not in data["users"][uid] or not isinstance(data["users"][uid]["playlists"], dict):
-        data["users"][uid]["playlists"] = {}
-    return data["users"][uid]
+def _yt_available() -> bool:
+    return yt_dlp is not None
 
 
-def _pl_list(user_bucket: Dict[str, Any]) -> Dict[str, Any]:
-    pls = user_bucket.get("playlists", {})
-    return pls if isinstance(pls, dict) else {}
+def _detect_source(webpage: str) -> str:
+    w = (webpage or "").lower()
+    if "soundcloud.com" in w:
+        return "SoundCloud"
+    if "youtube.com" in w or "youtu.be" in w:
+        return "YouTube"
+    return "Search"
 
 
-def _yt_available() -> bool:
-    return yt_dlp is not None
+def _pick_stream_url(info: Dict[str, Any]) -> Optional[str]:
+    stream_url = info.get("url")
+    if not stream_url and info.get("formats"):
+        for fmt in reversed(info.get("formats") or []):
+            if fmt.get("url"):
+                return fmt.get("url")
+    return stream_url
+
+
+def _stream_expiry(stream_url: str) -> float:
+    m = EXPIRE_RE.search(stream_url)
+    if m:
+        return float(m.group(1))
+    return time.time() + STREAM_URL_TTL
+
+
+class MetadataCache:
+    """
+    Дисковий кеш результатів yt-dlp (SQLite), щоб повторний /hrai не ходив у мережу.
+      q:<запит>  -> список треків (метадані) + чи це плейлист
+      u:<url>    -> title / duration / thumbnail / аудіоформати + stream_url і його expires_at
+    Записи живуть CACHE_TTL_SECONDS; понад CACHE_MAX_ENTRIES витісняються найдавніше використані.
+    Стрім з кешу береться лише поки підписаний URL не протух (Track.stream_fresh).
+    Читання нічого не пишуть: час доступу накопичується в пам'яті, а він і нові записи
+    комітяться одним flush() раз на CACHE_FLUSH_EVERY — без коміту на кожен /hrai.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: int = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self._puts       = 0
+        self._touched: Dict[str, float] = {}
+
+        self.hits   = 0
+        self.misses = 0
+        self.stream_hits = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+            " expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS loudness ("
+            " key TEXT PRIMARY KEY, gain_db REAL NOT NULL, measured REAL NOT NULL)"
+        )
+        self._evict()
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        q = " ".join(query.split())
+        return "q:" + (q if URL_RE.match(q) else q.lower())
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        return "u:" + url.strip()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        row = self._db.execute("SELECT payload, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            self.misses += 1   # протухлий запис прибере _evict
+            return None
+        self._touched[key] = now
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries (key, payload, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(payload, ensure_ascii=False), now + self.ttl, now),
+        )
+        self._touched.pop(key, None)
+        self._puts += 1
+        if self._puts % CACHE_EVICT_EVERY == 0:
+            self._evict()
+
+    def flush(self) -> None:
+        """Записати відкладені часи доступу й закомітити все, що накопичилось."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE entries SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+        self._db.commit()
+
+    def _evict(self) -> None:
+        self.flush()   # LRU має бачити свіжі `accessed`
+        self._db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        overflow = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (overflow,),
+            )
+        overflow = self._db.execute("SELECT COUNT(*) FROM loudness").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM loudness WHERE key IN (SELECT key FROM loudness ORDER BY measured LIMIT ?)",
+                (overflow,),
+            )
+        self._db.commit()
+
+    # ── Гучність (не протухає — трек не змінюється) ──────────────────────────
+
+    def get_gain(self, url: str) -> Optional[float]:
+        row = self._db.execute("SELECT gain_db FROM loudness WHERE key = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def put_gain(self, url: str, gain_db: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO loudness (key, gain_db, measured) VALUES (?, ?, ?)",
+            (url, gain_db, time.time()),
+        )
+
+    # ── Треки ────────────────────────────────────────────────────────────────
+
+    def put_query(self, query: str, tracks: List["Track"], is_playlist: bool, source: str) -> None:
+        self.put(self.query_key(query), {
+            "is_playlist": is_playlist,
+            "source":      source,
+            "tracks": [
+                {"title": t.title, "webpage_url": t.webpage_url, "duration": t.duration,
+                 "thumbnail": t.thumbnail, "source": t.source}
+                for t in tracks
+            ],
+        })
+
+    def get_query(self, query: str) -> Optional[Tuple[List["Track"], bool, str]]:
+        payload = self.get(self.query_key(query))
+        if payload is None:
+            return None
+        tracks = [Track(**t) for t in payload["tracks"]]
+        return tracks, payload["is_playlist"], payload["source"]
+
+    def put_stream(self, url: str, track: "Track", info: Dict[str, Any]) -> None:
+        formats = [
+            {k: f.get(k) for k in ("format_id", "ext", "acodec", "abr", "asr", "url")}
+            for f in (info.get("formats") or [])
+            if f.get("url") and f.get("acodec") not in (None, "none") and f.get("vcodec") in (None, "none")
+        ]
+        payload = {
+            "title":       track.title,
+            "webpage_url": track.webpage_url,
+            "duration":    track.duration,
+            "thumbnail":   track.thumbnail,
+            "url":         track.stream_url,
+            "expires_at":  track.expires_at,
+            "formats":     formats,
+        }
+        for key in {self.url_key(url), self.url_key(track.webpage_url)}:
+            self.put(key, payload)
+
+    def titles_for(self, urls: List[str]) -> Dict[str, str]:
+        """Назви з кешу для багатьох посилань одним запитом на пачку, без LRU і статистики (для пошуку)."""
+        keys   = {self.url_key(url): url for url in urls}
+        titles: Dict[str, str] = {}
+        batch  = list(keys)
+        for i in range(0, len(batch), 500):
+            chunk = batch[i:i + 500]
+            rows  = self._db.execute(
+                f"SELECT key, payload FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+            )
+            for key, payload in rows:
+                title = json.loads(payload).get("title")
+                if title:
+                    titles[keys[key]] = title
+        return titles
+
+    def apply_stream(self, track: "Track") -> bool:
+        """Підставити в трек збережені метадані й стрім, якщо він ще живий."""
+        payload = self.get(self.url_key(track.webpage_url))
+        if payload is None or not track.apply_info(payload):
+            return False
+        track.expires_at = payload.get("expires_at") or track.expires_at
+        if not track.stream_fresh():
+            return False
+        self.stream_hits += 1
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries":     self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            "pending":     len(self._touched),
+            "max_entries": self.max_entries,
+            "hits":        self.hits,
+            "misses":      self.misses,
+            "stream_hits": self.stream_hits,
+        }
+
+
+_cache: Optional[MetadataCache] = None
+
+def _get_cache() -> MetadataCache:
+    global _cache
+    if _cache is None:
+        _cache = MetadataCache()
+    return _cache
+
+
+class AudioCache:
+    """
+    Локальний кеш аудіо: наступні треки качаються як .opus у AUDIO_CACHE_DIR
+    (окремим пулом, щоб не заважати резолву) і грають з диска, без мережі.
+    Понад AUDIO_CACHE_MAX_BYTES видаляються найдавніше програні файли (mtime = останнє використання).
+    """
+
+    def __init__(self, root: Path = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES):
+        self.root      = root
+        self.max_bytes = max_bytes
+        self.pool      = ResolverPool(workers=AUDIO_DOWNLOAD_WORKERS)
+        self._pending: Dict[str, asyncio.Task] = {}
+
+        self.hits       = 0
+        self.downloads  = 0
+        self.failed     = 0
+        self.evicted    = 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, track: "Track") -> Path:
+        key = hashlib.sha1(track.webpage_url.encode("utf-8")).hexdigest()[:20]
+        return self.root / f"{key}.opus"
+
+    def has(self, track: "Track") -> bool:
+        """Чи трек уже в кеші — без впливу на LRU і статистику (для prefetch)."""
+        return self.path_for(track).exists()
+
+    def get(self, track: "Track") -> Optional[Path]:
+        """Файл для відтворення: рахується як попадання і освіжає LRU."""
+        path = self.path_for(track)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return path
+
+    def download_ahead(self, track: "Track") -> None:
+        if not track.duration or track.duration > AUDIO_MAX_TRACK_SECONDS:
+            return
+        path = self.path_for(track)
+        if path.exists() or path.name in self._pending:
+            return
+        task = asyncio.create_task(self._download(track, path))
+        self._pending[path.name] = task
+        task.add_done_callback(lambda _t: self._pending.pop(path.name, None))
+
+    async def _download(self, track: "Track", path: Path) -> None:
+        url      = track.webpage_url
+        base     = path.with_suffix("")
+        opts     = {**AUDIO_DL_OPTS, "outtmpl": f"{base}.dl.%(ext)s"}
+        loop     = asyncio.get_running_loop()
+        finished = loop.create_future()
+        claim    = threading.Lock()
+        state    = {"running": False, "abandoned": False}
+
+        def _fetch() -> None:
+            with claim:
+                if state["abandoned"]:
+                    return
+                state["running"] = True
+            try:
+                with yt_dlp.YoutubeDL(opts) as ytdl:
+                    ytdl.extract_info(url, download=True)
+                # Файл з'являється під остаточним ім'ям лише цілим
+                os.replace(f"{base}.dl.opus", path)
+            finally:
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+
+        try:
+            await self.pool.run(_fetch, AUDIO_DOWNLOAD_TIMEOUT)
+            self.downloads += 1
+        except Exception as e:
+            self.failed += 1
+            log_music_error(f"audio cache download {url}", e)
+            return
+        finally:
+            # Таймаут не зупиняє потік yt-dlp: поки він пише *.dl.*, ключ лишається в _pending
+            with claim:
+                state["abandoned"] = True
+                running = state["running"]
+            if running:
+                await asyncio.shield(finished)
+            for leftover in self.root.glob(f"{base.name}.dl.*"):
+                try:
+                    leftover.unlink()
+                except OSError:
+                    pass
+        self._evict()
+        _get_loudness().schedule(track, str(path))
+
+    def _evict(self) -> None:
+        files = sorted(self.root.glob("*.opus"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for p in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                size = p.stat().st_size
+                p.unlink()
+            except OSError:
+                continue   # файл саме грає (Windows) — спробуємо наступного разу
+            total -= size
+            self.evicted += 1
+
+    def close(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.root.glob("*.opus"))
+        return {
+            "files":     len(files),
+            "bytes":     sum(p.stat().st_size for p in files),
+            "max_bytes": self.max_bytes,
+            "hits":      self.hits,
+            "downloads": self.downloads,
+            "pending":   len(self._pending),
+            "failed":    self.failed,
+            "evicted":   self.evicted,
+        }
+
+
+_audio_cache: Optional[AudioCache] = None
+
+def _get_audio_cache() -> Optional[AudioCache]:
+    """None, якщо режим завантаження наперед вимкнено (MUSIC_AUDIO_CACHE)."""
+    global _audio_cache
+    if _audio_cache is None and AUDIO_CACHE_ENABLED and yt_dlp is not None:
+        _audio_cache = AudioCache()
+    return _audio_cache
+
+
+class LoudnessAnalyzer:
+    """
+    Аналіз гучності, один раз на трек. Стрім з мережі міряється тим самим loudnorm, що грає
+    його вперше (підсумок print_format=json з stderr ffmpeg, capture / collect) — другого
+    завантаження й декодування немає. Локальний файл з кешу аудіо грає без перекодування,
+    тож його міряємо у фоні: ReplayGain/R128 теги або повний прохід loudnorm по диску.
+    Підсумкове підсилення пишеться в MetadataCache і далі застосовується дешевим volume=.
+    """
+
+    def __init__(self, workers: int = LOUDNESS_WORKERS):
+        self._sem = asyncio.Semaphore(workers)
+        self._pending: Dict[str, asyncio.Task] = {}
+
+        self.measured = 0
+        self.tagged   = 0
+        self.inline   = 0   # виміряно під час першого програвання
+        self.failed   = 0
+        self._seconds_total = 0.0
+
+    def lookup(self, track: "Track") -> Optional[float]:
+        if track.gain_db is None:
+            track.gain_db = _get_cache().get_gain(track.webpage_url)
+        return track.gain_db
+
+    def schedule(self, track: "Track", local_path: str) -> None:
+        """Фоновий аналіз файлу з кешу аудіо (стріми міряються через capture / collect)."""
+        key = track.webpage_url
+        if self.lookup(track) is not None or key in self._pending or not ffmpeg_available():
+            return
+        task = asyncio.create_task(self._analyse(track, local_path))
+        self._pending[key] = task
+        task.add_done_callback(lambda _t: self._pending.pop(key, None))
+
+    async def _analyse(self, track: "Track", local_path: str) -> None:
+        try:
+            async with self._sem:
+                started = time.monotonic()
+                gain = await self._read_tags(local_path)
+                if gain is not None:
+                    self.tagged += 1
+                else:
+                    gain = await self._measure(local_path)
+                    self.measured += 1
+                    self._seconds_total += time.monotonic() - started
+        except Exception as e:
+            self.failed += 1
+            log_music_error(f"loudness analysis {track.webpage_url}", e)
+            return
+        self._store(track, gain)
+
+    def _store(self, track: "Track", gain: float) -> None:
+        track.gain_db = gain
+        _get_cache().put_gain(track.webpage_url, gain)
+
+    @staticmethod
+    def capture():
+        """Файл для stderr ffmpeg першого програвання: туди loudnorm допише свій підсумок."""
+        return tempfile.TemporaryFile()
+
+    def collect(self, track: "Track", capture, played: float) -> None:
+        """Забрати вимірювання з програвання — лише якщо трек дограв до кінця з самого початку."""
+        try:
+            if track.gain_db is not None or not track.duration or played < track.duration - EARLY_END_SLACK:
+                return
+            capture.seek(0)
+            m = LOUDNORM_JSON_RE.search(capture.read().decode("utf-8", errors="ignore"))
+            if not m:
+                return
+            data = json.loads(m.group(0))
+            self._store(track, self._gain_for(float(data["input_i"]), float(data["input_tp"])))
+            self.inline += 1
+        except Exception as e:
+            self.failed += 1
+            log_music_error(f"loudness capture {track.webpage_url}", e)
+        finally:
+            capture.close()
+
+    @staticmethod
+    def _gain_for(integrated: float, true_peak: Optional[float]) -> float:
+        if integrated == float("-inf"):
+            return 0.0   # тиша
+        gain = LOUDNESS_TARGET_I - integrated
+        if true_peak is not None:
+            gain = min(gain, LOUDNESS_TARGET_TP - true_peak)
+        return round(gain, 2)
+
+    async def _ffmpeg_stderr(self, args: List[str]) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-nostats", *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, err = await asyncio.wait_for(proc.communicate(), timeout=LOUDNESS_TIMEOUT)
+        except BaseException:
+            proc.kill()
+            await proc.wait()
+            raise
+        return err.decode("utf-8", errors="ignore")
+
+    async def _read_tags(self, path: str) -> Optional[float]:
+        # Без виходу ffmpeg лише друкує метадані файлу й завершується
+        tags = {k.upper(): v for k, v in RG_TAG_RE.findall(await self._ffmpeg_stderr(["-i", path]))}
+        peak = None
+        if "REPLAYGAIN_TRACK_PEAK" in tags:
+            try:
+                peak = 20 * math.log10(float(tags["REPLAYGAIN_TRACK_PEAK"]))
+            except ValueError:
+                pass
+        try:
+            if "R128_TRACK_GAIN" in tags:
+                # Q7.8 відносно -23 LUFS (RFC 7845)
+                return self._gain_for(-23.0 - int(tags["R128_TRACK_GAIN"]) / 256, peak)
+            if "REPLAYGAIN_TRACK_GAIN" in tags:
+                # ReplayGain 2.0: відносно -18 LUFS
+                return self._gain_for(-18.0 - float(tags["REPLAYGAIN_TRACK_GAIN"]), peak)
+        except ValueError:
+            pass
+        return None
+
+    async def _measure(self, path: str) -> float:
+        args = ["-i", path, "-vn", "-af", f"{LOUDNORM_FILTER}:print_format=json", "-f", "null", "-"]
+        m = LOUDNORM_JSON_RE.search(await self._ffmpeg_stderr(args))
+        if not m:
+            raise RuntimeError("loudnorm не повернув вимірювання")
+        data = json.loads(m.group(0))
+        return self._gain_for(float(data["input_i"]), float(data["input_tp"]))
+
+    def close(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "measured":      self.measured,
+            "tagged":        self.tagged,
+            "inline":        self.inline,
+            "failed":        self.failed,
+            "pending":       len(self._pending),
+            "avg_measure_s": round(self._seconds_total / self.measured, 2) if self.measured else 0.0,
+        }
+
+
+_loudness: Optional[LoudnessAnalyzer] = None
+
+def _get_loudness() -> LoudnessAnalyzer:
+    global _loudness
+    if _loudness is None:
+        _loudness = LoudnessAnalyzer()
+    return _loudness
+
+
+class Histogram:
+    """Гістограма з фіксованими межами (мс); квантилі — за верхньою межею кошика."""
+
+    def __init__(self, bounds: Tuple[int, ...] = LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count  = 0
+        self.total  = 0.0
+        self.max    = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        i = 0
+        while i < len(self.bounds) and value_ms > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in self.bounds] + ["inf"]
+        return {
+            "count":   self.count,
+            "avg_ms":  round(self.total / self.count, 1) if self.count else None,
+            "p50_ms":  self.quantile(0.5),
+            "p95_ms":  self.quantile(0.95),
+            "max_ms":  round(self.max, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class MusicMetrics:
+    """
+    Куди йде час у музиці: резолв і пошук yt-dlp, від /hrai до першого звуку, від взяття
+    треку з черги до першого кадру, пауза між треками; плюс запуски ffmpeg, ранні EOF, заїкання і байти.
+    """
+
+    def __init__(self):
+        self.search_ms           = Histogram()   # ytdl_extract (пошук / плейлист)
+        self.resolve_ms          = Histogram()   # стрім одного треку
+        self.request_to_audio_ms = Histogram()   # /hrai -> перший кадр (гравець простоював)
+        self.startup_ms          = Histogram()   # трек узято з черги -> перший кадр
+        self.gap_ms              = Histogram()   # кінець треку -> перший кадр наступного
+
+        self.tracks_started  = 0
+        self.tracks_failed   = 0
+        self.ffmpeg_spawns   = 0   # процеси ffmpeg плеєра (разом із прогрівом наступного треку)
+        self.early_eofs      = 0   # ffmpeg віддав EOF задовго до кінця треку — стрім обірвався
+        self.underruns       = 0   # кадри, які ffmpeg не встиг віддати вчасно
+        self.audio_bytes     = 0   # PCM/Opus, переданий у voice
+
+    def snapshot(self, players: Dict[int, "GuildPlayer"]) -> Dict[str, Any]:
+        return {
+            "generated_at": int(time.time()),
+            "latency": {
+                "search":           self.search_ms.snapshot(),
+                "resolve":          self.resolve_ms.snapshot(),
+                "request_to_audio": self.request_to_audio_ms.snapshot(),
+                "startup":          self.startup_ms.snapshot(),
+                "gap":              self.gap_ms.snapshot(),
+            },
+            "counters": {
+                "tracks_started":  self.tracks_started,
+                "tracks_failed":   self.tracks_failed,
+                "ffmpeg_spawns":   self.ffmpeg_spawns,
+                "early_eofs":      self.early_eofs,
+                "underruns":       self.underruns,
+                "audio_bytes":     self.audio_bytes,
+            },
+            "guilds": {
+                str(gid): {
+                    "queue":      len(player.queue),
+                    "peak_queue": player.queue.peak,
+                    "queued_s":   player.queue.total_duration,
+                    "playing":    player.current is not None,
+                }
+                for gid, player in players.items()
+            },
+            "resolver":    _get_resolver().stats(),
+            "cache":       _get_cache().stats(),
+            "loudness":    _get_loudness().stats(),
+            "audio_cache": _get_audio_cache().stats() if _get_audio_cache() else None,
+        }
+
+
+_metrics: Optional[MusicMetrics] = None
+
+def _get_metrics() -> MusicMetrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = MusicMetrics()
+    return _metrics
+
+
+class ResolveCancelled(Exception):
+    """Резолв треку скасовано — трек пропустили або чергу очистили."""
+
+
+class ResolverPool:
+    """
+    Окремий пул потоків для yt-dlp, щоб екстракція не забивала default executor,
+    яким користується і discord.py. У кожного потоку свої екземпляри YoutubeDL
+    (вони не потокобезпечні), створені один раз на набір опцій.
+    Скасований запит, що ще чекає в черзі, до потоку не дійде; запущений —
+    дограє у фоні, але результат відкидається. Таймаут працює так само.
+    """
+
+    def __init__(self, workers: int = RESOLVER_WORKERS):
+        self.workers   = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdl")
+        self._local    = threading.local()
+        self._lock     = threading.Lock()
+
+        self.queued     = 0   # чекають вільного потоку
+        self.running    = 0
+        self.max_queued = 0
+        self.submitted  = 0
+        self.completed  = 0
+        self.failed     = 0
+        self.timeouts   = 0
+        self.cancelled  = 0
+        self._latency_total = 0.0
+
+    def _ytdl(self, opts: Dict[str, Any]):
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        key = id(opts)
+        if key not in instances:
+            instances[key] = yt_dlp.YoutubeDL(opts)
+        return instances[key]
+
+    def _run(self, fn):
+        with self._lock:
+            self.queued  -= 1
+            self.running += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def extract(self, query: str, opts: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        return await self.run(lambda: self._ytdl(opts).extract_info(query, download=False), timeout)
+
+    async def run(self, fn, timeout: float):
+        """Виконати `fn()` у потоці пулу (з метриками, таймаутом і скасуванням)."""
+        if yt_dlp is None:
+            raise RuntimeError("yt-dlp не встановлений.")
+
+        with self._lock:
+            self.queued    += 1
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        started = time.monotonic()
+        future  = self._executor.submit(self._run, fn)
+        try:
+            info = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.timeouts += 1
+            raise RuntimeError(f"yt-dlp не відповів за {timeout} с") from None
+        except asyncio.CancelledError:
+            self._abandon(future)
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        self._latency_total += time.monotonic() - started
+        return info
+
+    def _abandon(self, future) -> None:
+        # Ще не стартував — прибираємо з черги; вже працює — результат нікому не потрібен
+        if future.cancel():
+            with self._lock:
+                self.queued -= 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers":        self.workers,
+            "queued":         self.queued,
+            "running":        self.running,
+            "max_queued":     self.max_queued,
+            "submitted":      self.submitted,
+            "completed":      self.completed,
+            "failed":         self.failed,
+            "timeouts":       self.timeouts,
+            "cancelled":      self.cancelled,
+            "avg_latency_ms": round(self._latency_total / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+
+_resolver: Optional[ResolverPool] = None
+
+def _get_resolver() -> ResolverPool:
+    global _resolver
+    if _resolver is None:
+        _resolver = ResolverPool()
+    return _resolver
 
 
 @dataclass
 class Track:
     title: str
     webpage_url: str
-    stream_url: str
+    stream_url: Optional[str] = None
     duration: Optional[int] = None
     thumbnail: Optional[str] = None
     requester_id: Optional[int] = None
     source: str = "Unknown"
+    expires_at: Optional[float] = None
+    gain_db: Optional[float] = None
+    start_at: float = 0.0   # з якої секунди почати (відновлена сесія / перевідкриття з новою гучністю)
+    requested_at: Optional[float] = field(default=None, repr=False, compare=False)   # /hrai, що запустив простий гравець
+    dequeued_at: Optional[float] = field(default=None, repr=False, compare=False)
+    _resolving: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "title":        self.title,
+            "webpage_url":  self.webpage_url,
+            "duration":     self.duration,
+            "thumbnail":    self.thumbnail,
+            "requester_id": self.requester_id,
+            "source":       self.source,
+        }
+
+    def stream_fresh(self) -> bool:
+        """Чи доживе підписаний URL до кінця треку."""
+        if not self.stream_url or self.expires_at is None:
+            return False
+        return time.time() + (self.duration or 0) + STREAM_EXPIRY_MARGIN < self.expires_at
+
+    def apply_info(self, info: Dict[str, Any]) -> bool:
+        stream_url = _pick_stream_url(info)
+        if not stream_url:
+            return False
+        self.stream_url = stream_url
+        self.expires_at = _stream_expiry(stream_url)
+        if info.get("title"):
+            self.title = info["title"]
+        self.duration  = info.get("duration") or self.duration
+        self.thumbnail = info.get("thumbnail") or self.thumbnail
+        self.webpage_url = info.get("webpage_url") or self.webpage_url
+        self.source = _detect_source(self.webpage_url)
+        return True
+
+    def prefetch(self) -> Optional[asyncio.Task]:
+        """Запустити резолв у фоні (один на трек), якщо URL немає або він протухне."""
+        if self.stream_fresh():
+            return None
+        if self._resolving is None or self._resolving.done():
+            self._resolving = asyncio.create_task(_resolve_stream(self))
+            # Помилку фонового резолву заберемо тут; при програванні буде нова спроба
+            self._resolving.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._resolving
+
+    async def ensure_stream(self) -> None:
+        task = self.prefetch()
+        if task is None:
+            return
+        await asyncio.wait({task})
+        if task.cancelled():
+            raise ResolveCancelled(self.title)
+        task.result()
+
+    def cancel_resolve(self) -> bool:
+        """Скасувати фоновий резолв (трек пропустили / прибрали з черги)."""
+        if self._resolving is not None and not self._resolving.done():
+            self._resolving.cancel()
+            return True
+        return False
+
+
+async def _resolve_stream(track: Track) -> None:
+    cache = _get_cache()
+    if cache.apply_stream(track):
+        return
+
+    requested = track.webpage_url
+    started   = time.monotonic()
+    info = await _get_resolver().extract(requested, YTDL_OPTS, RESOLVE_TIMEOUT)
+    _get_metrics().resolve_ms.observe((time.monotonic() - started) * 1000)
+
+    if isinstance(info, dict) and info.get("entries") is not None:
+        info = next((e for e in info["entries"] if e), None)
+    if not isinstance(info, dict) or not track.apply_info(info):
+        raise RuntimeError(f"Не вдалося отримати аудіопотік: {track.title}")
+    cache.put_stream(requested, track, info)
+
+
+def _track_from_flat(entry: Dict[str, Any], fallback_url: str) -> Optional[Track]:
+    webpage = entry.get("webpage_url") or entry.get("original_url") or entry.get("url") or fallback_url
+    if not webpage:
+        return None
+    thumbnail = entry.get("thumbnail")
+    if not thumbnail and entry.get("thumbnails"):
+        thumbnail = (entry["thumbnails"][-1] or {}).get("url")
+    track = Track(
+        title=entry.get("title") or webpage,
+        webpage_url=webpage,
+        duration=entry.get("duration"),
+        thumbnail=thumbnail,
+        source=_detect_source(webpage),
+    )
+    # Повний запис (не "url"-заглушка) вже містить стрім — резолвити не треба
+    if entry.get("_type") not in ("url", "url_transparent") and entry.get("formats"):
+        track.apply_info(entry)
+    return track
+
+
+def lazy_track(url: str) -> Track:
+    """Трек з одного посилання без звернення до мережі — все решта при резолві."""
+    return Track(title=url, webpage_url=url, source=_detect_source(url))
 
 
 async def ytdl_extract(url_or_query: str) -> Tuple[List[Track], bool, str]:
     if yt_dlp is None:
         return [], False, "Missing"
 
-    ytdl = yt_dlp.YoutubeDL(YTDL_OPTS)
-    loop = asyncio.get_running_loop()
+    cache  = _get_cache()
+    cached = cache.get_query(url_or_query)
+    if cached is not None:
+        return cached
 
-    def _extract():
-        return ytdl.extract_info(url_or_query, download=False)
-
-    info = await loop.run_in_executor(None, _extract)
-    if not info:
+    started = time.monotonic()
+    info = await _get_resolver().extract(url_or_query, YTDL_FLAT_OPTS, EXTRACT_TIMEOUT)
+    _get_metrics().search_ms.observe((time.monotonic() - started) * 1000)
+    if not info or not isinstance(info, dict):
         return [], False, "Unknown"
 
-    def detect_source(webpage: str) -> str:
-        w = (webpage or "").lower()
-        if "soundcloud.com" in w:
-            return "SoundCloud"
-        if "youtube.com" in w or "youtu.be" in w:
-            return "YouTube"
-        return "Search"
-
-    tracks: List[Track] = []
-    is_playlist = False
-
-    if isinstance(info, dict) and "entries" in info and isinstance(info["entries"], list):
-        is_playlist = True
+    if info.get("entries") is not None:
+        tracks: List[Track] = []
         for entry in info["entries"]:
             if not entry:
                 continue
+            track = _track_from_flat(entry, url_or_query)
+            if track:
+                tracks.append(track)
+        source = _detect_source(info.get("webpage_url") or url_or_query)
+        if tracks:
+            cache.put_query(url_or_query, tracks, True, source)
+        return tracks, True, source
 
-            stream_url = entry.get("url")
-            webpage = entry.get("webpage_url") or entry.get("original_url") or url_or_query
+    webpage = info.get("webpage_url") or info.get("original_url") or url_or_query
+    track = Track(title=info.get("title", "Unknown title"), webpage_url=webpage, source=_detect_source(webpage))
+    if not track.apply_info(info):
+        return [], False, _detect_source(webpage)
+    cache.put_query(url_or_query, [track], False, track.source)
+    cache.put_stream(url_or_query, track, info)
+    return [track], False, track.source
+
+
+class _FrameCounter:
+    """Лічильник відіграних кадрів (позиція без урахування пауз) і сигнал першого кадру."""
+
+    frames = 0
+    bytes  = 0
+    eof    = False   # ffmpeg сам дійшов до кінця виводу
+    offset = 0.0     # з якої секунди стартував ffmpeg (-ss)
+    _on_first_frame = None
+    _on_cleanup     = None   # отримує позицію, коли ffmpeg уже закрито
+
+    @property
+    def position(self) -> float:
+        return self.offset + self.frames * FRAME_SECONDS
+
+    def _count(self, data: bytes, read_seconds: float) -> bytes:
+        if not data:
+            self.eof = True
+            return data
+        if self.frames == 0:
+            if self._on_first_frame:
+                self._on_first_frame(time.monotonic())
+        elif read_seconds > UNDERRUN_SECONDS:
+            _get_metrics().underruns += 1
+        self.frames += 1
+        self.bytes  += len(data)
+        return data
 
-            if not entry.get("formats") and entry.get("_type") in ("url", "url_transparent") and entry.get("url"):
-                def _resolve():
-                    return ytdl.extract_info(entry["url"], download=False)
-                try:
-                    resolved = await loop.run_in_executor(None, _resolve)
-                except Exception as e:
-                    log_music_error("ytdl_extract resolve playlist entry", e)
-                    continue
-                if not resolved:
-                    continue
-                entry = resolved
-                stream_url = entry.get("url")
-                webpage = entry.get("webpage_url") or entry.get("original_url") or url_or_query
-
-            if not stream_url and entry.get("formats"):
-                formats = entry.get("formats") or []
-                for fmt in reversed(formats):
-                    if fmt.get("url"):
-                        stream_url = fmt.get("url")
-                        break
-
-            if not stream_url:
-                continue
 
-            src_label = detect_source(webpage)
-            tracks.append(Track(
-                title=entry.get("title", "Unknown title"),
-                webpage_url=webpage,
-                stream_url=stream_url,
-                duration=entry.get("duration"),
-                thumbnail=entry.get("thumbnail"),
-                source=src_label,
-            ))
+class TrackedSource(_FrameCounter, discord.PCMVolumeTransformer):
 
-        src_label = detect_source(info.get("webpage_url") or url_or_query)
-        return tracks, True, src_label
+    def __init__(self, original: discord.AudioSource, volume: float, on_first_frame=None):
+        super().__init__(original, volume=volume)
+        self._on_first_frame = on_first_frame
 
-    if not isinstance(info, dict):
-        return [], False, "Unknown"
+    def read(self) -> bytes:
+        started = time.perf_counter()
+        data = super().read()
+        return self._count(data, time.perf_counter() - started)
 
-    webpage = info.get("webpage_url") or info.get("original_url") or url_or_query
-    stream_url = info.get("url")
-    if not stream_url and info.get("formats"):
-        formats = info.get("formats") or []
-        for fmt in reversed(formats):
-            if fmt.get("url"):
-                stream_url = fmt.get("url")
-                break
+    def cleanup(self) -> None:
+        super().cleanup()
+        if self._on_cleanup:
+            on_cleanup, self._on_cleanup = self._on_cleanup, None
+            on_cleanup(self.position)
+
+
+class TrackedOpusSource(_FrameCounter, discord.AudioSource):
+    """Opus-пакети з кешованого файлу йдуть у Discord як є — без PCM і перекодування."""
+
+    def __init__(self, original: discord.AudioSource, on_first_frame=None):
+        self.original = original
+        self._on_first_frame = on_first_frame
+
+    def is_opus(self) -> bool:
+        return True
 
-    if stream_url:
-        src_label = detect_source(webpage)
-        tracks.append(Track(
-            title=info.get("title", "Unknown title"),
-            webpage_url=webpage,
-            stream_url=stream_url,
-            duration=info.get("duration"),
-            thumbnail=info.get("thumbnail"),
-            source=src_label,
-        ))
+    def read(self) -> bytes:
+        started = time.perf_counter()
+        data = self.original.read()
+        return self._count(data, time.perf_counter() - started)
 
-    src_label = detect_source(webpage)
-    return tracks, False, src_label
+    def cleanup(self) -> None:
+        self.original.cleanup()
+
+
+class TrackQueue:
+    """
+    Черга гравця поверх deque: O(1) додавання/зняття з обох кінців, сторінки без копіювання
+    всієї черги, поточна сумарна тривалість і сигнал "не порожня" для циклу програвання.
+    """
+
+    def __init__(self):
+        self._items: deque = deque()
+        self._counted: Dict[int, int] = {}   # id(track) -> тривалість, врахована в total_duration
+        self._not_empty = asyncio.Event()
+        self.total_duration = 0
+        self.peak = 0   # найбільша довжина черги
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def _added(self, track: Track) -> None:
+        dur = track.duration or 0
+        self._counted[id(track)] = dur
+        self.total_duration += dur
+        self.peak = max(self.peak, len(self._items))
+        self._not_empty.set()
+
+    def _removed(self, track: Track) -> Track:
+        self.total_duration -= self._counted.pop(id(track), 0)
+        if not self._items:
+            self._not_empty.clear()
+        return track
+
+    def push(self, track: Track) -> None:
+        self._items.append(track)
+        self._added(track)
+
+    def push_front(self, track: Track) -> None:
+        self._items.appendleft(track)
+        self._added(track)
+
+    def pop(self) -> Track:
+        return self._removed(self._items.popleft())
+
+    def peek(self) -> Optional[Track]:
+        return self._items[0] if self._items else None
+
+    async def wait_not_empty(self) -> None:
+        await self._not_empty.wait()
+
+    async def get(self) -> Track:
+        while not self._items:
+            await self.wait_not_empty()
+        return self.pop()
+
+    def head(self, count: int):
+        return itertools.islice(self._items, count)
+
+    def page(self, start: int, count: int) -> List[Track]:
+        return list(itertools.islice(self._items, start, start + count))
+
+    def recount(self, track: Track) -> None:
+        """Тривалість треку стала відома після резолву — оновити суму."""
+        key = id(track)
+        if key in self._counted:
+            dur = track.duration or 0
+            self.total_duration += dur - self._counted[key]
+            self._counted[key] = dur
+
+    def remove(self, index: int) -> Track:
+        track = self._items[index]
+        del self._items[index]
+        return self._removed(track)
+
+    def move(self, src: int, dst: int) -> Track:
+        track = self._items[src]
+        del self._items[src]
+        self._items.insert(dst, track)
+        return track
+
+    def shuffle(self) -> None:
+        items = list(self._items)
+        random.shuffle(items)
+        self._items = deque(items)
+
+    def clear(self) -> List[Track]:
+        items = list(self._items)
+        self._items.clear()
+        self._counted.clear()
+        self.total_duration = 0
+        self._not_empty.clear()
+        return items
 
 
 class GuildPlayer:
     def __init__(self):
-        self.queue: asyncio.Queue[Track] = asyncio.Queue()
+        self.queue = TrackQueue()
         self.current: Optional[Track] = None
-        self.history: List[Track] = []
-        self.volume: float = 0.8
+        self.history: deque = deque(maxlen=HISTORY_MAX)
+        self.volume: float = DEFAULT_VOLUME
         self.nowplaying_message_id: Optional[int] = None
         self.queue_page: int = 0
         self._task: Optional[asyncio.Task] = None
+        self._warm: Optional[Tuple[Track, discord.AudioSource]] = None
+        self._ended_at: Optional[float] = None
+        self.last_gap_ms: Optional[float] = None
+        self.gaps: deque = deque(maxlen=GAP_HISTORY)
+        self.channel_id: Optional[int] = None
+        self._source: Optional[_FrameCounter] = None
+        self._reopening: Optional[Track] = None   # трек уже перевідкривається з новою гучністю
+
+    @property
+    def pcm_volume(self) -> float:
+        """Множник для PCMVolumeTransformer: гучність відносно DEFAULT_VOLUME."""
+        return self.volume / DEFAULT_VOLUME
+
+    def at_unity(self) -> bool:
+        return abs(self.volume - DEFAULT_VOLUME) < 1e-6
+
+    def prefetch(self) -> None:
+        """Резолвимо стріми наступних PREFETCH_AHEAD треків, поки грає поточний."""
+        audio = _get_audio_cache()
+        for track in self.queue.head(PREFETCH_AHEAD):
+            if audio and audio.has(track):
+                continue
+            task = track.prefetch()
+            if task is not None:
+                task.add_done_callback(lambda _t, t=track: self.queue.recount(t))
+            if audio:
+                audio.download_ahead(track)
+
+    def clear_queue(self) -> None:
+        """Очистити чергу, скасувавши резолви, які вже не знадобляться."""
+        for track in self.queue.clear():
+            track.cancel_resolve()
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Стан для відновлення після рестарту; None — зберігати нічого."""
+        if not self.current and not self.queue:
+            return None
+        current = None
+        if self.current:
+            position = self._source.position if self._source else self.current.start_at
+            current = {"track": self.current.snapshot(), "position": round(position, 1)}
+        return {
+            "channel_id": self.channel_id,
+            "volume":     self.volume,
+            "current":    current,
+            "queue":      [t.snapshot() for t in self.queue],
+        }
 
     def ensure_task(self, bot: commands.Bot, guild_id: int):
         if self._task is None or self._task.done():
             self._task = bot.loop.create_task(self._player_loop(bot, guild_id))
 
+    # ── Безшовний перехід між треками ────────────────────────────────────────
+
+    def _make_source(self, bot: commands.Bot, track: Track, cached: Optional[Path] = None) -> discord.AudioSource:
+        on_first_frame = lambda at: bot.loop.call_soon_threadsafe(self._first_frame, track, at)
+        _get_metrics().ffmpeg_spawns += 1
+        gain = _get_loudness().lookup(track)
+        offset, track.start_at = track.start_at, 0.0
+        seek = f"-ss {offset:.1f}" if offset else ""
+        if self._reopening is track:
+            self._reopening = None
+
+        if cached is not None:
+            # Якщо змінювати нічого (стартова гучність і корекція в межах GAIN_PASSTHROUGH_DB) — Opus з файлу
+            # йде напряму; інакше декодуємо з диска, щоб працювали гучність і вирівнювання
+            if self.at_unity() and (gain is None or abs(gain) < GAIN_PASSTHROUGH_DB):
+                src = TrackedOpusSource(discord.FFmpegOpusAudio(str(cached), codec="copy", before_options=seek or None), on_first_frame)
+            else:
+                src = TrackedSource(
+                    discord.FFmpegPCMAudio(str(cached), before_options=seek or None, options=_ffmpeg_opts(gain)),
+                    self.pcm_volume,
+                    on_first_frame,
+                )
+        else:
+            # Перше програвання з самого початку заодно міряє гучність — окремий прохід не потрібен
+            capture = _get_loudness().capture() if gain is None and not offset else None
+            src = TrackedSource(
+                discord.FFmpegPCMAudio(
+                    track.stream_url,
+                    before_options=f"{seek} {FFMPEG_BEFORE_OPTS}{' -nostats' if capture else ''}".strip(),
+                    options=_ffmpeg_opts(gain, measure=capture is not None),
+                    stderr=capture,
+                ),
+                volume=self.pcm_volume,
+                on_first_frame=on_first_frame,
+            )
+            if capture is not None:
+                src._on_cleanup = lambda played: bot.loop.call_soon_threadsafe(
+                    _get_loudness().collect, track, capture, played,
+                )
+        src.offset = offset
+        return src
+
+    async def _open_source(self, bot: commands.Bot, track: Track) -> discord.AudioSource:
+        audio  = _get_audio_cache()
+        cached = audio.get(track) if audio else None
+        if cached is not None:
+            _get_cache().apply_stream(track)   # назва / тривалість без мережі
+        else:
+            await track.ensure_stream()
+        # Стрім без аналізу зараз піде через loudnorm і заодно виміряється, файл з кешу — аналізується у фоні
+        if cached is not None:
+            _get_loudness().schedule(track, str(cached))
+        return self._make_source(bot, track, cached)
+
+    def _take_warm(self, track: Track) -> Optional[discord.AudioSource]:
+        if self._warm and self._warm[0] is track and (self.at_unity() or isinstance(self._warm[1], TrackedSource)):
+            src = self._warm[1]
+            self._warm = None
+            return src
+        self._drop_warm()
+        return None
+
+    def _drop_warm(self) -> None:
+        if self._warm:
+            self._warm[1].cleanup()
+            self._warm = None
+
+    def _track_ended(self, done: asyncio.Event, ended_at: float) -> None:
+        self._ended_at = ended_at
+        done.set()
+
+    def _first_frame(self, track: Track, at: float) -> None:
+        metrics = _get_metrics()
+        metrics.tracks_started += 1
+        if track.dequeued_at is not None:
+            metrics.startup_ms.observe((at - track.dequeued_at) * 1000)
+        if track.requested_at is not None:
+            metrics.request_to_audio_ms.observe((at - track.requested_at) * 1000)
+            track.requested_at = None
+        self._record_gap(at)
+
+    def _record_gap(self, first_frame_at: float) -> None:
+        if self._ended_at is None:
+            return
+        gap = (first_frame_at - self._ended_at) * 1000
+        self._ended_at = None
+        self.last_gap_ms = gap
+        self.gaps.append(gap)
+        _get_metrics().gap_ms.observe(gap)
+        print(f"[MUSIC] Пауза між треками: {gap:.0f} мс")
+
+    def apply_volume(self, vc: Optional[discord.VoiceClient]) -> None:
+        """
+        Застосувати self.volume до того, що грає. Opus-passthrough з кешу гучності не має —
+        при відході від стартової гучності такий трек один раз перевідкривається як PCM
+        з поточної позиції; кліки, поки він перевідкривається, лише змінюють self.volume.
+        """
+        src = vc.source if vc else None
+        if isinstance(src, discord.PCMVolumeTransformer):
+            src.volume = self.pcm_volume
+        elif (
+            isinstance(src, TrackedOpusSource) and self.current is not None
+            and not self.at_unity() and self._reopening is not self.current
+        ):
+            track = self.current
+            track.start_at  = src.position
+            self._reopening = track
+            self.queue.push_front(track)
+            vc.stop()
+
+    @staticmethod
+    def _note_early_eof(track: Track, src: _FrameCounter) -> None:
+        """ffmpeg сам віддав EOF задовго до кінця треку (vc.stop() до EOF не доходить) — стрім обірвався."""
+        if not src.eof or not track.duration or src.position >= track.duration - EARLY_END_SLACK:
+            return
+        _get_metrics().early_eofs += 1
+        print(f"[MUSIC] ffmpeg обірвався на {src.position:.0f}/{track.duration} с: {track.title}")
+
+    async def _prewarm(self, bot: commands.Bot, playing: _FrameCounter, track: Track, done: asyncio.Event) -> None:
+        """За PREWARM_SECONDS до кінця поточного треку запускаємо ffmpeg наступного, щоб він встиг підключитись і забуферитись."""
+        if not track.duration:
+            return
+        while not done.is_set():
+            left = track.duration - playing.position - PREWARM_SECONDS
+            if left <= 0:
+                break
+            try:
+                await asyncio.wait_for(done.wait(), timeout=left)
+            except asyncio.TimeoutError:
+                pass
+
+        nxt = self.queue.peek()
+        if done.is_set() or nxt is None:
+            return
+        try:
+            src = await self._open_source(bot, nxt)
+            if done.is_set() or self.queue.peek() is not nxt:
+                src.cleanup()
+                return
+            self._drop_warm()
+            self._warm = (nxt, src)
+        except ResolveCancelled:
+            pass
+        except Exception as e:
+            log_music_error("prewarm next track", e)
+
     async def _player_loop(self, bot: commands.Bot, guild_id: int):
+        try:
+            await self._play_queue(bot, guild_id)
+        finally:
+            self._drop_warm()
+            self._ended_at = None
+
+    async def _play_queue(self, bot: commands.Bot, guild_id: int):
         while True:
             track = await self.queue.get()
-            self.current = track
+            track.dequeued_at   = time.monotonic()
+            self.current        = track
 
             guild = bot.get_guild(guild_id)
             if not guild:
@@ -280,22 +1594,29 @@ class GuildPlayer:
                 self.current = None
                 continue
 
-            self.history.append(track)
+            if not self.history or self.history[-1] is not track:   # перевідкриття з новою гучністю — той самий трек
+                self.history.append(track)
 
             try:
                 if not ffmpeg_available():
                     raise RuntimeError("ffmpeg не знайдений на сервері.")
 
-                src = discord.PCMVolumeTransformer(
-                    discord.FFmpegPCMAudio(
-                        track.stream_url,
-                        before_options=FFMPEG_BEFORE_OPTS,
-                        options=FFMPEG_OPTS,
-                    ),
-                    volume=self.volume,
-                )
+                src = self._take_warm(track)
+                if src is None:
+                    try:
+                        src = await self._open_source(bot, track)
+                    except ResolveCancelled:
+                        self.current = None
+                        self.prefetch()
+                        if not self.queue:
+                            break
+                        continue
+                if isinstance(src, TrackedSource):
+                    src.volume = self.pcm_volume
+                self.prefetch()
             except Exception as e:
-                log_music_error("create FFmpeg audio source", e)
+                log_music_error("resolve stream / create FFmpeg audio source", e)
+                _get_metrics().tracks_failed += 1
                 self.current = None
                 cog = bot.get_cog("MusicCog")
                 if cog:
@@ -304,7 +1625,7 @@ class GuildPlayer:
                     except Exception as send_error:
                         log_music_error("send ffmpeg error to channel", send_error)
                 await asyncio.sleep(0.5)
-                if self.queue.empty():
+                if not self.queue:
                     break
                 continue
 
@@ -313,7 +1634,7 @@ class GuildPlayer:
             def _after(error: Optional[Exception]):
                 if error:
                     log_music_error("voice client after playback", error)
-                bot.loop.call_soon_threadsafe(done.set)
+                bot.loop.call_soon_threadsafe(self._track_ended, done, time.monotonic())
 
             try:
                 vc.play(src, after=_after)
@@ -327,7 +1648,7 @@ class GuildPlayer:
                     except Exception as send_error:
                         log_music_error("send vc.play error to channel", send_error)
                 await asyncio.sleep(0.5)
-                if self.queue.empty():
+                if not self.queue:
                     break
                 continue
 
@@ -338,11 +1659,17 @@ class GuildPlayer:
                 except Exception as e:
                     log_music_error("_post_or_update_nowplaying", e)
 
+            self._source    = src
+            self.channel_id = vc.channel.id if vc.channel else self.channel_id
+            warm_task = asyncio.create_task(self._prewarm(bot, src, track, done))
             await done.wait()
+            warm_task.cancel()
+            _get_metrics().audio_bytes += src.bytes
+            self._note_early_eof(track, src)
+            self._source = None
             self.current = None
 
-            await asyncio.sleep(0.5)
-            if self.queue.empty():
+            if not self.queue:
                 break
 
 
@@ -393,14 +1720,7 @@ class NowPlayingView(discord.ui.View):
         p.history.pop()
         prev = p.history.pop()
 
-        try:
-            p.queue._queue.appendleft(prev)  # type: ignore[attr-defined]
-        except Exception:
-            items = list(p.queue._queue)  # type: ignore[attr-defined]
-            p.queue._queue.clear()  # type: ignore[attr-defined]
-            p.queue._queue.append(prev)  # type: ignore[attr-defined]
-            for t in items:
-                p.queue._queue.append(t)  # type: ignore[attr-defined]
+        p.queue.push_front(prev)
 
         if vc and (vc.is_playing() or vc.is_paused()):
             vc.stop()
@@ -425,6 +1745,11 @@ class NowPlayingView(discord.ui.View):
 
     @discord.ui.button(label="Вперед", style=discord.ButtonStyle.secondary)
     async def next_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
+        p = self._player()
+        if p.current and p.current.cancel_resolve():
+            await interaction.response.send_message("Ок.", ephemeral=True)
+            return
+
         vc = await self._vc(interaction)
         if not vc or not vc.is_connected() or (not vc.is_playing() and not vc.is_paused()):
             await interaction.response.send_message("Нічого не грає.", ephemeral=True)
@@ -437,8 +1762,7 @@ class NowPlayingView(discord.ui.View):
         p = self._player()
         p.volume = max(0.05, round(p.volume - 0.05, 2))
         vc = await self._vc(interaction)
-        if vc and vc.source and isinstance(vc.source, discord.PCMVolumeTransformer):
-            vc.source.volume = p.volume
+        p.apply_volume(vc)
         await interaction.response.send_message(f"Гучність: {int(p.volume * 100)}%", ephemeral=True)
 
     @discord.ui.button(label="Стоп", style=discord.ButtonStyle.danger)
@@ -446,12 +1770,9 @@ class NowPlayingView(discord.ui.View):
         vc = await self._vc(interaction)
         p = self._player()
 
-        while not p.queue.empty():
-            try:
-                p.queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
-
+        p.clear_queue()
+        if p.current:
+            p.current.cancel_resolve()
         p.current = None
 
         if vc and vc.is_connected():
@@ -468,8 +1789,7 @@ class NowPlayingView(discord.ui.View):
         p = self._player()
         p.volume = min(2.0, round(p.volume + 0.05, 2))
         vc = await self._vc(interaction)
-        if vc and vc.source and isinstance(vc.source, discord.PCMVolumeTransformer):
-            vc.source.volume = p.volume
+        p.apply_volume(vc)
         await interaction.response.send_message(f"Гучність: {int(p.volume * 100)}%", ephemeral=True)
 
     @discord.ui.button(label="Черга", style=discord.ButtonStyle.primary)
@@ -482,7 +1802,111 @@ class MusicCog(commands.Cog, name="MusicCog"):
         self.bot = bot
         self.players: Dict[int, GuildPlayer] = {}
         self.autoleave_tasks: Dict[int, asyncio.Task] = {}
-        _ensure_playlists_file()
+        _get_playlists()
+
+        self._sessions_text: Optional[str] = None   # None — ще не відновлено, зберігати не можна
+        self.bot.scheduler.every("music_sessions", SESSION_SAVE_EVERY, self._save_sessions, first_delay=SESSION_SAVE_EVERY)
+        self._restore_task = self.bot.loop.create_task(self._restore_sessions())
+        self.bot.scheduler.every("music_metrics", METRICS_DUMP_EVERY, self._dump_metrics, first_delay=METRICS_DUMP_EVERY)
+        self.bot.scheduler.every("music_cache", CACHE_FLUSH_EVERY, self._flush_cache, first_delay=CACHE_FLUSH_EVERY)
+
+    def cog_unload(self):
+        global _resolver, _cache, _audio_cache, _loudness
+        self.bot.scheduler.remove("music_sessions")
+        self.bot.scheduler.remove("music_metrics")
+        self.bot.scheduler.remove("music_cache")
+        self._restore_task.cancel()
+        self._write_sessions()
+        if _resolver is not None:
+            _resolver.close()
+            _resolver = None
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+        if _audio_cache is not None:
+            _audio_cache.close()
+            _audio_cache = None
+        if _loudness is not None:
+            _loudness.close()
+            _loudness = None
+
+    # ─── Сесії (черга / позиція / гучність) між рестартами ───────────────────
+
+    def _write_sessions(self) -> None:
+        if self._sessions_text is None:
+            return
+        snapshots = {}
+        for gid, player in self.players.items():
+            snap = player.snapshot()
+            if snap:
+                snapshots[str(gid)] = snap
+        text = json.dumps(snapshots, ensure_ascii=False, indent=2)
+        if text == self._sessions_text:
+            return
+        try:
+            _save_sessions(text)
+            self._sessions_text = text
+        except Exception as e:
+            log_music_error("_save_sessions", e)
+
+    async def _save_sessions(self, due):
+        self._write_sessions()
+
+    # ─── Метрики ─────────────────────────────────────────────────────────────
+
+    def _metrics_json(self) -> str:
+        return json.dumps(_get_metrics().snapshot(self.players), ensure_ascii=False, indent=2)
+
+    async def _dump_metrics(self, due):
+        try:
+            METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = METRICS_PATH.with_suffix(".tmp")
+            tmp.write_text(self._metrics_json(), encoding="utf-8")
+            tmp.replace(METRICS_PATH)
+        except Exception as e:
+            log_music_error("_dump_metrics", e)
+
+    async def _flush_cache(self, due):
+        if _cache is None:
+            return
+        try:
+            _cache.flush()
+        except Exception as e:
+            log_music_error("_flush_cache", e)
+
+    async def _restore_sessions(self):
+        await self.bot.wait_until_ready()
+        saved = _load_sessions()
+        self._sessions_text = json.dumps(saved, ensure_ascii=False, indent=2)
+
+        for gid, snap in saved.items():
+            guild = self.bot.get_guild(int(gid))
+            if not guild:
+                continue
+            try:
+                player = self.get_player(guild.id)
+                player.volume     = snap.get("volume", player.volume)
+                player.channel_id = snap.get("channel_id")
+
+                cur = snap.get("current")
+                if cur:
+                    track = Track(**cur["track"])
+                    track.start_at = float(cur.get("position") or 0) if RESUME_PLAYBACK else 0.0
+                    player.queue.push(track)
+                for data in snap.get("queue", []):
+                    player.queue.push(Track(**data))
+
+                channel = guild.get_channel(player.channel_id) if player.channel_id else None
+                resumed = False
+                if RESUME_PLAYBACK and isinstance(channel, discord.VoiceChannel) and any(not m.bot for m in channel.members):
+                    if not guild.voice_client:
+                        await channel.connect(timeout=20.0, reconnect=True)
+                    player.prefetch()
+                    player.ensure_task(self.bot, guild.id)
+                    resumed = True
+                print(f"[MUSIC] {guild.name}: відновлено чергу ({len(player.queue)} треків){', граю далі' if resumed else ''}")
+            except Exception as e:
+                log_music_error(f"restore session {gid}", e)
 
     def get_player(self, guild_id: int) -> GuildPlayer:
         if guild_id not in self.players:
@@ -568,11 +1992,7 @@ class MusicCog(commands.Cog, name="MusicCog"):
             return
         player = self.players.get(guild_id)
         if player:
-            while not player.queue.empty():
-                try:
-                    player.queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    break
+            player.clear_queue()
             player.current = None
         try:
             vc.stop()
@@ -630,13 +2050,13 @@ class MusicCog(commands.Cog, name="MusicCog"):
         return e
 
     def build_queue_embed(self, guild: Optional[discord.Guild], player: GuildPlayer) -> discord.Embed:
-        items = list(player.queue._queue)  # type: ignore[attr-defined]
+        queue = player.queue
         per_page = 10
-        total_pages = max(1, (len(items) + per_page - 1) // per_page)
+        total_pages = max(1, (len(queue) + per_page - 1) // per_page)
         if player.queue_page >= total_pages:
             player.queue_page = max(0, total_pages - 1)
         start = player.queue_page * per_page
-        page_items = items[start:start + per_page]
+        page_items = queue.page(start, per_page)
         lines: List[str] = []
         if player.current:
             cur = player.current
@@ -651,8 +2071,7 @@ class MusicCog(commands.Cog, name="MusicCog"):
                 lines.append(f"{i}. {t.title} {f'[{d}]' if d else ''}")
         else:
             lines.append("Черга порожня.")
-        total_dur = sum([x.duration or 0 for x in items])
-        footer_line = f"Сторінка: {player.queue_page + 1}/{total_pages} | Треків: {len(items)} | Загальна тривалість: {_fmt_dur(total_dur) or '00:00'}"
+        footer_line = f"Сторінка: {player.queue_page + 1}/{total_pages} | Треків: {len(queue)} | Загальна тривалість: {_fmt_dur(queue.total_duration) or '00:00'}"
         e = discord.Embed(description="\n".join(lines), color=TEAL)
         gif = pick_music_gif(player.current.webpage_url) if player.current else (MUSIC_GIFS[0] if MUSIC_GIFS else "")
         if gif:
@@ -707,6 +2126,7 @@ class MusicCog(commands.Cog, name="MusicCog"):
         Головна логіка додавання треку.
         ВАЖЛИВО: defer вже зроблений до виклику цієї функції!
         """
+        requested_at = time.monotonic()
         if not query or not query.strip():
             await self._safe_send(interaction, "Потрібен query: лінк або текст пошуку.")
             return
@@ -742,10 +2162,13 @@ class MusicCog(commands.Cog, name="MusicCog"):
             await self._safe_send(interaction, "Не вдалося витягнути аудіо. Можливо, YouTube заблокував або yt-dlp треба оновити.")
             return
 
+        if player.current is None and not player.queue:
+            tracks[0].requested_at = requested_at   # гравець простоював — міряємо до першого звуку
         for t in tracks:
             t.requester_id = interaction.user.id
-            await player.queue.put(t)
+            player.queue.push(t)
 
+        player.prefetch()
         player.ensure_task(self.bot, interaction.guild_id)
 
         embed = self.build_added_embed(interaction.guild, tracks[0], is_playlist, count=len(tracks))
@@ -799,9 +2222,8 @@ class MusicCog(commands.Cog, name="MusicCog"):
                 return
             pl_name = playlist.strip()
 
-            data = _load_playlists()
-            user_bucket = _pl_get_user(data, interaction.user.id)
-            pls = _pl_list(user_bucket)
+            store = _get_playlists()
+            pls = store.playlists(interaction.user.id)
 
             # ── pl_play ───────────────────────────────────────────────────────
             if m == "pl_play":
@@ -837,16 +2259,20 @@ class MusicCog(commands.Cog, name="MusicCog"):
                 first_track: Optional[Track] = None
 
                 for u in urls:
-                    try:
-                        tracks, _is_pl, _src = await ytdl_extract(u)
-                    except Exception as e:
-                        log_music_error(f"pl_play extract {u}", e)
-                        continue
+                    # Окреме відео ставимо в чергу одразу, стрім і назва — при резолві
+                    if not PLAYLIST_URL_RE.search(u):
+                        tracks = [lazy_track(u)]
+                    else:
+                        try:
+                            tracks, _is_pl, _src = await ytdl_extract(u)
+                        except Exception as e:
+                            log_music_error(f"pl_play extract {u}", e)
+                            continue
                     if not tracks:
                         continue
                     for t in tracks:
                         t.requester_id = interaction.user.id
-                        await player.queue.put(t)
+                        player.queue.push(t)
                         added += 1
                         if not first_track:
                             first_track = t
@@ -855,6 +2281,7 @@ class MusicCog(commands.Cog, name="MusicCog"):
                     await self._safe_send(interaction, "Не вдалося додати треки з плейлиста.", ephemeral=True)
                     return
 
+                player.prefetch()
                 player.ensure_task(self.bot, interaction.guild_id)
 
                 e = discord.Embed(title="Додано плейлист", description=f"Треків додано: {added}", color=TEAL)
@@ -898,9 +2325,7 @@ class MusicCog(commands.Cog, name="MusicCog"):
                 if not exists and len(pls.keys()) >= 2:
                     await self._safe_send(interaction, "Ліміт: максимум 2 плейлисти на людину.", ephemeral=True)
                     return
-                pls[pl_name] = {"type": only_type, "items": urls}
-                user_bucket["playlists"] = pls
-                _save_playlists(data)
+                store.put(interaction.user.id, pl_name, {"type": only_type, "items": urls})
                 await self._safe_send(interaction, f"Плейлист збережено: **{pl_name}**\nТип: {_pretty_type(only_type)}\nПосилань: {len(urls)}", ephemeral=True)
                 return
 
@@ -913,13 +2338,10 @@ class MusicCog(commands.Cog, name="MusicCog"):
                 if pl_type != only_type:
                     await self._safe_send(interaction, f"Не можна змішувати джерела. Плейлист типу: {_pretty_type(pl_type)}", ephemeral=True)
                     return
-                meta.setdefault("items", [])
-                if not isinstance(meta["items"], list):
-                    meta["items"] = []
-                meta["items"].extend(urls)
-                pls[pl_name] = meta
-                user_bucket["playlists"] = pls
-                _save_playlists(data)
+                items = meta.get("items")
+                if not isinstance(items, list):
+                    items = []
+                store.put(interaction.user.id, pl_name, {**meta, "items": items + urls})
                 await self._safe_send(interaction, f"Додано посилань: {len(urls)}", ephemeral=True)
                 return
 
@@ -929,10 +2351,57 @@ class MusicCog(commands.Cog, name="MusicCog"):
             log_music_error("cmd_hrai", e)
             await self._safe_send(interaction, f"Помилка: {str(e)[:1500]}", ephemeral=True)
 
-    @app_commands.command(name="cherha", description="Показати чергу.")
-    async def cmd_queue(self, interaction: discord.Interaction):
+    @app_commands.command(name="cherha", description="Показати чергу або змінити її.")
+    @app_commands.describe(
+        action="Дія: show, shuffle, move, remove",
+        position="Для move / remove: номер треку в черзі",
+        to="Для move: на яке місце поставити",
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="show",    value="show"),
+        app_commands.Choice(name="shuffle", value="shuffle"),
+        app_commands.Choice(name="move",    value="move"),
+        app_commands.Choice(name="remove",  value="remove"),
+    ])
+    async def cmd_queue(
+        self,
+        interaction: discord.Interaction,
+        action: Optional[app_commands.Choice[str]] = None,
+        position: Optional[int] = None,
+        to: Optional[int] = None,
+    ):
         try:
-            await self._send_queue(interaction, interaction.guild_id)
+            a = action.value if action else "show"
+            if a == "show" or not interaction.guild_id:
+                await self._send_queue(interaction, interaction.guild_id)
+                return
+
+            player = self.get_player(interaction.guild_id)
+            queue  = player.queue
+            if not queue:
+                await self._safe_send(interaction, "Черга порожня.")
+                return
+
+            if a == "shuffle":
+                queue.shuffle()
+                msg = f"Перемішано треків: {len(queue)}"
+            else:
+                if position is None or not 1 <= position <= len(queue):
+                    await self._safe_send(interaction, f"Вкажи номер треку від 1 до {len(queue)}.")
+                    return
+                if a == "remove":
+                    track = queue.remove(position - 1)
+                    track.cancel_resolve()
+                    msg = f"Прибрано: {track.title}"
+                else:
+                    if to is None or not 1 <= to <= len(queue):
+                        await self._safe_send(interaction, f"Вкажи місце від 1 до {len(queue)}.")
+                        return
+                    track = queue.move(position - 1, to - 1)
+                    msg = f"{track.title} → #{to}"
+
+            player.prefetch()
+            await self._safe_send(interaction, msg)
         except Exception as e:
             log_music_error("cmd_queue", e)
             await self._safe_send(interaction, f"Помилка: {str(e)[:1500]}")
@@ -952,21 +2421,22 @@ class MusicCog(commands.Cog, name="MusicCog"):
             w = where.value
 
             if w == "playlists":
-                data = _load_playlists()
-                user_bucket = _pl_get_user(data, interaction.user.id)
-                pls = _pl_list(user_bucket)
+                store = _get_playlists()
+                pls = store.playlists(interaction.user.id)
 
                 if not pls:
                     await self._safe_send(interaction, "У тебе нема плейлистів.")
                     return
 
-                q = (text or "").strip().lower()
+                names, tracks = store.search(interaction.user.id, text)
                 hits: List[str] = []
-                for name, meta in pls.items():
-                    if q in name.lower():
-                        t = meta.get("type", "unknown") if isinstance(meta, dict) else "unknown"
-                        cnt = len(meta.get("items", [])) if isinstance(meta, dict) and isinstance(meta.get("items"), list) else 0
-                        hits.append(f"{name} | {_pretty_type(t)} | {cnt}")
+                for name in names:
+                    meta = pls[name]
+                    t = meta.get("type", "unknown")
+                    cnt = len(meta.get("items", [])) if isinstance(meta.get("items"), list) else 0
+                    hits.append(f"{name} | {_pretty_type(t)} | {cnt}")
+                for name, url, title in tracks:
+                    hits.append(f"{name}: [{title or url}]({url})")
 
                 if not hits:
                     await self._safe_send(interaction, "Збігів не знайдено.")
@@ -991,6 +2461,39 @@ class MusicCog(commands.Cog, name="MusicCog"):
             log_music_error("cmd_poshuk", e)
             await self._safe_send(interaction, f"Помилка: {str(e)[:1500]}")
 
+    @app_commands.command(name="muzyka_stat", description="[Офіцер] Метрики музики: затримки, паузи, обриви")
+    @app_commands.describe(as_json="Додати повний знімок метрик файлом JSON")
+    @app_commands.default_permissions(manage_guild=True)
+    async def cmd_muzyka_stat(self, interaction: discord.Interaction, as_json: Optional[bool] = False):
+        snap = _get_metrics().snapshot(self.players)
+
+        def ms(v):
+            return "—" if v is None else f"{v:.0f}"
+
+        lines = []
+        for name, h in snap["latency"].items():
+            lines.append(
+                f"`{name}`: **{h['count']}** | avg {ms(h['avg_ms'])} · p50 ≤{ms(h['p50_ms'])} · "
+                f"p95 ≤{ms(h['p95_ms'])} · max {ms(h['max_ms'])} мс"
+            )
+        lines.append("")
+        counters = dict(snap["counters"])
+        counters["audio_mb"] = round(counters.pop("audio_bytes") / 1_048_576, 1)
+        lines += [f"`{k}`: **{v}**" for k, v in counters.items()]
+        lines += [f"`resolver_{k}`: **{v}**" for k, v in snap["resolver"].items() if k in ("queued", "running", "timeouts")]
+        lines += [f"`cache_{k}`: **{v}**" for k, v in snap["cache"].items()]
+        for gid, g in snap["guilds"].items():
+            guild = self.bot.get_guild(int(gid))
+            lines.append(f"`{guild.name if guild else gid}`: черга **{g['queue']}** (пік {g['peak_queue']})")
+
+        embed = discord.Embed(title="🎛️ Метрики музики", description="\n".join(lines)[:4000], color=TEAL)
+        embed.set_footer(**self.footer_kwargs())
+        if as_json:
+            file = discord.File(io.BytesIO(json.dumps(snap, ensure_ascii=False, indent=2).encode("utf-8")), filename="music_metrics.json")
+            await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(MusicCog(bot))
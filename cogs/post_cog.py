@@ -16,6 +16,8 @@ from discord import app_commands, Interaction
 from discord.ui import Modal, TextInput
 from PIL import Image, ImageDraw
 
+from utils.http import HttpClient
+
 # ============================ CONFIG ============================
 
 FOOTER_TEXT = "Silent Concierge by Myxa"
@@ -177,7 +179,7 @@ def extract_image_url_from_message(msg: discord.Message) -> Optional[str]:
     return None
 
 
-async def download_and_round(url: str) -> Tuple[Optional[discord.File], Optional[str], str]:
+async def download_and_round(http: HttpClient, url: str) -> Tuple[Optional[discord.File], Optional[str], str]:
     if not url:
         bash_log("DOWNLOAD_SKIP", "empty_url")
         return None, None, "empty_url"
@@ -191,17 +193,14 @@ async def download_and_round(url: str) -> Tuple[Optional[discord.File], Optional
     try:
         bash_log("DOWNLOAD_START", url)
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)) as session:
-            async with session.get(url) as r:
-                bash_log(
-                    "DOWNLOAD_RESPONSE",
-                    f"status={r.status} content_type={r.headers.get('content-type')}"
-                )
-
-                if r.status != 200:
-                    return None, url, f"http_{r.status}"
+        status, headers, data = await http.fetch(url, "full", timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+        bash_log(
+            "DOWNLOAD_RESPONSE",
+            f"status={status} content_type={headers.get('content-type')}"
+        )
 
-                data = await r.read()
+        if status != 200:
+            return None, url, f"http_{status}"
 
         img = Image.open(io.BytesIO(data)).convert("RGBA")
         w, h = img.size
@@ -810,7 +809,7 @@ class PostCog(commands.Cog):
                     )
 
                 if session.image_url:
-                    f, url, status = await download_and_round(session.image_url)
+                    f, url, status = await download_and_round(self.bot.http_client, session.image_url)
 
                     bash_log(
                         "EDIT_REPLACE_IMAGE",
@@ -869,7 +868,7 @@ class PostCog(commands.Cog):
             image_status = None
 
             if session.image_url:
-                f_send, img_url, image_status = await download_and_round(session.image_url)
+                f_send, img_url, image_status = await download_and_round(self.bot.http_client, session.image_url)
 
                 bash_log(
                     "CREATE_IMAGE_PREPARED",
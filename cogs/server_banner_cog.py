@@ -5,9 +5,11 @@ import random
 import datetime
 import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 
+from utils.http import HttpClient
+
 
 # Працюємо тільки на цьому сервері
 ALLOWED_GUILD_ID = 1323454227816906802
@@ -53,13 +55,11 @@ def _log_json(event: dict) -> None:
         pass
 
 
-async def _download_bytes(url: str) -> bytes:
-    timeout = aiohttp.ClientTimeout(total=25)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                raise RuntimeError(f"HTTP {resp.status}")
-            return await resp.read()
+async def _download_bytes(http: HttpClient, url: str) -> bytes:
+    status, _, data = await http.fetch(url, "full", timeout=aiohttp.ClientTimeout(total=25))
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}")
+    return data
 
 
 class ServerBannerCog(commands.Cog):
@@ -67,10 +67,10 @@ class ServerBannerCog(commands.Cog):
         self.bot = bot
         self._last_url: str | None = None
         self._busy = False
-        self.banner_rotate_loop.start()
+        self.bot.scheduler.every("banner", ROTATE_EVERY_SECONDS, self.banner_rotate_loop)
 
     def cog_unload(self):
-        self.banner_rotate_loop.cancel()
+        self.bot.scheduler.remove("banner")
 
     def _allowed_guild(self, guild: discord.Guild | None) -> bool:
         return guild is not None and guild.id == ALLOWED_GUILD_ID
@@ -89,7 +89,7 @@ class ServerBannerCog(commands.Cog):
         }
 
         try:
-            data = await _download_bytes(url)
+            data = await _download_bytes(self.bot.http_client, url)
             await guild.edit(banner=data, reason=reason)
             event["ok"] = True
             self._last_url = url
@@ -99,8 +99,7 @@ class ServerBannerCog(commands.Cog):
         _log_json(event)
         return event
 
-    @tasks.loop(seconds=ROTATE_EVERY_SECONDS)
-    async def banner_rotate_loop(self):
+    async def banner_rotate_loop(self, due: datetime.datetime):
         # Не стартуємо поки бот не готовий
         if not self.bot.is_ready():
             return
@@ -129,10 +128,6 @@ class ServerBannerCog(commands.Cog):
         finally:
             self._busy = False
 
-    @banner_rotate_loop.before_loop
-    async def before_banner_rotate_loop(self):
-        await self.bot.wait_until_ready()
-
     banner_group = app_commands.Group(
         name="banner",
         description="Керування банером сервера (верхня картинка).",
@@ -2,7 +2,7 @@
 import json
 import random
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from datetime import datetime
 from pathlib import Path
 
@@ -10,17 +10,20 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parents[1]
 STATUS_JSON_PATH = BASE_DIR / "config" / "status_phrases.json"
 
+# Як часто міняти статус (сек)
+STATUS_EVERY_SECONDS = 15 * 60
+
 class StatusCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Запуск циклу оновлення
-        self.status_updater.start()
+        # Реєструємо оновлення у спільному планувальнику
+        self.bot.scheduler.every("status", STATUS_EVERY_SECONDS, self.status_updater)
+        print("[STATUS] Система статусів активована.")
 
     def cog_unload(self):
-        self.status_updater.cancel()
+        self.bot.scheduler.remove("status")
 
-    @tasks.loop(minutes=15)
-    async def status_updater(self):
+    async def status_updater(self, due: datetime):
         """Оновлює статус бота, вибираючи фразу з JSON залежно від часу доби"""
         try:
             if not STATUS_JSON_PATH.exists():
@@ -52,11 +55,5 @@ class StatusCog(commands.Cog):
         except Exception as e:
             print(f"[STATUS_CRITICAL] Помилка: {e}")
 
-    @status_updater.before_loop
-    async def before_status_updater(self):
-        # Чекаємо повної готовності бота перед початком циклу
-        await self.bot.wait_until_ready()
-        print("[STATUS] Система статусів активована.")
-
 async def setup(bot: commands.Bot):
     await bot.add_cog(StatusCog(bot))
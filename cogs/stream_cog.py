@@ -6,16 +6,21 @@ import re
 import json
 import time
 import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, Dict, Any
 from datetime import datetime, timezone, timedelta
+from urllib.parse import urlsplit
 from xml.etree import ElementTree as ET
 
 import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 from pymongo import MongoClient
 
+from utils.http import HttpClient
+
 try:
     from PIL import Image, ImageDraw
     from io import BytesIO
@@ -28,6 +33,23 @@ except Exception:
 GUILD_ID = int(os.getenv("GUILD_ID", "1323454227816906802"))
 STREAM_ANNOUNCE_CHANNEL_ID = int(os.getenv("STREAM_ANNOUNCE_CHANNEL_ID", "1395410247375655072"))
 NEW_VIDEO_MAX_AGE_HOURS = int(os.getenv("NEW_VIDEO_MAX_AGE_HOURS", "48"))
+CHECK_EVERY_SECONDS = 2 * 60
+
+# Опитування йде паралельно, але не більше N одночасних запитів на кожен хост
+HTTP_TIMEOUT        = aiohttp.ClientTimeout(total=10)
+HOST_CONCURRENCY    = {"decapi.me": 4, "api.twitch.tv": 8, "www.youtube.com": 6}
+DEFAULT_CONCURRENCY = 4
+POLL_JITTER_SECONDS = 5   # розмазуємо старт перевірок у циклі, щоб не бити хости пачкою
+HELIX_BATCH         = 100 # Helix приймає до 100 login/id в одному запиті
+
+# YouTube RSS: інтервал каналу ≈ типова пауза між його завантаженнями / YT_POLLS_PER_UPLOAD
+YT_MAX_POLL_SECONDS = 15 * 60
+YT_POLLS_PER_UPLOAD = 48
+YT_UPLOADS_KEPT     = 10
+FEED_CHUNK          = 4096
+
+LAST_SEEN_FLUSH_DELAY = 2    # секунди: нові відео за цей час ідуть у Mongo одним $set
+LAST_SEEN_RETRY_DELAY = 30
 
 STREAM_COLORS = [0xFF4000, 0xFFFF00, 0x00FF00, 0x00FF80, 0x00BFFF, 0x4000FF, 0x8000FF, 0xFF0040]
 
@@ -41,6 +63,7 @@ TWITCH_CLIENT_ID     = os.getenv("TWITCH_CLIENT_ID")
 TWITCH_CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
 _TWITCH_TOKEN        = None
 _TWITCH_TOKEN_EXP    = 0
+_TWITCH_TOKEN_LOCK   = asyncio.Lock()
 
 ANNOUNCE_LINES = [
     "Наш спеціальний агент {mention} працює у [небезпечних умовах]({url})",
@@ -68,15 +91,16 @@ def _get_db():
     return _mongo_db
 
 
-def _load_streamers() -> list:
+# Завантажувачі повертають None, якщо Mongo недоступна — щоб не сплутати збій із порожніми даними
+
+def _load_streamers() -> Optional[list]:
     try:
         db  = _get_db()
         doc = db["streamers"].find_one({"_id": "main"})
-        if doc:
-            return doc.get("list", [])
+        return doc.get("list", []) if doc else []
     except Exception as e:
         print(f"[STREAM][ERROR] load streamers: {e}")
-    return []
+        return None
 
 
 def _save_streamers(streamers: list) -> None:
@@ -91,39 +115,32 @@ def _save_streamers(streamers: list) -> None:
         print(f"[STREAM][ERROR] save streamers: {e}")
 
 
-def _load_last_seen() -> dict:
+def _load_last_seen() -> Optional[dict]:
     try:
         db  = _get_db()
         doc = db["stream_last_seen"].find_one({"_id": "main"})
-        if doc:
-            doc.pop("_id", None)
-            return doc
     except Exception as e:
         print(f"[STREAM][ERROR] load last_seen: {e}")
+        return None
+    if doc:
+        doc.pop("_id", None)
+        return doc
     return {"youtube": {}, "twitch": {}}
 
 
-def _save_last_seen(last_seen: dict) -> None:
-    try:
-        db = _get_db()
-        db["stream_last_seen"].replace_one(
-            {"_id": "main"},
-            {"_id": "main", **last_seen},
-            upsert=True,
-        )
-    except Exception as e:
-        print(f"[STREAM][ERROR] save last_seen: {e}")
+def _update_last_seen(fields: dict) -> None:
+    """`fields` — {"youtube.<channel_id>": video_id, ...}; помилки ловить LastSeenWriter."""
+    _get_db()["stream_last_seen"].update_one({"_id": "main"}, {"$set": fields}, upsert=True)
 
 
-def _load_game_icons() -> dict:
+def _load_game_icons() -> Optional[dict]:
     try:
         db  = _get_db()
         doc = db["game_icons"].find_one({"_id": "main"})
-        if doc:
-            return doc.get("icons", {})
+        return doc.get("icons", {}) if doc else {}
     except Exception as e:
         print(f"[STREAM][ERROR] load game_icons: {e}")
-    return {}
+        return None
 
 
 def _save_game_icons(icons: dict) -> None:
@@ -137,53 +154,325 @@ def _save_game_icons(icons: dict) -> None:
     except Exception as e:
         print(f"[STREAM][ERROR] save game_icons: {e}")
 
+# Один потік: блокуючий pymongo не займає event loop, а записи йдуть у тому ж порядку
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-mongo")
+
+async def _run_db(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_DB_EXECUTOR, fn, *args)
+
+
+class LastSeenWriter:
+    """
+    Відкладений запис last_seen: зміни збираються як {"platform.key": id} і за LAST_SEEN_FLUSH_DELAY
+    йдуть у Mongo одним update_one з $set — без перезапису всього документа на кожне відео.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0
+        self.errors = 0
+
+    def set(self, platform: str, key: str, value: str) -> None:
+        self._pending[f"{platform}.{key}"] = value
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(LAST_SEEN_FLUSH_DELAY)
+            batch, self._pending = self._pending, {}
+            try:
+                await _run_db(_update_last_seen, batch)
+                self.writes += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[STREAM][ERROR] save last_seen: {e}")
+                self._pending = {**batch, **self._pending}   # новіші значення перемагають
+                await asyncio.sleep(LAST_SEEN_RETRY_DELAY)
+
+    def flush_sync(self) -> None:
+        """Вивантаження кога: дописати те, що ще чекає, синхронно."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        if self._pending:
+            try:
+                _update_last_seen(self._pending)
+                self._pending = {}
+            except Exception as e:
+                print(f"[STREAM][ERROR] save last_seen: {e}")
+
 # ─── Twitch token ─────────────────────────────────────────────────────────────
 
-async def _get_twitch_headers(session: aiohttp.ClientSession) -> Optional[dict]:
+async def _get_twitch_headers(http: HttpClient) -> Optional[dict]:
     global _TWITCH_TOKEN, _TWITCH_TOKEN_EXP
     if not TWITCH_CLIENT_ID or not TWITCH_CLIENT_SECRET:
         return None
-    now = time.time()
-    if not _TWITCH_TOKEN or now >= _TWITCH_TOKEN_EXP:
-        async with session.post(
-            "https://id.twitch.tv/oauth2/token",
-            data={
-                "client_id": TWITCH_CLIENT_ID,
-                "client_secret": TWITCH_CLIENT_SECRET,
-                "grant_type": "client_credentials",
-            },
-        ) as resp:
-            data = await resp.json()
+    # Паралельні перевірки не повинні одночасно отримувати кілька токенів
+    async with _TWITCH_TOKEN_LOCK:
+        now = time.time()
+        if not _TWITCH_TOKEN or now >= _TWITCH_TOKEN_EXP:
+            data = await http.post(
+                "https://id.twitch.tv/oauth2/token",
+                "json",
+                data={
+                    "client_id": TWITCH_CLIENT_ID,
+                    "client_secret": TWITCH_CLIENT_SECRET,
+                    "grant_type": "client_credentials",
+                },
+                timeout=HTTP_TIMEOUT,
+                retries=1,
+            )
             _TWITCH_TOKEN     = data.get("access_token")
             _TWITCH_TOKEN_EXP = now + int(data.get("expires_in", 3600)) - 60
     if not _TWITCH_TOKEN:
         return None
     return {"Client-ID": TWITCH_CLIENT_ID, "Authorization": f"Bearer {_TWITCH_TOKEN}"}
 
+def _drop_twitch_token() -> None:
+    """Helix відповів 401 — токен відкликано раніше строку, наступний запит візьме новий."""
+    global _TWITCH_TOKEN
+    _TWITCH_TOKEN = None
+
+# ─── Ліміти на хост ───────────────────────────────────────────────────────────
+
+class HostLimiter:
+    """Семафор на кожен upstream-хост: у decapi, Helix і YouTube різна терпимість до паралелі."""
+
+    def __init__(self, limits: Dict[str, int], default: int):
+        self._limits = limits
+        self._default = default
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        sem  = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(self._limits.get(host, self._default))
+        return sem
+
+# ─── Twitch Helix ─────────────────────────────────────────────────────────────
+
+class TwitchClient:
+    """
+    Пакетні запити до Helix: live-статус усіх логінів за ceil(N/100) запитів замість
+    decapi на кожного. user_id кешуються назавжди — login -> id не змінюється.
+    """
+
+    def __init__(self, fetch, headers):
+        self._fetch   = fetch     # StreamCog._fetch — спільні ліміти на хост і таймаути
+        self._headers = headers   # () -> OAuth-заголовки з _get_twitch_headers
+        self.user_ids: Dict[str, str] = {}
+
+    @staticmethod
+    def _batches(items: list):
+        for i in range(0, len(items), HELIX_BATCH):
+            yield items[i:i + HELIX_BATCH]
+
+    async def resolve_ids(self, logins: list) -> Dict[str, str]:
+        """login -> user_id для всіх логінів; невідомі добираються пачками по 100."""
+        headers = await self._headers()
+        missing = sorted({l.lower() for l in logins} - self.user_ids.keys())
+        if headers and missing:
+            for batch in self._batches(missing):
+                query = "&".join(f"login={l}" for l in batch)
+                jd = await self._fetch(f"https://api.twitch.tv/helix/users?{query}", "json", headers=headers)
+                for u in (jd.get("data", []) if isinstance(jd, dict) else []):
+                    self.user_ids[u["login"].lower()] = u["id"]
+        return {l: self.user_ids[l.lower()] for l in logins if l.lower() in self.user_ids}
+
+    async def user_id(self, login: str) -> Optional[str]:
+        return (await self.resolve_ids([login])).get(login)
+
+    async def live_streams(self, logins: list) -> Optional[Dict[str, dict]]:
+        """
+        login (нижній регістр) -> об'єкт стріму Helix (title, game_name, viewer_count...) для тих,
+        хто в ефірі. None — Helix недоступний (нема ключів / помилка), тоді працює decapi.
+        """
+        live: Dict[str, dict] = {}
+        try:
+            headers = await self._headers()
+            if not headers:
+                return None
+            for batch in self._batches(sorted({l.lower() for l in logins})):
+                query = "&".join(f"user_login={l}" for l in batch)
+                jd = await self._fetch(
+                    f"https://api.twitch.tv/helix/streams?first={HELIX_BATCH}&{query}", "json", headers=headers,
+                )
+                if not isinstance(jd, dict) or "data" not in jd:
+                    if isinstance(jd, dict) and jd.get("status") == 401:
+                        _drop_twitch_token()
+                    raise ValueError(jd.get("message") if isinstance(jd, dict) else "bad response")
+                for st in jd["data"]:
+                    if st.get("type") == "live":
+                        live[st["user_login"].lower()] = st
+                        self.user_ids.setdefault(st["user_login"].lower(), st["user_id"])
+        except Exception as e:
+            print(f"[STREAM][WARN] Helix streams: {e} — перевіряю через decapi")
+            return None
+        return live
+
+# ─── YouTube RSS ──────────────────────────────────────────────────────────────
+
+ATOM_NS    = "http://www.w3.org/2005/Atom"
+FEED_NS    = {"atom": ATOM_NS, "yt": "http://www.youtube.com/xml/schemas/2015"}
+ATOM_ENTRY = f"{{{ATOM_NS}}}entry"
+
+
+class YouTubeFeeds:
+    """
+    Опитування feeds/videos.xml умовними GET: ETag / Last-Modified на канал, на 304 нічого
+    не качаємо й не парсимо. Зі 200 розбираємо лише записи до першого вже баченого videoId.
+    Канал опитується не частіше, ніж того варта частота його завантажень.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._state: Dict[str, dict] = {}
+        self.counts = {"fetched": 0, "not_modified": 0, "skipped": 0}
+
+    @staticmethod
+    def _interval(uploads: list) -> float:
+        if len(uploads) < 2:
+            return YT_MAX_POLL_SECONDS
+        gaps    = sorted(b - a for a, b in zip(uploads, uploads[1:]))
+        typical = gaps[len(gaps) // 2]
+        return min(YT_MAX_POLL_SECONDS, max(CHECK_EVERY_SECONDS, typical / YT_POLLS_PER_UPLOAD))
+
+    @staticmethod
+    def _entry(el) -> Optional[dict]:
+        vid_el   = el.find("yt:videoId", FEED_NS)
+        video_id = vid_el.text if vid_el is not None else None
+        if not video_id:
+            return None
+        title_el  = el.find("atom:title", FEED_NS)
+        title     = (title_el.text or "").strip() if title_el is not None else "Відео"
+        link_el   = el.find("atom:link", FEED_NS)
+        link      = link_el.get("href") if link_el is not None else ""
+        pub_el    = el.find("atom:published", FEED_NS)
+        published = pub_el.text if pub_el is not None else None
+        return {
+            "video_id":  video_id,
+            "title":     title or "Відео",
+            "published": published,
+            "link":      link or f"https://youtu.be/{video_id}",
+            "thumb":     f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg",
+        }
+
+    def _new_entries(self, body: bytes, seen: Optional[str]) -> list:
+        """Записи від найновішого до `seen` (не включно); далі документ не розбирається."""
+        parser  = ET.XMLPullParser(events=("end",))
+        entries = []
+        for i in range(0, len(body), FEED_CHUNK):
+            parser.feed(body[i:i + FEED_CHUNK])
+            for _, el in parser.read_events():
+                if el.tag != ATOM_ENTRY:
+                    continue
+                entry = self._entry(el)
+                if entry is None:
+                    continue
+                if entry["video_id"] == seen:
+                    return entries
+                entries.append(entry)
+        return entries
+
+    async def latest(self, channel_id: str) -> Optional[dict]:
+        """Найновіше відео, якщо з минулого опитування з'явилось нове; інакше None."""
+        st = self._state.setdefault(
+            channel_id, {"etag": None, "modified": None, "seen": None, "uploads": [], "next": 0.0},
+        )
+        now = time.monotonic()
+        if now < st["next"]:
+            self.counts["skipped"] += 1
+            return None
+        # Мінус пів циклу — щоб джитер не зсував опитування на цикл пізніше
+        st["next"] = now + self._interval(st["uploads"]) - CHECK_EVERY_SECONDS / 2
+
+        headers = {}
+        if st["etag"]:
+            headers["If-None-Match"] = st["etag"]
+        if st["modified"]:
+            headers["If-Modified-Since"] = st["modified"]
+        status, resp_headers, body = await self._fetch(
+            f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}", "full", headers=headers,
+        )
+        if status == 304:
+            self.counts["not_modified"] += 1
+            return None
+        if status != 200:
+            print(f"[STREAM] RSS {status} for {channel_id}")
+            return None
+
+        self.counts["fetched"] += 1
+        st["etag"]     = resp_headers.get("ETag")
+        st["modified"] = resp_headers.get("Last-Modified")
+        entries = self._new_entries(body, st["seen"])
+        if not entries:
+            return None
+
+        st["seen"] = entries[0]["video_id"]
+        for e in entries:
+            try:
+                ts = datetime.fromisoformat(e["published"].replace("Z", "+00:00")).timestamp()
+            except Exception:
+                continue
+            if ts not in st["uploads"]:
+                st["uploads"].append(ts)
+        st["uploads"] = sorted(st["uploads"])[-YT_UPLOADS_KEPT:]
+        st["next"]    = now + self._interval(st["uploads"]) - CHECK_EVERY_SECONDS / 2
+        return entries[0]
+
 # ─── Cog ──────────────────────────────────────────────────────────────────────
 
 class StreamCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot        = bot
-        self.streamers  = _load_streamers()
-        self.game_icons = _load_game_icons()
-        self.last_seen  = _load_last_seen()
+        # Читаються з Mongo на початку циклу, доки завантаження не вдасться (див. _ensure_loaded)
+        self.streamers: list = []
+        self.game_icons: dict = {}
+        self.last_seen: dict = {}
+        self._streamers_loaded  = False
+        self._last_seen_loaded  = False
+        self._game_icons_loaded = False
+        self.last_seen_writer = LastSeenWriter()
         self._checked_live: set[tuple[str, str]] = set()
-        self.check_streams.start()
-        print(f"[STREAM] Завантажено стрімерів: {len(self.streamers)}")
+        self._limit     = HostLimiter(HOST_CONCURRENCY, DEFAULT_CONCURRENCY)
+        self.twitch     = TwitchClient(self._fetch, self._twitch_headers)
+        self.feeds      = YouTubeFeeds(self._fetch)
+        self.last_cycle: Dict[str, Any] = {}
+        self._http_errors = 0
+        self.bot.scheduler.every("streams", CHECK_EVERY_SECONDS, self.check_streams)
 
     def cog_unload(self):
-        self.check_streams.cancel()
+        self.bot.scheduler.remove("streams")
+        self.last_seen_writer.flush_sync()
+
+    async def _persist_streamers(self):
+        # Копії записів: цикл перевірки може дописувати id, поки потік серіалізує список
+        await _run_db(_save_streamers, [dict(s) for s in self.streamers])
+
+    # ── HTTP ─────────────────────────────────────────────────────────────────
+
+    async def _fetch(self, url: str, kind: str = "text", **kwargs):
+        """GET через спільний bot.http_client з лімітом на хост; kind — text / json / bytes / full."""
+        try:
+            async with self._limit(url):
+                return await self.bot.http_client.fetch(url, kind, timeout=HTTP_TIMEOUT, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._http_errors += 1
+            raise
+
+    async def _twitch_headers(self) -> Optional[dict]:
+        return await _get_twitch_headers(self.bot.http_client)
 
     # ── Image helpers ────────────────────────────────────────────────────────
 
-    async def _circle_avatar_file(self, session, avatar_url, size=96):
+    async def _circle_avatar_file(self, avatar_url, size=96):
         if not _PIL_OK:
             return None
         try:
-            async with session.get(avatar_url) as av:
-                av_bytes = await av.read()
+            av_bytes = await self._fetch(avatar_url, "bytes")
             avatar = Image.open(BytesIO(av_bytes)).convert("RGBA").resize((size, size), Image.LANCZOS)
             mask   = Image.new("L", (size, size), 0)
             ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
@@ -195,12 +484,11 @@ class StreamCog(commands.Cog):
         except Exception:
             return None
 
-    async def _fetch_icon_60(self, session, url, size=60):
+    async def _fetch_icon_60(self, url, size=60):
         if not _PIL_OK:
             return None
         try:
-            async with session.get(url) as r:
-                b = await r.read()
+            b   = await self._fetch(url, "bytes")
             img = Image.open(BytesIO(b)).convert("RGBA").resize((size, size), Image.LANCZOS)
             out = BytesIO()
             img.save(out, format="PNG")
@@ -235,13 +523,12 @@ class StreamCog(commands.Cog):
     def get_announce_channel(self):
         return self.bot.get_channel(STREAM_ANNOUNCE_CHANNEL_ID)
 
-    async def _yt_resolve_channel_id(self, session, identifier: str) -> Optional[str]:
+    async def _yt_resolve_channel_id(self, identifier: str) -> Optional[str]:
         # Спробуємо через decapi
         try:
-            async with session.get(f"https://decapi.me/youtube/channelid?search={identifier}") as r:
-                cid = (await r.text()).strip()
-                if cid.startswith("UC") and len(cid) > 10:
-                    return cid
+            cid = (await self._fetch(f"https://decapi.me/youtube/channelid?search={identifier}")).strip()
+            if cid.startswith("UC") and len(cid) > 10:
+                return cid
         except Exception:
             pass
         # Якщо identifier вже є channel_id
@@ -250,11 +537,10 @@ class StreamCog(commands.Cog):
         # Спробуємо через RSS напряму з @handle
         try:
             handle = identifier.lstrip("@")
-            async with session.get(
+            text = await self._fetch(
                 f"https://www.youtube.com/@{handle}",
                 headers={"User-Agent": "Mozilla/5.0"},
-            ) as r:
-                text = await r.text()
+            )
             m = re.search(r'"channelId":"(UC[\w-]+)"', text)
             if m:
                 return m.group(1)
@@ -262,62 +548,18 @@ class StreamCog(commands.Cog):
             pass
         return None
 
-    async def _yt_latest_video_from_rss(self, session, channel_id: str) -> Optional[dict]:
-        try:
-            rss = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
-            async with session.get(rss) as r:
-                text = await r.text()
-            root = ET.fromstring(text)
-            ns   = {
-                "atom": "http://www.w3.org/2005/Atom",
-                "yt":   "http://www.youtube.com/xml/schemas/2015",
-            }
-            entry = root.find("atom:entry", ns)
-            if entry is None:
-                return None
-            title_el = entry.find("atom:title", ns)
-            title    = (title_el.text or "").strip() if title_el is not None else "Відео"
-            link_el  = entry.find("atom:link", ns)
-            link     = link_el.get("href") if link_el is not None else ""
-            vid_el   = entry.find("yt:videoId", ns)
-            video_id = vid_el.text if vid_el is not None else None
-            pub_el   = entry.find("atom:published", ns)
-            published = pub_el.text if pub_el is not None else None
-            if not video_id:
-                return None
-            return {
-                "video_id":  video_id,
-                "title":     title or "Відео",
-                "published": published,
-                "link":      link or f"https://youtu.be/{video_id}",
-                "thumb":     f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg",
-            }
-        except Exception as e:
-            print(f"[STREAM] RSS error for {channel_id}: {e}")
-            return None
-
-    async def _twitch_user_id(self, session, login: str) -> Optional[str]:
-        headers = await _get_twitch_headers(session)
-        if not headers:
-            return None
-        async with session.get(f"https://api.twitch.tv/helix/users?login={login}", headers=headers) as r:
-            jd = await r.json()
-        if isinstance(jd, dict) and jd.get("data"):
-            return jd["data"][0].get("id")
-        return None
-
-    async def _twitch_latest_upload(self, session, login: str) -> Optional[dict]:
-        headers = await _get_twitch_headers(session)
+    async def _twitch_latest_upload(self, login: str) -> Optional[dict]:
+        headers = await self._twitch_headers()
         if not headers:
             return None
-        uid = await self._twitch_user_id(session, login)
+        uid = await self.twitch.user_id(login)
         if not uid:
             return None
-        async with session.get(
+        jd = await self._fetch(
             f"https://api.twitch.tv/helix/videos?user_id={uid}&type=upload&first=1",
+            "json",
             headers=headers,
-        ) as r:
-            jd = await r.json()
+        )
         data = jd.get("data", []) if isinstance(jd, dict) else []
         if not data:
             return None
@@ -332,66 +574,136 @@ class StreamCog(commands.Cog):
 
     # ── Перевірка стрімів ────────────────────────────────────────────────────
 
-    @tasks.loop(minutes=2)
-    async def check_streams(self):
-        # Перезавантажуємо з MongoDB кожен цикл
-        self.streamers  = _load_streamers()
-        self.last_seen  = _load_last_seen()
-        self.game_icons = _load_game_icons()
-
-        async with aiohttp.ClientSession() as session:
-            for s in self.streamers:
-                platform   = s.get("platform")
-                username   = s.get("username")
-                discord_id = s.get("discord_id")
-                if not platform or not username or not discord_id:
-                    continue
+    async def _ensure_loaded(self) -> None:
+        """Дочитати з Mongo те, що ще не завантажилось (збій на старті лікується наступним циклом)."""
+        if not self._streamers_loaded:
+            streamers = await _run_db(_load_streamers)
+            if streamers is not None:
+                self.streamers, self._streamers_loaded = streamers, True
+                print(f"[STREAM] Завантажено стрімерів: {len(self.streamers)}")
+        if not self._last_seen_loaded:
+            last_seen = await _run_db(_load_last_seen)
+            if last_seen is not None:
+                self.last_seen, self._last_seen_loaded = last_seen, True
+        if not self._game_icons_loaded:
+            icons = await _run_db(_load_game_icons)
+            if icons is not None:
+                self.game_icons, self._game_icons_loaded = icons, True
+
+    async def check_streams(self, due: datetime):
+        # Стрімери / last_seen живуть у пам'яті: читаються один раз і в командах, що їх змінюють
+        await self._ensure_loaded()
+        if not self._streamers_loaded:
+            print("[STREAM][WARN] Список стрімерів не завантажено — повтор наступного циклу")
+            return
+        started = time.perf_counter()
+        self._http_errors = 0
+        live      = await self._twitch_live()
+        streamers = list(self.streamers)   # команди можуть змінити список посеред циклу
+        results   = await asyncio.gather(
+            *(self._check_streamer(s, live) for s in streamers), return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+
+        # Помилка одного стрімера (напр. анонс) не зриває цикл і не лишає решту задач висіти
+        failed = 0
+        for s, result in zip(streamers, results):
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"[STREAM][ERROR] {s.get('platform')}/{s.get('username')}: {type(result).__name__}: {result}")
+
+        self.last_cycle = {
+            "at":          datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "streamers":   len(streamers),
+            "seconds":     round(elapsed, 2),
+            "failed":      failed,
+            "http_errors": self._http_errors,
+            "twitch_live": "decapi" if live is None else len(live),
+            "last_seen_writes": self.last_seen_writer.writes,
+            **{f"rss_{k}": v for k, v in self.feeds.counts.items()},
+        }
+        if elapsed > CHECK_EVERY_SECONDS / 2:
+            print(f"[STREAM][WARN] Цикл перевірки: {len(streamers)} стрімерів за {elapsed:.1f}s")
+
+    async def _twitch_live(self) -> Optional[Dict[str, dict]]:
+        """Live-статус усіх Twitch-стрімерів одним проходом по Helix; user_id зберігаються у списку."""
+        twitch = [s for s in self.streamers if s.get("platform") == "twitch" and s.get("username")]
+        if not twitch:
+            return {}
+        for s in twitch:
+            if s.get("twitch_user_id"):
+                self.twitch.user_ids.setdefault(s["username"].lower(), s["twitch_user_id"])
+        try:
+            ids = await self.twitch.resolve_ids([s["username"] for s in twitch])
+        except Exception as e:
+            print(f"[STREAM][WARN] Helix users: {e}")
+            ids = {}
+        fresh = [s for s in twitch if not s.get("twitch_user_id") and s["username"] in ids]
+        for s in fresh:
+            s["twitch_user_id"] = ids[s["username"]]
+        if fresh:
+            await self._persist_streamers()
+        return await self.twitch.live_streams([s["username"] for s in twitch])
+
+    async def _check_streamer(self, s: dict, live: Optional[Dict[str, dict]]):
+        platform   = s.get("platform")
+        username   = s.get("username")
+        discord_id = s.get("discord_id")
+        if not platform or not username or not discord_id:
+            return
 
-                # Twitch live
-                if platform == "twitch":
-                    try:
-                        async with session.get(f"https://decapi.me/twitch/uptime/{username}") as resp:
-                            text = (await resp.text()).lower().strip()
-                    except Exception:
-                        text = "offline"
-
-                    is_live = not any(w in text for w in ["offline", "not live", "404", "error", "not found"])
-
-                    if is_live:
-                        if (platform, username) not in self._checked_live:
-                            print(f"[STREAM] {username} live on Twitch!")
-                            await self.announce_stream(session, platform, username, discord_id)
-                            self._checked_live.add((platform, username))
-                        continue
-                    else:
-                        self._checked_live.discard((platform, username))
+        await asyncio.sleep(random.uniform(0, POLL_JITTER_SECONDS))
 
-                # Нові відео
+        # Twitch live: з пакетної відповіді Helix, decapi — лише якщо Helix недоступний
+        if platform == "twitch":
+            stream = None
+            if live is not None:
+                stream  = live.get(username.lower())
+                is_live = stream is not None
+            else:
                 try:
-                    if platform == "youtube":
-                        ch_id = s.get("yt_channel_id")
-                        if not ch_id:
-                            print(f"[STREAM] Resolving channel_id for {username}...")
-                            ch_id = await self._yt_resolve_channel_id(session, username)
-                            if ch_id:
-                                s["yt_channel_id"] = ch_id
-                                _save_streamers(self.streamers)
-                                print(f"[STREAM] Resolved: {username} → {ch_id}")
-                            else:
-                                print(f"[STREAM] Could not resolve channel_id for {username}")
-                        if ch_id:
-                            await self.check_youtube_video(session, ch_id, discord_id)
-                    elif platform == "twitch":
-                        await self.check_twitch_upload(session, username, discord_id)
-                except Exception as e:
-                    print(f"[STREAM] video check error {platform}:{username}: {e}")
-
-    @check_streams.before_loop
-    async def before_loop(self):
-        await self.bot.wait_until_ready()
-
-    async def check_youtube_video(self, session, channel_id: str, discord_id: int):
-        latest = await self._yt_latest_video_from_rss(session, channel_id)
+                    text = (await self._fetch(f"https://decapi.me/twitch/uptime/{username}")).lower().strip()
+                except Exception:
+                    text = "offline"
+                is_live = not any(w in text for w in ["offline", "not live", "404", "error", "not found"])
+
+            if is_live:
+                if (platform, username) not in self._checked_live:
+                    print(f"[STREAM] {username} live on Twitch!")
+                    await self.announce_stream(platform, username, discord_id, stream)
+                    self._checked_live.add((platform, username))
+                return
+            else:
+                self._checked_live.discard((platform, username))
+
+        # Нові відео — лише коли last_seen завантажено, інакше анонсуємо все свіже повторно
+        if not self._last_seen_loaded:
+            return
+        try:
+            if platform == "youtube":
+                ch_id = s.get("yt_channel_id")
+                if not ch_id:
+                    print(f"[STREAM] Resolving channel_id for {username}...")
+                    ch_id = await self._yt_resolve_channel_id(username)
+                    if ch_id:
+                        s["yt_channel_id"] = ch_id
+                        await self._persist_streamers()
+                        print(f"[STREAM] Resolved: {username} → {ch_id}")
+                    else:
+                        print(f"[STREAM] Could not resolve channel_id for {username}")
+                if ch_id:
+                    await self.check_youtube_video(ch_id, discord_id)
+            elif platform == "twitch":
+                await self.check_twitch_upload(username, discord_id)
+        except Exception as e:
+            print(f"[STREAM] video check error {platform}:{username}: {e}")
+
+    async def check_youtube_video(self, channel_id: str, discord_id: int):
+        try:
+            latest = await self.feeds.latest(channel_id)
+        except Exception as e:
+            print(f"[STREAM] RSS error for {channel_id}: {e}")
+            return
         if not latest:
             return
         vid = latest["video_id"]
@@ -408,11 +720,11 @@ class StreamCog(commands.Cog):
             return
         print(f"[STREAM] New YouTube video: {latest['title']}")
         self.last_seen.setdefault("youtube", {})[channel_id] = vid
-        _save_last_seen(self.last_seen)
+        self.last_seen_writer.set("youtube", channel_id, vid)
         await self.announce_video("youtube", latest["title"], latest["link"], latest["thumb"], discord_id)
 
-    async def check_twitch_upload(self, session, login: str, discord_id: int):
-        latest = await self._twitch_latest_upload(session, login)
+    async def check_twitch_upload(self, login: str, discord_id: int):
+        latest = await self._twitch_latest_upload(login)
         if not latest:
             return
         vid_id = latest["id"]
@@ -427,17 +739,17 @@ class StreamCog(commands.Cog):
             return
         print(f"[STREAM] New Twitch upload: {latest['title']}")
         self.last_seen.setdefault("twitch", {})[login] = vid_id
-        _save_last_seen(self.last_seen)
+        self.last_seen_writer.set("twitch", login, vid_id)
         await self.announce_video("twitch", latest["title"], latest["url"], latest["thumbnail_url"], discord_id)
 
     # ── Анонси ───────────────────────────────────────────────────────────────
 
-    async def _build_embed_files(self, session, avatar_url: str, platform: str, preview: Optional[str]):
+    async def _build_embed_files(self, avatar_url: str, platform: str, preview: Optional[str]):
         plat_icon_url, _ = self.platform_assets(platform)
         files = []
         embed_kwargs = {}
 
-        avatar_file = await self._circle_avatar_file(session, avatar_url)
+        avatar_file = await self._circle_avatar_file(avatar_url)
         if avatar_file:
             embed_kwargs["thumbnail"] = f"attachment://{avatar_file.filename}"
             files.append(avatar_file)
@@ -446,7 +758,7 @@ class StreamCog(commands.Cog):
             bust = str(int(time.time()))
             embed_kwargs["image"] = f"{preview}{'&' if '?' in preview else '?'}t={bust}"
 
-        icon_file = await self._fetch_icon_60(session, plat_icon_url)
+        icon_file = await self._fetch_icon_60(plat_icon_url)
         if icon_file:
             files.append(icon_file)
 
@@ -487,8 +799,7 @@ class StreamCog(commands.Cog):
         if not channel:
             return
 
-        async with aiohttp.ClientSession() as session:
-            files, ekw = await self._build_embed_files(session, avatar_url, platform, preview)
+        files, ekw = await self._build_embed_files(avatar_url, platform, preview)
 
         if "thumbnail" in ekw:
             embed.set_thumbnail(url=ekw["thumbnail"])
@@ -501,7 +812,7 @@ class StreamCog(commands.Cog):
             files=files,
         )
 
-    async def announce_stream(self, session, platform: str, username: str, discord_id: int):
+    async def announce_stream(self, platform: str, username: str, discord_id: int, stream: Optional[dict] = None):
         if platform != "twitch":
             return
 
@@ -509,23 +820,26 @@ class StreamCog(commands.Cog):
         preview    = f"https://static-cdn.jtvnw.net/previews-ttv/live_user_{username}-640x360.jpg"
         _, plat_emoji = self.platform_assets(platform)
 
-        try:
-            async with session.get(f"https://decapi.me/twitch/game/{username}") as g:
-                game_name = (await g.text()).strip()
-        except Exception:
-            game_name = ""
+        if stream is not None:
+            # Helix уже повернув усе в відповіді streams — без трьох запитів до decapi
+            game_name = stream.get("game_name") or ""
+            viewers   = str(stream.get("viewer_count", 0))
+            title     = stream.get("title") or "🔴 LIVE"
+        else:
+            try:
+                game_name = (await self._fetch(f"https://decapi.me/twitch/game/{username}")).strip()
+            except Exception:
+                game_name = ""
 
-        try:
-            async with session.get(f"https://decapi.me/twitch/viewercount/{username}") as v:
-                viewers = (await v.text()).strip() or "0"
-        except Exception:
-            viewers = "0"
+            try:
+                viewers = (await self._fetch(f"https://decapi.me/twitch/viewercount/{username}")).strip() or "0"
+            except Exception:
+                viewers = "0"
 
-        try:
-            async with session.get(f"https://decapi.me/twitch/status/{username}") as t:
-                title = (await t.text()).strip()
-        except Exception:
-            title = "🔴 LIVE"
+            try:
+                title = (await self._fetch(f"https://decapi.me/twitch/status/{username}")).strip()
+            except Exception:
+                title = "🔴 LIVE"
 
         now_utc = datetime.now(timezone.utc)
         color   = random.choice(STREAM_COLORS)
@@ -549,7 +863,7 @@ class StreamCog(commands.Cog):
         if not channel:
             return
 
-        files, ekw = await self._build_embed_files(session, avatar_url, platform, preview)
+        files, ekw = await self._build_embed_files(avatar_url, platform, preview)
         if "thumbnail" in ekw:
             embed.set_thumbnail(url=ekw["thumbnail"])
         if "image" in ekw:
@@ -591,7 +905,11 @@ class StreamCog(commands.Cog):
             await interaction.followup.send("❌ Не вдалося визначити ідентифікатор", ephemeral=True)
             return
 
-        self.streamers = _load_streamers()
+        streamers = await _run_db(_load_streamers)
+        if streamers is None:
+            await interaction.followup.send("❌ База недоступна, спробуйте пізніше.", ephemeral=True)
+            return
+        self.streamers, self._streamers_loaded = streamers, True
         for s in self.streamers:
             if s.get("platform") == plat and s.get("username") == username and s.get("discord_id") == користувач.id:
                 await interaction.followup.send("⚠️ Цей стрімер уже доданий.", ephemeral=True)
@@ -601,8 +919,7 @@ class StreamCog(commands.Cog):
 
         # Для YouTube одразу резолвимо channel_id
         if plat == "youtube":
-            async with aiohttp.ClientSession() as session:
-                ch_id = await self._yt_resolve_channel_id(session, username)
+            ch_id = await self._yt_resolve_channel_id(username)
             if ch_id:
                 item["yt_channel_id"] = ch_id
                 print(f"[STREAM] YouTube channel_id resolved: {username} → {ch_id}")
@@ -610,7 +927,7 @@ class StreamCog(commands.Cog):
                 print(f"[STREAM] WARNING: Could not resolve YouTube channel_id for {username}")
 
         self.streamers.append(item)
-        _save_streamers(self.streamers)
+        await self._persist_streamers()
 
         await interaction.followup.send(
             f"✅ Додано: **{username}** ({користувач.mention}) на **{plat}**",
@@ -630,22 +947,26 @@ class StreamCog(commands.Cog):
         платформа: app_commands.Choice[str],
         нік: str,
     ):
-        self.streamers = _load_streamers()
+        await interaction.response.defer(ephemeral=True)
+        streamers = await _run_db(_load_streamers)
+        if streamers is None:
+            await interaction.followup.send("❌ База недоступна, спробуйте пізніше.", ephemeral=True)
+            return
+        self.streamers, self._streamers_loaded = streamers, True
         before = len(self.streamers)
         self.streamers = [
             s for s in self.streamers
             if not (s.get("platform") == платформа.value and s.get("username") == нік)
         ]
         if len(self.streamers) < before:
-            _save_streamers(self.streamers)
-            await interaction.response.send_message(f"✅ Стрімера **{нік}** видалено.", ephemeral=True)
+            await self._persist_streamers()
+            await interaction.followup.send(f"✅ Стрімера **{нік}** видалено.", ephemeral=True)
         else:
-            await interaction.response.send_message(f"❌ Стрімера **{нік}** не знайдено.", ephemeral=True)
+            await interaction.followup.send(f"❌ Стрімера **{нік}** не знайдено.", ephemeral=True)
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="список_стрімерів", description="Показати всіх стрімерів")
     async def list_streamers(self, interaction: discord.Interaction):
-        self.streamers = _load_streamers()
         if not self.streamers:
             await interaction.response.send_message("ℹ️ Стрімерів немає.", ephemeral=True)
             return
@@ -656,14 +977,30 @@ class StreamCog(commands.Cog):
         embed = discord.Embed(title="📋 Стрімери", description="\n".join(lines), color=discord.Color.blue())
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="стріми_стат", description="[Офіцер] Тривалість останнього циклу перевірки стрімів")
+    @app_commands.default_permissions(manage_guild=True)
+    async def stream_poll_stats(self, interaction: discord.Interaction):
+        if not self.last_cycle:
+            await interaction.response.send_message("ℹ️ Цикл перевірки ще не виконувався.", ephemeral=True)
+            return
+        lines = [f"`{k}`: **{v}**" for k, v in self.last_cycle.items()]
+        embed = discord.Embed(title="📡 Перевірка стрімів", description="\n".join(lines), color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.describe(гра="Назва гри", іконка_url="URL іконки")
     @app_commands.command(name="гра_іконка", description="Додати/оновити іконку для гри")
     async def set_game_icon(self, interaction: discord.Interaction, гра: str, іконка_url: str):
-        self.game_icons = _load_game_icons()
+        await interaction.response.defer(ephemeral=True)
+        icons = await _run_db(_load_game_icons)
+        if icons is None:
+            await interaction.followup.send("❌ База недоступна, спробуйте пізніше.", ephemeral=True)
+            return
+        self.game_icons, self._game_icons_loaded = icons, True
         self.game_icons[гра.strip().lower()] = іконка_url.strip()
-        _save_game_icons(self.game_icons)
-        await interaction.response.send_message(f"✅ Іконку для **{гра}** збережено.", ephemeral=True)
+        await _run_db(_save_game_icons, dict(self.game_icons))
+        await interaction.followup.send(f"✅ Іконку для **{гра}** збережено.", ephemeral=True)
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.describe(
@@ -726,8 +1063,7 @@ class StreamCog(commands.Cog):
             else av_member.display_avatar.url
         )
 
-        async with aiohttp.ClientSession() as session:
-            files, ekw = await self._build_embed_files(session, avatar_url, plat, preview)
+        files, ekw = await self._build_embed_files(avatar_url, plat, preview)
 
         if "thumbnail" in ekw:
             embed.set_thumbnail(url=ekw["thumbnail"])
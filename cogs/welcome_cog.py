@@ -140,10 +140,11 @@ class WelcomeCog(commands.Cog):
             y += line_height + spacing
 
     # ---------------- image helpers ----------------
-    async def _fetch_image(self, session: aiohttp.ClientSession, url: str) -> Image.Image:
-        async with session.get(url) as r:
-            r.raise_for_status()
-            return Image.open(io.BytesIO(await r.read())).convert("RGBA")
+    async def _fetch_image(self, url: str) -> Image.Image:
+        data = await self.bot.http_client.fetch(
+            url, "bytes", timeout=aiohttp.ClientTimeout(total=25), raise_for_status=True,
+        )
+        return Image.open(io.BytesIO(data)).convert("RGBA")
 
     def _load_local_image(self, path: Path) -> Image.Image:
         return Image.open(path).convert("RGBA")
@@ -165,34 +166,32 @@ class WelcomeCog(commands.Cog):
         dbg(f"generate_welcome_image for {member.display_name} {_shorten(self._where(), 300)}")
 
         try:
-            timeout = aiohttp.ClientTimeout(total=25)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Background
-                bg_name = "unknown.png"
-                if self.background_paths:
-                    bg_path = random.choice(self.background_paths)
-                    bg_name = bg_path.name
-                    dbg(f"BG local: {bg_path}")
-                    bg = self._load_local_image(bg_path)
-                else:
-                    bg_url = random.choice(self.background_urls_fallback)
-                    bg_name = Path(bg_url).name
-                    dbg(f"BG url: {bg_url}")
-                    bg = await self._fetch_image(session, bg_url)
-
-                # Avatar
-                avatar_url = str(member.display_avatar.url)
-                dbg(f"Avatar url: {avatar_url}")
-                avatar = await self._fetch_image(session, avatar_url)
-                avatar = avatar.resize((self.avatar_size, self.avatar_size))
-
-                # Frame
-                if self.avatar_frame_path.exists():
-                    dbg(f"Frame local: {self.avatar_frame_path}")
-                    frame = self._load_local_image(self.avatar_frame_path)
-                else:
-                    dbg(f"Frame url: {self.avatar_frame_url_fallback}")
-                    frame = await self._fetch_image(session, self.avatar_frame_url_fallback)
+            # Background
+            bg_name = "unknown.png"
+            if self.background_paths:
+                bg_path = random.choice(self.background_paths)
+                bg_name = bg_path.name
+                dbg(f"BG local: {bg_path}")
+                bg = self._load_local_image(bg_path)
+            else:
+                bg_url = random.choice(self.background_urls_fallback)
+                bg_name = Path(bg_url).name
+                dbg(f"BG url: {bg_url}")
+                bg = await self._fetch_image(bg_url)
+
+            # Avatar
+            avatar_url = str(member.display_avatar.url)
+            dbg(f"Avatar url: {avatar_url}")
+            avatar = await self._fetch_image(avatar_url)
+            avatar = avatar.resize((self.avatar_size, self.avatar_size))
+
+            # Frame
+            if self.avatar_frame_path.exists():
+                dbg(f"Frame local: {self.avatar_frame_path}")
+                frame = self._load_local_image(self.avatar_frame_path)
+            else:
+                dbg(f"Frame url: {self.avatar_frame_url_fallback}")
+                frame = await self._fetch_image(self.avatar_frame_url_fallback)
 
             # Round mask
             mask = Image.new("L", (self.avatar_size, self.avatar_size), 0)
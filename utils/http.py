@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# utils/http.py
+#
+# Спільний HTTP-клієнт для всіх когів: одна aiohttp.ClientSession з пулом з'єднань,
+# кешем DNS і лімітом з'єднань на хост (замість нової сесії — і нового TLS — на кожен запит).
+#
+#   text = await bot.http_client.fetch(url)
+#   data = await bot.http_client.fetch(url, "json", headers=headers)
+#   status, headers, body = await bot.http_client.fetch(url, "full", headers={"If-None-Match": etag})
+#   data = await bot.http_client.post(url, "json", data=form)
+#
+# GET повторюється з експоненційною паузою на обрив з'єднання, таймаут, 429 і 5xx;
+# POST — лише якщо явно передано retries. По кожному хосту рахуються запити, помилки й затримки.
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+TOTAL_LIMIT      = 100
+LIMIT_PER_HOST   = 10
+DNS_CACHE_TTL    = 5 * 60
+KEEPALIVE        = 30
+DEFAULT_TIMEOUT  = aiohttp.ClientTimeout(total=30, connect=10)
+DEFAULT_RETRIES  = 2
+BACKOFF_BASE     = 0.5    # сек: 0.5, 1, 2 ... + джитер
+MAX_RETRY_AFTER  = 10     # довший Retry-After не чекаємо — віддаємо відповідь як є
+RETRY_STATUSES   = {429, 500, 502, 503, 504}
+USER_AGENT       = "SilentConcierge/1.0 (+discord bot)"
+
+
+@dataclass
+class HostStats:
+    requests:   int = 0
+    errors:     int = 0      # виняток або 429/5xx після всіх спроб
+    retries:    int = 0
+    total_ms:   float = 0.0
+    max_ms:     float = 0.0
+    last_error: Optional[str] = None
+
+
+class HttpClient:
+
+    def __init__(self, *, limit: int = TOTAL_LIMIT, limit_per_host: int = LIMIT_PER_HOST):
+        self._limit          = limit
+        self._limit_per_host = limit_per_host
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._hosts: dict[str, HostStats] = {}
+
+    # ── Життєвий цикл ────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Викликається з setup_hook — сесія має жити в циклі подій бота."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=DEFAULT_TIMEOUT,
+                headers={"User-Agent": USER_AGENT},
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Сира сесія — для стрімінгу чи нестандартних випадків; метрики тоді не пишуться."""
+        self.start()
+        return self._session
+
+    # ── Запити ───────────────────────────────────────────────────────────────
+
+    async def fetch(self, url: str, kind: str = "text", **kwargs) -> Any:
+        """GET; kind — text / json / bytes / full (status, headers, bytes)."""
+        return await self.request("GET", url, kind, **kwargs)
+
+    async def post(self, url: str, kind: str = "text", **kwargs) -> Any:
+        kwargs.setdefault("retries", 0)
+        return await self.request("POST", url, kind, **kwargs)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        kind: str = "text",
+        *,
+        retries: int = DEFAULT_RETRIES,
+        raise_for_status: bool = False,
+        **kwargs,
+    ) -> Any:
+        stats   = self._hosts.setdefault(urlsplit(url).hostname or "", HostStats())
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            delay   = None
+            try:
+                async with self.session.request(method, url, **kwargs) as r:
+                    if r.status in RETRY_STATUSES and attempt < retries:
+                        delay = self._retry_after(r)
+                    else:
+                        if raise_for_status:
+                            r.raise_for_status()
+                        result = await self._read(r, kind)
+                        self._record(stats, started, f"HTTP {r.status}" if r.status in RETRY_STATUSES else None)
+                        return result
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    self._record(stats, started, f"{type(e).__name__}: {e}")
+                    raise
+            except Exception as e:
+                self._record(stats, started, f"{type(e).__name__}: {e}")
+                raise
+
+            stats.retries += 1
+            attempt += 1
+            if delay is None:
+                delay = BACKOFF_BASE * 2 ** (attempt - 1) + random.uniform(0, BACKOFF_BASE)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _read(r: aiohttp.ClientResponse, kind: str) -> Any:
+        if kind == "full":
+            return r.status, r.headers, await r.read()
+        if kind == "json":
+            return await r.json(content_type=None)
+        if kind == "bytes":
+            return await r.read()
+        return await r.text()
+
+    @staticmethod
+    def _retry_after(r: aiohttp.ClientResponse) -> Optional[float]:
+        try:
+            value = float(r.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+        return value if 0 <= value <= MAX_RETRY_AFTER else None
+
+    @staticmethod
+    def _record(stats: HostStats, started: float, error: Optional[str]) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        stats.requests += 1
+        stats.total_ms += ms
+        stats.max_ms    = max(stats.max_ms, ms)
+        if error:
+            stats.errors    += 1
+            stats.last_error = error[:200]
+
+    # ── Статистика ───────────────────────────────────────────────────────────
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "host":       host,
+                "requests":   s.requests,
+                "errors":     s.errors,
+                "retries":    s.retries,
+                "avg_ms":     round(s.total_ms / s.requests, 1) if s.requests else None,
+                "max_ms":     round(s.max_ms, 1),
+                "last_error": s.last_error,
+            }
+            for host, s in sorted(self._hosts.items(), key=lambda kv: -kv[1].requests)
+        ]
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# utils/scheduler.py
+#
+# Спільний планувальник для всіх когів: один heap дедлайнів і одна задача,
+# яка спить до найближчого з них (замість десятка tasks.loop, що прокидаються
+# "про всяк випадок").
+#
+#   bot.scheduler.every("status", 15 * 60, self._update_status)
+#   bot.scheduler.at("bbf:reminder", next_run, self._send_reminder, grace=timedelta(minutes=30))
+#
+# `next_run(after)` повертає наступний момент (UTC) строго після `after`.
+# Для job'ів з `grace` момент останнього спрацювання пишеться у STATE_PATH —
+# після рестарту пропущений дедлайн, якщо він молодший за grace, виконується одразу.
+
+import asyncio
+import heapq
+import itertools
+import json
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+STATE_PATH        = Path("data/scheduler_state.json")
+MAX_SLEEP_SECONDS = 15 * 60   # страховка від стрибків системного годинника
+
+NextRun = Callable[[datetime], Optional[datetime]]
+JobFn   = Callable[[datetime], Awaitable[None]]   # отримує запланований момент
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Job:
+    name:     str
+    next_run: NextRun
+    fn:       JobFn
+    grace:    Optional[timedelta] = None
+    due:      Optional[datetime] = None
+    task:     Optional[asyncio.Task] = None
+    runs:     int = 0
+    errors:   int = 0
+    skipped:  int = 0      # дедлайн настав, поки попередній запуск ще працював
+    last_lag: float = 0.0  # наскільки пізно стартував останній запуск (сек)
+
+
+class Scheduler:
+
+    def __init__(
+        self,
+        state_path: Path = STATE_PATH,
+        wait_ready: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self._state_path = state_path
+        self._wait_ready = wait_ready
+        self._jobs: dict[str, Job] = {}
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._seq        = itertools.count()
+        self._wake       = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._last_fired = self._load_state()
+
+    # ── Персистентний стан ───────────────────────────────────────────────────
+
+    def _load_state(self) -> dict[str, str]:
+        try:
+            data = json.loads(self._state_path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_state(self) -> None:
+        try:
+            self._state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._state_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._last_fired, ensure_ascii=False, indent=2), encoding="utf-8")
+            tmp.replace(self._state_path)
+        except Exception as e:
+            print(f"[SCHED][WARN] Не вдалось зберегти стан: {e}")
+
+    # ── Реєстрація ───────────────────────────────────────────────────────────
+
+    def every(self, name: str, seconds: float, fn: JobFn, *, first_delay: float = 0) -> Job:
+        """Періодичний job; перший запуск — через `first_delay` після старту."""
+        interval = timedelta(seconds=seconds)
+        job = Job(name, lambda after: after + interval, fn)
+        return self._add(job, _utcnow() + timedelta(seconds=first_delay))
+
+    def at(self, name: str, next_run: NextRun, fn: JobFn, *, grace: Optional[timedelta] = None) -> Job:
+        """Job за календарем; з `grace` — наздоганяє пропущений дедлайн після рестарту."""
+        now   = _utcnow()
+        job   = Job(name, next_run, fn, grace=grace)
+        first = None
+
+        if grace is not None:
+            missed = next_run(now - grace)
+            last   = self._last_fired.get(name)
+            if missed and missed <= now and (last is None or datetime.fromisoformat(last) < missed):
+                print(f"[SCHED] {name}: наздоганяю пропущений дедлайн {missed:%Y-%m-%d %H:%M} UTC")
+                first = missed
+
+        return self._add(job, first or next_run(now))
+
+    def remove(self, name: str) -> None:
+        job = self._jobs.pop(name, None)
+        if job and job.task and not job.task.done():
+            job.task.cancel()
+        self._wake.set()
+
+    def reschedule(self, name: str, when: Optional[datetime] = None) -> None:
+        """Перенести наступний запуск: на `when` або на next_run(now) — коли змінились дані job'а."""
+        job = self._jobs.get(name)
+        if job is None:
+            return
+        self._push(job, when if when is not None else job.next_run(_utcnow()))
+
+    def _add(self, job: Job, first: Optional[datetime]) -> Job:
+        self.remove(job.name)
+        self._jobs[job.name] = job
+        self._push(job, first)
+        return job
+
+    def _push(self, job: Job, due: Optional[datetime]) -> None:
+        job.due = due
+        if due is None:
+            return
+        heapq.heappush(self._heap, (due, next(self._seq), job.name))
+        self._wake.set()
+
+    # ── Цикл ─────────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        for name in list(self._jobs):
+            self.remove(name)
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+
+    async def _run(self) -> None:
+        if self._wait_ready:
+            await self._wait_ready()
+
+        while True:
+            self._wake.clear()
+            now = _utcnow()
+
+            while self._heap and self._heap[0][0] <= now:
+                due, _, name = heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+                if job is None or job.due != due:
+                    continue   # job видалено або переплановано — застарілий запис
+                self._dispatch(job, due, now)
+
+            timeout = MAX_SLEEP_SECONDS
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - _utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, job: Job, due: datetime, now: datetime) -> None:
+        if job.task and not job.task.done():
+            job.skipped += 1
+            print(f"[SCHED][WARN] {job.name}: попередній запуск ще триває — пропускаю")
+        else:
+            job.last_lag = (now - due).total_seconds()
+            job.task     = asyncio.create_task(self._execute(job, due))
+        self._push(job, job.next_run(now))
+
+    async def _execute(self, job: Job, due: datetime) -> None:
+        try:
+            await job.fn(due)
+            job.runs += 1
+        except Exception as e:
+            job.errors += 1
+            print(f"[SCHED][ERROR] {job.name}: {type(e).__name__}: {e}")
+            traceback.print_exc()
+
+        if job.grace is not None:
+            self._last_fired[job.name] = due.isoformat()
+            self._save_state()
+
+    # ── Статистика ───────────────────────────────────────────────────────────
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "name":     job.name,
+                "next_run": job.due.isoformat() if job.due else None,
+                "runs":     job.runs,
+                "errors":   job.errors,
+                "skipped":  job.skipped,
+                "last_lag": round(job.last_lag, 3),
+            }
+            for job in sorted(self._jobs.values(), key=lambda j: j.due or datetime.max.replace(tzinfo=timezone.utc))
+        ]